@@ -0,0 +1,94 @@
+"""
+Load test for request coalescing: bursts of requests for newly released
+questions, in which most students submit one of a few responses, sent by
+many concurrent clients to evaluation_function with and without
+coalescing. Reports the CPU time used, throughput and latency percentiles.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_coalesce [--bursts N] [--burst-size N] [--concurrency N]
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lf_toolkit.evaluation import Params
+
+from evaluation_function.coalesce import coalesced, evaluation_key
+from evaluation_function.evaluation import evaluation_function
+from evaluation_function import metrics
+
+
+def random_expression(rng: random.Random, names: list[str], depth: int) -> str:
+    if depth == 0:
+        return ("~" if rng.random() < 0.3 else "") + rng.choice(names)
+    left = random_expression(rng, names, depth - 1)
+    right = random_expression(rng, names, depth - 1)
+    return f"~({left} {rng.choice('&|^')} {right})"
+
+
+def workload(bursts: int, size: int, seed: int = 0) -> list[list[tuple[str, str]]]:
+    # Each burst is a new question over 20 variables, too many for the truth
+    # table engine. Half of the students get it right, and the rest submit
+    # one of a few wrong responses, the most common more often.
+    rng = random.Random(seed)
+    names = [f"x{i}" for i in range(20)]
+    out = []
+    for _ in range(bursts):
+        answer = random_expression(rng, names, 6)
+        responses = [answer] + [random_expression(rng, names, 6) for _ in range(4)]
+        weights = [8, 4, 2, 1, 1]
+        out.append([(response, answer) for response in rng.choices(responses, weights, k=size)])
+    return out
+
+
+def run(handler, bursts: list[list[tuple[str, str]]], concurrency: int) -> dict:
+    latencies = []
+
+    def request(item):
+        response, answer, sent = item
+        handler(response, answer, Params())
+        latencies.append(time.perf_counter() - sent)
+
+    cpu, start = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        for burst in bursts:
+            sent = time.perf_counter()
+            list(clients.map(request, [(response, answer, sent) for response, answer in burst]))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "cpu": time.process_time() - cpu,
+        "throughput": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[int(len(latencies) * 0.99)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bursts", type=int, default=10)
+    parser.add_argument("--burst-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    bursts = workload(args.bursts, args.burst_size)
+    print(f"{'':<12} {'cpu':>8} {'req/s':>10} {'p50':>10} {'p99':>10}")
+    for name, handler in [
+        ("direct", evaluation_function),
+        ("coalesced", coalesced(evaluation_function, evaluation_key)),
+    ]:
+        # Start each run as if the questions had just been released
+        for cache in metrics.CACHES.values():
+            cache.clear()
+        stats = run(handler, bursts, args.concurrency)
+        print(
+            f"{name:<12} {stats['cpu']:>7.2f}s {stats['throughput']:>10.1f}"
+            f" {stats['p50'] * 1e3:>8.1f}ms {stats['p99'] * 1e3:>8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
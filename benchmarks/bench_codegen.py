@@ -0,0 +1,79 @@
+"""
+Compares ways of evaluating an expression on every assignment of its
+variables: compiled with codegen.compile_expr (one call on bitsets), walking
+the tree with truth_table.eval_expr (one walk on bitsets), and sympy's
+lambdify and subs (one call per assignment). Also reports how long compiling
+takes, and how many tree walks that is worth.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_codegen [--variables N]
+"""
+import argparse
+import random
+import time
+from itertools import product
+
+from evaluation_function.budget import count_nodes
+from evaluation_function.lex import Lexer
+from evaluation_function.parse import conv_expr, parse_boolean
+from evaluation_function import codegen, truth_table
+
+
+def random_expr(rng: random.Random, names: list[str], depth: int) -> str:
+    if depth == 0 or rng.random() < 0.15:
+        return ("~" if rng.random() < 0.4 else "") + rng.choice(names)
+    text = random_expr(rng, names, depth - 1)
+    for _ in range(rng.randint(1, 4)):
+        text += f" {rng.choice('&|^')} {random_expr(rng, names, depth - 1)}"
+    return ("~" if rng.random() < 0.3 else "") + f"({text})"
+
+
+def best_of(func, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variables", type=int, default=8)
+    args = parser.parse_args()
+
+    from sympy import lambdify, symbols
+
+    rng = random.Random(0)
+    names = [f"x{i}" for i in range(args.variables)]
+    print(f"{'nodes':>6} {'compile':>10} {'compiled':>10} {'walk':>10} {'lambdify':>10} {'subs':>10}")
+    for depth in [2, 4, 6]:
+        expr = parse_boolean(Lexer(random_expr(rng, names, depth)).lex())
+        masks, full = truth_table.variable_masks(names)
+        rows = list(product([False, True], repeat=len(names)))
+
+        codegen.COMPILED_CACHE.clear()
+        compile_time = best_of(lambda: (codegen.COMPILED_CACHE.clear(), codegen.compile_expr(expr)))
+        compiled = codegen.compile_expr(expr)
+        assert compiled(masks, full) == truth_table.eval_expr(expr, masks, full)
+
+        sympy_expr = conv_expr(expr)
+        sympy_symbols = symbols(names)
+        function = lambdify(sympy_symbols, sympy_expr)
+        times = {
+            "compiled": best_of(lambda: compiled(masks, full)),
+            "walk": best_of(lambda: truth_table.eval_expr(expr, masks, full)),
+            "lambdify": best_of(lambda: [function(*row) for row in rows], repeat=1),
+            "subs": best_of(lambda: [sympy_expr.subs(dict(zip(sympy_symbols, row))) for row in rows], repeat=1),
+        }
+        nodes = count_nodes(expr)
+        print(
+            f"{nodes:>6} {compile_time * 1e6:>8.0f}us"
+            + "".join(f" {times[name] * 1e6:>8.1f}us" for name in ["compiled", "walk", "lambdify", "subs"])
+            + f"  (compiling = {compile_time / times['walk']:.0f} walks)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare the truth table equivalence engine against sympy's simplify_logic on
+the eval_tests.yaml corpus.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_equivalence
+"""
+import time
+from pathlib import Path
+
+import yaml
+from sympy import Equivalent, simplify_logic
+
+from evaluation_function.parse import parse_with_feedback
+from evaluation_function import truth_table
+
+ROOT = Path(__file__).resolve().parent.parent
+DISALLOWED = {"and": False, "or": False, "not": False, "xor": False}
+
+
+def load_cases(path: Path = ROOT / "eval_tests.yaml") -> list[tuple[str, str]]:
+    cases = []
+    with open(path) as f:
+        for section in yaml.safe_load_all(f):
+            for test in section.get("tests", []):
+                for sub_test in test.get("sub_tests", [test]):
+                    cases.append((sub_test["response"], test["answer"]))
+    return cases
+
+
+def best_of(func, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    print(f"{'response':<45} {'answer':<15} {'sympy':>10} {'table':>10} {'speedup':>8}")
+    total_sympy = total_table = 0.0
+    for response, answer in load_cases():
+        response_set, response_sympy = parse_with_feedback(response, DISALLOWED)
+        answer_set, answer_sympy = parse_with_feedback(answer, DISALLOWED)
+
+        sympy_result = simplify_logic(Equivalent(response_sympy, answer_sympy)) == True
+        table_result = truth_table.equivalent(response_set, answer_set)
+        assert sympy_result == table_result, (response, answer)
+
+        t_sympy = best_of(lambda: simplify_logic(Equivalent(response_sympy, answer_sympy)))
+        t_table = best_of(lambda: truth_table.equivalent(response_set, answer_set))
+        total_sympy += t_sympy
+        total_table += t_table
+        print(f"{response:<45.45} {answer:<15.15} {t_sympy * 1e6:>8.1f}us {t_table * 1e6:>8.1f}us {t_sympy / t_table:>7.1f}x")
+
+    print(f"{'total':<61} {total_sympy * 1e6:>8.1f}us {total_table * 1e6:>8.1f}us {total_sympy / total_table:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Micro-benchmarks for the lexer on short and 10k-character inputs, and for
+the LaTeX lexer on the same inputs rendered with to_latex().
+
+Run from the repository root:
+
+    python -m benchmarks.bench_lex
+"""
+import random
+import timeit
+
+from evaluation_function.latex_lex import LatexLexer
+from evaluation_function.lex import Lexer
+from evaluation_function.parse import parse_boolean
+
+
+def long_input(rng: random.Random, length: int, term) -> str:
+    parts, size = [], 0
+    while size < length:
+        part = term(rng)
+        parts.append(part)
+        size += len(part) + 3
+    return " | ".join(parts)
+
+
+def inputs() -> dict[str, str]:
+    rng = random.Random(0)
+    return {
+        "short: A & B": "A & B",
+        "short: NAND xor": "~(~(A & ~(A & B)) & ~(B & ~(A & B)))",
+        "short: long names": "Clock & ~Reset | Enable_1 & Data_in",
+        "10k: NAND terms": long_input(rng, 10_000, lambda rng: f"~(x{rng.randrange(50)} & y{rng.randrange(50)})"),
+        "10k: long names": long_input(rng, 10_000, lambda rng: f"signal_{rng.randrange(10 ** 6)}"),
+        "10k: deep nesting": "(" * 5000 + "A" + ")" * 5000,
+        "10k: whitespace": " " * 5000 + "A" + "\t" * 5000,
+    }
+
+
+def report(name: str, lexer, input: str):
+    number = max(1, 200_000 // len(input))
+    best = min(timeit.repeat(lambda: lexer(input).lex(), number=number, repeat=5)) / number
+    print(f"{name:<28} {len(input):>6} chars {best * 1e6:>10.1f}us {len(input) / best / 1e6:>8.1f} Mchar/s")
+
+
+def main():
+    for name, input in inputs().items():
+        report(name, Lexer, input)
+    for name, input in inputs().items():
+        report(f"latex {name}", LatexLexer, parse_boolean(Lexer(input).lex()).to_latex())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares minimize.minimal_sop with sympy's SOPform on the kind of functions
+set as questions (short random sums of products) and on random truth tables,
+for 4 to 8 variables. Reports the total time and the total number of
+products in the results.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_minimize [--count N]
+"""
+import argparse
+import random
+import time
+
+from evaluation_function.lex import Lexer
+from evaluation_function.minimize import MINIMAL_CACHE, minimal_sop
+from evaluation_function.parse import parse_boolean
+from evaluation_function import truth_table
+
+
+def question(rng: random.Random, names: list[str]) -> int:
+    terms = []
+    for _ in range(rng.randint(2, 5)):
+        size = rng.randint(1, max(1, len(names) // 2))
+        terms.append(" & ".join(("~" if rng.random() < 0.5 else "") + name for name in rng.sample(names, size)))
+    return truth_table.truth_table(parse_boolean(Lexer(" | ".join(terms)).lex()), names)
+
+
+def ours(table: int, names: list[str]) -> int:
+    return minimal_sop(table, names).count("|") + 1
+
+
+def sympy_sop(table: int, names: list[str]) -> int:
+    from sympy import Or, SOPform, symbols
+
+    n = len(names)
+    minterms = [[row >> i & 1 for i in range(n)] for row in range(1 << n) if table >> row & 1]
+    sop = SOPform(symbols(names), minterms)
+    return len(sop.args) if isinstance(sop, Or) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=10)
+    args = parser.parse_args()
+
+    # Not included in the times
+    import sympy
+
+    rng = random.Random(0)
+    print(f"{'kind':>9} {'n':>3} {'ours':>10} {'sympy':>10} {'products':>16}")
+    for kind in ["question", "random"]:
+        # sympy takes minutes on 10 variables
+        for n in [4, 6, 8]:
+            names = [f"x{i}" for i in range(n)]
+            tables = [
+                question(rng, names) if kind == "question" else rng.getrandbits(1 << n)
+                for _ in range(args.count)
+            ]
+            times, products = {}, {}
+            for name, minimise in [("ours", ours), ("sympy", sympy_sop)]:
+                MINIMAL_CACHE.clear()
+                start = time.perf_counter()
+                products[name] = sum(minimise(table, names) for table in tables)
+                times[name] = time.perf_counter() - start
+            print(
+                f"{kind:>9} {n:>3} {times['ours'] * 1e3:>8.1f}ms {times['sympy'] * 1e3:>8.1f}ms"
+                f" {products['ours']:>7} / {products['sympy']:<7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Load test for the process pool backend: measures evaluation throughput for an
+increasing number of worker processes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pool [--requests N] [--concurrency N]
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Every request in the load test is distinct anyway, but make sure results
+# are not served from the cache in the workers.
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+
+from lf_toolkit.evaluation import Params
+
+from evaluation_function.evaluation import evaluation_function
+from evaluation_function.pool import EvaluationPool
+
+
+def random_expression(rng: random.Random, names: list[str], depth: int) -> str:
+    if depth == 0:
+        return ("~" if rng.random() < 0.3 else "") + rng.choice(names)
+    left = random_expression(rng, names, depth - 1)
+    right = random_expression(rng, names, depth - 1)
+    return f"~({left} {rng.choice('&|^')} {right})"
+
+
+def workload(count: int, seed: int = 0) -> list[tuple[str, str]]:
+    # NAND-style expressions over 20 variables: too many for the truth table
+    # engine, so they exercise the slower paths.
+    rng = random.Random(seed)
+    names = [f"x{i}" for i in range(20)]
+    return [(random_expression(rng, names, 6), random_expression(rng, names, 6)) for _ in range(count)]
+
+
+def run(handler, requests: list[tuple[str, str]], concurrency: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(lambda request: handler(request[0], request[1], Params()), requests))
+    return len(requests) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    requests = workload(args.requests)
+    baseline = run(evaluation_function, requests, args.concurrency)
+    print(f"{'in-process':<12} {baseline:>10.1f} req/s")
+
+    workers = 1
+    while workers <= os.cpu_count():
+        pool = EvaluationPool(workers).start()
+        try:
+            throughput = run(pool.evaluation_function, requests, args.concurrency)
+        finally:
+            pool.shutdown()
+        print(f"{f'{workers} workers':<12} {throughput:>10.1f} req/s {throughput / baseline:>6.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
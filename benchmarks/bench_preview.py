@@ -0,0 +1,61 @@
+"""
+Simulates a student typing a long response one character at a time, and
+measures the preview latency per keystroke as the response grows, with and
+without reusing the parts that didn't change.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_preview [--terms N]
+"""
+import argparse
+import random
+import time
+
+from evaluation_function import incremental
+
+
+def response(terms: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    names = [f"x{i}" for i in range(12)]
+    parts = []
+    for _ in range(terms):
+        a, b, c = rng.sample(names, 3)
+        parts.append(rng.choice([f"{a} & ~{b}", f"~({a} | {b}) & {c}", f"{a} & {b} & {c}"]))
+    return " | ".join(parts)
+
+
+def keystroke_times(preview, text: str) -> list[float]:
+    times = []
+    for end in range(1, len(text) + 1):
+        start = time.perf_counter()
+        try:
+            preview(text[:end])
+        except Exception:
+            # Most prefixes end part way through a term
+            pass
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--terms", type=int, default=200)
+    args = parser.parse_args()
+
+    text = response(args.terms)
+    results = {}
+    for name, preview in [("full", incremental.full_preview), ("incremental", incremental.preview)]:
+        incremental.SEGMENT_CACHE.clear()
+        results[name] = keystroke_times(preview, text)
+
+    print(f"{'length':>8} {'full':>10} {'incremental':>12}")
+    for fraction in [0.1, 0.25, 0.5, 0.75, 1.0]:
+        end = int(len(text) * fraction)
+        window = slice(max(0, end - 50), end)
+        full = sum(results["full"][window]) / len(results["full"][window])
+        partial = sum(results["incremental"][window]) / len(results["incremental"][window])
+        print(f"{end:>8} {full * 1e6:>8.1f}us {partial * 1e6:>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
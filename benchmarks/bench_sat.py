@@ -0,0 +1,93 @@
+"""
+Measures how the SAT equivalence checker scales with the number of variables,
+next to the decision diagrams it backs up, on:
+
+- carry: the carry out of an n bit adder, written two ways
+- pairs: x0 & y0 | x1 & y1 | ..., in two orders, with all the x variables
+  mentioned first so that the decision diagram is exponentially large
+- parity: XOR of n variables in two orders, which is hard for SAT
+
+and on each of them with one mistake, which the solver has to find a
+counterexample for.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sat [--max-bits N]
+"""
+import argparse
+import random
+import time
+
+from evaluation_function.lex import Lexer
+from evaluation_function.parse import parse_boolean
+from evaluation_function import bdd, sat
+
+
+def parse(input: str):
+    return parse_boolean(Lexer(input).lex())
+
+
+def carry(n: int) -> tuple[str, str, str]:
+    left = right = "c"
+    for i in range(n):
+        left = f"(a{i} & b{i} | ({left}) & (a{i} ^ b{i}))"
+        right = f"((a{i} | b{i}) & ({right} | a{i} & b{i}))"
+    return left, right, right.replace(f"a{n - 1} & b{n - 1}", f"a{n - 1} & ~b{n - 1}")
+
+
+def pairs(n: int) -> tuple[str, str, str]:
+    rng = random.Random(0)
+    products = [f"x{i} & y{i}" for i in range(n)]
+    left = f"({' & '.join(f'x{i}' for i in range(n))} & ~x0) | " + " | ".join(products)
+    rng.shuffle(products)
+    right = " | ".join(products)
+    return left, right, right.replace(f"x{n - 1} & y{n - 1}", f"x{n - 1} & ~y{n - 1}")
+
+
+def parity(n: int) -> tuple[str, str, str]:
+    rng = random.Random(0)
+    names = [f"x{i}" for i in range(n)]
+    shuffled = names[:]
+    rng.shuffle(shuffled)
+    return " ^ ".join(names), " ^ ".join(shuffled), " ^ ".join(shuffled[1:])
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-bits", type=int, default=512)
+    args = parser.parse_args()
+
+    families = {
+        "carry": (carry, [8, 32, 128, 512]),
+        "pairs": (pairs, [8, 16, 32, 128, 512]),
+        "parity": (parity, [8, 12, 16, 20]),
+    }
+    print(f"{'family':>8} {'n':>5} {'sat':>10} {'bdd':>10} {'mistake':>10} {'conflicts':>10}")
+    for name, (family, sizes) in families.items():
+        for n in sizes:
+            if n > args.max_bits:
+                continue
+            left, right, wrong = (parse(text) for text in family(n))
+            cnf = sat.miter(left, right)
+            solver = sat.Solver(cnf)
+            result, sat_time = timed(solver.solve)
+            assert result is False
+            (equal, _), bdd_time = timed(bdd.equivalent, left, right)
+            (equal_wrong, witness), wrong_time = timed(sat.equivalent, left, wrong)
+            assert equal_wrong is False
+            # The decision diagram gives up when it grows too large
+            bdd_column = f"{bdd_time * 1e3:>8.1f}ms" if equal is not None else f"{'too large':>10}"
+            print(
+                f"{name:>8} {n:>5} {sat_time * 1e3:>8.1f}ms {bdd_column} "
+                f"{wrong_time * 1e3:>8.1f}ms {solver.conflicts:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
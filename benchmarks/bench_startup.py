@@ -0,0 +1,56 @@
+"""
+Cold start benchmark: measures, in fresh interpreters, how long it takes to
+import the evaluation function and answer the first eval and preview
+requests, and whether sympy had to be imported for them.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup [--runs N]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Run in a fresh interpreter for each measurement
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from lf_toolkit.evaluation import Params
+from evaluation_function.evaluation import evaluation_function
+from evaluation_function.preview import preview_function
+imported = time.perf_counter()
+evaluation_function("A & B | ~C", "~(~A | ~B) | ~C", Params())
+evaluated = time.perf_counter()
+preview_function("A & ~(B | C)", Params())
+previewed = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "first eval": evaluated - imported,
+    "first preview": previewed - evaluated,
+    "first response": evaluated - start,
+    "sympy loaded": "sympy" in sys.modules,
+}))
+"""
+
+
+def measure() -> dict:
+    output = subprocess.run([sys.executable, "-c", PROBE], check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    for stage in ["import", "first eval", "first preview", "first response"]:
+        times = sorted(run[stage] for run in runs)
+        print(f"{stage:<16} median {statistics.median(times) * 1e3:>8.1f}ms  max {times[-1] * 1e3:>8.1f}ms")
+    print(f"{'sympy loaded':<16} {any(run['sympy loaded'] for run in runs)}")
+
+
+if __name__ == "__main__":
+    main()
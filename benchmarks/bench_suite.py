@@ -0,0 +1,152 @@
+"""
+Benchmark suite and regression check: measures the latency and peak memory of
+evaluation_function and preview_function on each workload in
+benchmarks/workloads.py.
+
+Run from the repository root, saving a baseline before a change and comparing
+against it afterwards:
+
+    python -m benchmarks.bench_suite --save baseline.json
+    python -m benchmarks.bench_suite --compare baseline.json [--tolerance 0.25]
+
+With --compare, the exit status is 1 if any workload got slower (or used more
+memory) by more than the tolerance. Baselines are only comparable on the same
+machine, running the same set of workloads.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+# Measure the evaluation itself rather than the result cache
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+
+from lf_toolkit.evaluation import Params
+from lf_toolkit.preview import Params as PreviewParams
+
+from evaluation_function.evaluation import evaluation_function
+from evaluation_function.preview import preview_function
+
+from .workloads import workloads
+
+# Differences smaller than this are treated as noise, whatever the ratio
+NOISE_FLOOR = {"eval_ms": 0.05, "preview_ms": 0.05, "peak_kb": 64}
+
+
+def time_cases(func, cases: list[tuple], repeat: int) -> tuple[float, float]:
+    # Best and worst time for one pass over the cases, in milliseconds. The
+    # best time is the least affected by other load, so it is compared.
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for case in cases:
+            func(*case)
+        times.append((time.perf_counter() - start) * 1e3)
+    return min(times), max(times)
+
+
+def peak_memory(func, cases: list[tuple]) -> float:
+    # Peak memory allocated while evaluating the cases once, in kilobytes
+    tracemalloc.start()
+    try:
+        for case in cases:
+            func(*case)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def evaluate(response, answer, params):
+    return evaluation_function(response, answer, Params(params))
+
+
+def preview(response, params):
+    return preview_function(response, PreviewParams(params))
+
+
+def measure(name: str, cases: list[tuple[str, str, dict]], repeat: int) -> dict:
+    preview_cases = [(response, params) for response, _, params in cases]
+
+    # Don't let garbage from the previous workload slow this one down
+    gc.collect()
+
+    # The first pass compiles and caches the answers, as in a running server
+    for case in cases:
+        evaluate(*case)
+
+    eval_ms, eval_max_ms = time_cases(evaluate, cases, repeat)
+    preview_ms, preview_max_ms = time_cases(preview, preview_cases, repeat)
+    return {
+        "cases": len(cases),
+        "eval_ms": eval_ms,
+        "eval_max_ms": eval_max_ms,
+        "preview_ms": preview_ms,
+        "preview_max_ms": preview_max_ms,
+        "peak_kb": max(peak_memory(evaluate, cases), peak_memory(preview, preview_cases)),
+    }
+
+
+def run(repeat: int, only: list[str]) -> dict:
+    results = {}
+    for name, cases in workloads().items():
+        if only and name not in only:
+            continue
+        results[name] = measure(name, cases, repeat)
+        result = results[name]
+        print(
+            f"{name:<16} {result['cases']:>4} cases  eval {result['eval_ms']:>9.2f}ms"
+            f"  preview {result['preview_ms']:>9.2f}ms  peak {result['peak_kb']:>9.1f}KB",
+            flush=True,
+        )
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "workloads": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in current["workloads"].items():
+        before = baseline["workloads"].get(name)
+        if before is None:
+            continue
+        for metric, floor in NOISE_FLOOR.items():
+            old, new = before[metric], result[metric]
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append(f"{name}: {metric} {old:.2f} -> {new:.2f} ({new / old - 1:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--only", nargs="*", default=[], help="names of the workloads to run")
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--compare", help="compare the results against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    current = run(args.repeat, args.only)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Workloads for the benchmark suite: the eval_tests.yaml corpus, plus families
+of synthetic questions that exercise each of the evaluation paths.
+
+Each workload is a list of cases, and each case is a (response, answer,
+params) triple. Every family is generated from a fixed seed, so the cases
+are the same on every run.
+"""
+import random
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def yaml_cases(path: Path = ROOT / "eval_tests.yaml") -> list[tuple[str, str, dict]]:
+    cases = []
+    with open(path) as f:
+        for section in yaml.safe_load_all(f):
+            for test in section.get("tests", []):
+                for sub_test in test.get("sub_tests", [test]):
+                    params = {**test.get("params", {}), **sub_test.get("params", {})}
+                    cases.append((sub_test["response"], test["answer"], params))
+    return cases
+
+
+def names(n: int) -> list[str]:
+    return [f"x{i}" for i in range(n)]
+
+
+def nand(left: str, right: str) -> str:
+    return f"~({left} & {right})"
+
+
+def nor(left: str, right: str) -> str:
+    return f"~({left} | {right})"
+
+
+def nand_xor(left: str, right: str) -> str:
+    # The usual four gate XOR, which repeats ~(left & right)
+    both = nand(left, right)
+    return nand(nand(left, both), nand(right, both))
+
+
+def nor_and(left: str, right: str) -> str:
+    return nor(nor(left, left), nor(right, right))
+
+
+# Gate-level conversions grow exponentially with n when written out as text,
+# so keep n small in these families.
+
+def nand_conversion(n: int) -> list[tuple[str, str, dict]]:
+    # XOR of n variables written only with NAND gates
+    variables = names(n)
+    response = variables[0]
+    for name in variables[1:]:
+        response = nand_xor(response, name)
+    return [(response, " ^ ".join(variables), {})]
+
+
+def nor_conversion(n: int) -> list[tuple[str, str, dict]]:
+    # AND of n variables written only with NOR gates
+    variables = names(n)
+    response = variables[0]
+    for name in variables[1:]:
+        response = nor_and(response, name)
+    return [(response, " & ".join(variables), {})]
+
+
+def xor_chain(n: int, seed: int = 0) -> list[tuple[str, str, dict]]:
+    # The same chain in another order, and one with a variable missing
+    rng = random.Random(seed)
+    variables = names(n)
+    shuffled = variables[:]
+    rng.shuffle(shuffled)
+    return [
+        (" ^ ".join(shuffled), " ^ ".join(variables), {}),
+        (" ^ ".join(shuffled[1:]), " ^ ".join(variables), {}),
+    ]
+
+
+def deep_nesting(depth: int, seed: int = 0) -> list[tuple[str, str, dict]]:
+    # Alternating operators nested `depth` brackets deep, against the same
+    # expression with the operands of every bracket swapped
+    rng = random.Random(seed)
+    response = answer = "x0"
+    for _ in range(depth):
+        op = rng.choice("&|^")
+        name = f"x{rng.randrange(8)}"
+        response = f"~({name} {op} {response})"
+        answer = f"~({answer} {op} {name})"
+    return [(response, answer, {})]
+
+
+def random_cube(rng: random.Random, variables: list[str]) -> str:
+    size = rng.randint(1, max(1, len(variables) // 2))
+    return " & ".join(("~" if rng.random() < 0.5 else "") + name for name in rng.sample(variables, size))
+
+
+def minterms(n: int, rows: list[int]) -> str:
+    variables = names(n)
+    return " | ".join(
+        " & ".join(("" if row >> i & 1 else "~") + variables[i] for i in range(n))
+        for row in rows
+    ) or "x0 & ~x0"
+
+
+def karnaugh(n: int, count: int = 4, seed: int = 0) -> list[tuple[str, str, dict]]:
+    # A random sum of products as the answer, against its full sum of
+    # minterms (correct) and the same with one minterm flipped (incorrect)
+    from evaluation_function.lex import Lexer
+    from evaluation_function.parse import parse_boolean
+    from evaluation_function import truth_table
+
+    rng = random.Random(seed)
+    variables = names(n)
+    cases = []
+    for _ in range(count):
+        answer = " | ".join(random_cube(rng, variables) for _ in range(rng.randint(2, 5)))
+        table = truth_table.truth_table(parse_boolean(Lexer(answer).lex()), variables)
+        rows = [row for row in range(1 << n) if table >> row & 1]
+        cases.append((minterms(n, rows), answer, {}))
+        flipped = table ^ (1 << rng.randrange(1 << n))
+        cases.append((minterms(n, [row for row in range(1 << n) if flipped >> row & 1]), answer, {}))
+    return cases
+
+
+def workloads() -> dict[str, list[tuple[str, str, dict]]]:
+    return {
+        "yaml": yaml_cases(),
+        "nand-xor-4": nand_conversion(4),
+        "nand-xor-8": nand_conversion(8),
+        "nor-and-4": nor_conversion(4),
+        "nor-and-12": nor_conversion(12),
+        "xor-chain-16": xor_chain(16),
+        "xor-chain-128": xor_chain(128),
+        "deep-50": deep_nesting(50),
+        "deep-500": deep_nesting(500),
+        "karnaugh-4": karnaugh(4),
+        "karnaugh-8": karnaugh(8),
+    }
@@ -0,0 +1,154 @@
+import os
+from typing import Optional
+
+from .lex import ParseError, Token, TokenType
+from . import metrics
+
+# Checks on a response before it is parsed, so that input that would be
+# rejected anyway, or that is too large to grade, costs no more than lexing
+# it. Responses are rejected if they are longer than MAX_LENGTH characters
+# (before lexing), or, from the tokens, if they use more than MAX_VARIABLES
+# distinct variables, nest brackets more than MAX_DEPTH deep or use an
+# operator the question disallows.
+#
+# The disallowed operator reported is the one the parsed expression used to
+# be checked for (admission_test keeps that check as the reference): the
+# innermost bracketed expressions are looked at first (the last first, where
+# there are several), and within an expression each product in turn,
+# checking the operator before it, then its ANDs, then its NOTs. The first
+# violation of each bracketed group is worked out when it closes, so this
+# takes one pass over the tokens.
+#
+# Each rejection is counted as admission_rejected_<reason>.
+MAX_LENGTH = int(os.environ.get("EVAL_MAX_LENGTH", 200_000))
+MAX_VARIABLES = int(os.environ.get("EVAL_MAX_VARIABLES", 10_000))
+MAX_DEPTH = int(os.environ.get("EVAL_MAX_DEPTH", 2_000))
+
+
+class AdmissionError(ParseError):
+
+    def __init__(self, reason: str, msg: str):
+        super().__init__(msg)
+        self.reason = reason
+
+
+class Limits:
+
+    def __init__(self, length: int = MAX_LENGTH, variables: int = MAX_VARIABLES, depth: int = MAX_DEPTH):
+        self.length = length
+        self.variables = variables
+        self.depth = depth
+
+
+LIMITS = Limits()
+
+OPERATOR_TYPES = {"and": TokenType.AND, "or": TokenType.OR, "not": TokenType.NOT, "xor": TokenType.XOR}
+
+
+def check_length(input: str, limits: Limits = LIMITS):
+    if isinstance(input, str) and len(input) > limits.length:
+        metrics.increment("admission_rejected_length")
+        raise AdmissionError("length", f"The expression is too long (at most {limits.length} characters are allowed)")
+
+
+class _Group:
+    # The disallowed operators found so far in a bracketed expression
+    __slots__ = ("own", "inner", "op", "has_and", "has_not")
+
+    def __init__(self):
+        self.own = None
+        self.inner = None
+        self.op = None
+        self.has_and = False
+        self.has_not = False
+
+    def end_prod(self, disallowed: dict):
+        if self.own is None:
+            if self.op is not None:
+                self.own = self.op
+            elif self.has_and and disallowed["and"]:
+                self.own = "AND"
+            elif self.has_not and disallowed["not"]:
+                self.own = "NOT"
+        self.op = None
+        self.has_and = False
+        self.has_not = False
+
+    def first(self) -> Optional[str]:
+        return self.inner if self.inner is not None else self.own
+
+
+def first_disallowed(tokens: list[Token], disallowed: dict) -> Optional[str]:
+    """
+    The first disallowed operator in the expression `tokens` parse to, in
+    the order described above, or None if it uses none.
+    """
+    stack = []
+    group = _Group()
+    for token in tokens:
+        kind = token.type
+        if kind == TokenType.VARIABLE:
+            continue
+        if kind == TokenType.AND:
+            group.has_and = True
+        elif kind == TokenType.NOT:
+            group.has_not = True
+        elif kind == TokenType.OR or kind == TokenType.XOR:
+            group.end_prod(disallowed)
+            if kind == TokenType.OR and disallowed["or"]:
+                group.op = "OR"
+            elif kind == TokenType.XOR and disallowed["xor"]:
+                group.op = "XOR"
+        elif kind == TokenType.LBRACKET:
+            stack.append(group)
+            group = _Group()
+        elif kind == TokenType.RBRACKET and stack:
+            group.end_prod(disallowed)
+            found = group.first()
+            group = stack.pop()
+            if found is not None:
+                group.inner = found
+
+    # Close any brackets left open, which the parser will report
+    group.end_prod(disallowed)
+    while stack:
+        found = group.first()
+        group = stack.pop()
+        group.end_prod(disallowed)
+        if found is not None:
+            group.inner = found
+    return group.first()
+
+
+def admit(tokens: list[Token], disallowed: dict, limits: Limits = LIMITS):
+    """
+    Raise AdmissionError if the response lexed to `tokens` uses too many
+    variables, is nested too deeply or uses a disallowed operator.
+    """
+    kinds = {token.type for token in tokens}
+    variables = {token.value for token in tokens if token.type is TokenType.VARIABLE}
+    if len(variables) > limits.variables:
+        metrics.increment("admission_rejected_variables")
+        raise AdmissionError("variables", f"The expression has too many variables (at most {limits.variables} are allowed)")
+
+    if TokenType.LBRACKET in kinds:
+        depth = max_depth = 0
+        for token in tokens:
+            if token.type is TokenType.LBRACKET:
+                depth += 1
+                if depth > max_depth:
+                    max_depth = depth
+            elif token.type is TokenType.RBRACKET:
+                depth -= 1
+        if max_depth > limits.depth:
+            metrics.increment("admission_rejected_depth")
+            raise AdmissionError(
+                "depth", f"The expression is nested too deeply (at most {limits.depth} levels of brackets are allowed)"
+            )
+
+    # Most responses don't use any of the disallowed operators at all
+    if any(disallowed[op] and OPERATOR_TYPES[op] in kinds for op in OPERATOR_TYPES):
+        op = first_disallowed(tokens, disallowed)
+        if op is not None:
+            metrics.increment(f"admission_rejected_disallowed_{op.lower()}")
+            raise AdmissionError(f"disallowed_{op.lower()}", f"\"{op}\" is not permitted for this question")
@@ -0,0 +1,83 @@
+import random
+import unittest
+from unittest import mock
+
+from .admission import AdmissionError, Limits, admit, first_disallowed
+from .ast import Expr, subexpressions
+from .lex import Lexer, ParseError
+from .parse import FeedbackException, parse_boolean, parse_expression
+from .testing import NONE_DISALLOWED, random_expression
+from . import metrics, parse
+
+
+def check_disallowed(expr: Expr, disallowed: dict):
+    # How disallowed operators were checked on the parsed expression, before
+    # admission checked the tokens, which must report the same operator.
+    # Operators are checked in the order that conv_expr would build them.
+    for nested in subexpressions(expr):
+        for i, prod in enumerate(nested.prods()):
+            if i > 0:
+                xor = nested.right[i - 1][0]
+                if xor and disallowed["xor"]:
+                    raise ParseError("\"XOR\" is not permitted for this question")
+                if not xor and disallowed["or"]:
+                    raise ParseError("\"OR\" is not permitted for this question")
+            if prod.right and disallowed["and"]:
+                raise ParseError("\"AND\" is not permitted for this question")
+            if disallowed["not"] and any(term.op for term in prod.terms()):
+                raise ParseError("\"NOT\" is not permitted for this question")
+
+
+def reference(input: str, disallowed: dict):
+    # The operator check_disallowed() reports on the parsed expression
+    try:
+        check_disallowed(parse_boolean(Lexer(input).lex()), disallowed)
+    except Exception as e:
+        return str(e).split("\"")[1]
+    return None
+
+
+class TestAdmission(unittest.TestCase):
+
+    def test_same_operator_as_parsed_check(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            input = random_expression(rng, 4)
+            disallowed = {op: rng.random() < 0.5 for op in NONE_DISALLOWED}
+            self.assertEqual(first_disallowed(Lexer(input).lex(), disallowed), reference(input, disallowed), input)
+
+    def test_rejected_before_parsing(self):
+        disallowed = dict(NONE_DISALLOWED, **{"or": True})
+        before = metrics.counters().get("admission_rejected_disallowed_or", 0)
+        with mock.patch.object(parse, "parse_boolean", side_effect=AssertionError("parsed")):
+            with self.assertRaises(FeedbackException) as cm:
+                parse_expression("A & B | C", disallowed)
+        self.assertEqual(str(cm.exception), "\"OR\" is not permitted for this question")
+        self.assertEqual(metrics.counters()["admission_rejected_disallowed_or"], before + 1)
+
+    def test_limits(self):
+        limits = Limits(length=20, variables=3, depth=2)
+        for input, reason, message in [
+            ("A | B | C | D | E | F", "length", "The expression is too long (at most 20 characters are allowed)"),
+            ("A | B | C | D", "variables", "The expression has too many variables (at most 3 are allowed)"),
+            ("(((A)))", "depth", "The expression is nested too deeply (at most 2 levels of brackets are allowed)"),
+        ]:
+            before = metrics.counters().get(f"admission_rejected_{reason}", 0)
+            with self.assertRaises(FeedbackException) as cm:
+                parse_expression(input, NONE_DISALLOWED, limits=limits)
+            self.assertIsInstance(cm.exception.__cause__, AdmissionError)
+            self.assertEqual(str(cm.exception), message)
+            self.assertEqual(metrics.counters()[f"admission_rejected_{reason}"], before + 1)
+        self.assertEqual(str(parse_expression("A | B | (C & A)", NONE_DISALLOWED, limits=limits)), "A | B | (C & A)")
+
+    def test_limits_before_operators(self):
+        disallowed = dict(NONE_DISALLOWED, **{"or": True})
+        with self.assertRaises(AdmissionError) as cm:
+            admit(Lexer("((A | B))").lex(), disallowed, Limits(depth=1))
+        self.assertEqual(cm.exception.reason, "depth")
+
+    def test_unbalanced(self):
+        disallowed = dict(NONE_DISALLOWED, **{"and": True})
+        self.assertEqual(first_disallowed(Lexer("(A | (B & C)").lex(), disallowed), "AND")
+        self.assertEqual(first_disallowed(Lexer("A) & B").lex(), disallowed), "AND")
+        self.assertIsNone(first_disallowed(Lexer("(A | B").lex(), disallowed))
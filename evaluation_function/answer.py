@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+import sys
+from functools import cached_property
+from typing import Optional
+
+from .ast import Expr
+from .cache import LRUCache
+from .codegen import Evaluator
+from .disk_cache import DISK_CACHE
+from .normalize import canonical_form
+from .parse import NONE_DISALLOWED, FeedbackException, conv_expr, parse_expression
+from .signature import SignatureIndex, signature
+from . import metrics, truth_table
+
+# Every student submission to a question is compared against the same answer,
+# so the parsed answer is kept between requests.
+ANSWER_CACHE = LRUCache(
+    max_entries=int(os.environ.get("ANSWER_CACHE_SIZE", 1024)),
+    max_bytes=int(os.environ.get("ANSWER_CACHE_BYTES", 64 * 1024 * 1024)),
+)
+metrics.register_cache("answer", ANSWER_CACHE)
+
+MAX_EXTRA_TABLES = 8
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledAnswer:
+
+    def __init__(self, expr: Expr, state: Optional[dict] = None):
+        # `state` is what state() returned for the same answer, e.g. in
+        # another process, which saves computing it again
+        self.expr = expr
+        self.evaluate = Evaluator(expr)
+        self.variables = truth_table.variables(expr)
+        self.names = sorted(self.variables)
+
+        # Signatures of the answer by mode, see signature()
+        self.signatures = {}
+
+        # Where to write the state back to when more of it is computed
+        self.disk_key = None
+
+        # Most responses use exactly the answer's variables, so its truth table
+        # over those is precomputed when it is small enough to enumerate.
+        self.table = None
+        if state is not None:
+            self.table = None if state["table"] is None else int(state["table"], 16)
+            if state["canonical"] is not None:
+                self.__dict__["canonical"] = state["canonical"]
+            self.signatures = {mode: signature_from_json(key) for mode, key in state["signatures"].items()}
+        elif len(self.names) <= truth_table.MAX_VARIABLES:
+            self.table = truth_table.truth_table(expr, self.names)
+
+        # Tables over other sets of variables (responses that use variables
+        # the answer doesn't) are kept for the last few sets seen.
+        self.extra_tables = {}
+
+        # Indexes of the answer and the known responses to it, see index()
+        self.indexes = {}
+
+    def truth_table(self, names: list[str]) -> int:
+        if self.table is not None and names == self.names:
+            return self.table
+
+        key = tuple(names)
+        table = self.extra_tables.get(key)
+        if table is None:
+            table = self.evaluate(*truth_table.variable_masks(names))
+            if len(self.extra_tables) >= MAX_EXTRA_TABLES:
+                self.extra_tables.clear()
+            self.extra_tables[key] = table
+        return table
+
+    def index(self, mode: str, known_responses: list[dict]) -> SignatureIndex:
+        """
+        The answer and the `known_responses` param of a question, indexed by
+        signature. Each known response's entry is the dict describing it,
+        and the answer's is {"is_correct": True}. The answer takes precedence
+        over a known response computing the same function. Entries that
+        aren't valid are left out, and described in the index's `errors`.
+        They are problems with the question rather than the response, so
+        they are logged and counted as known_response_invalid (once for each
+        index built) instead of being shown to the student.
+        """
+        key = (mode, json.dumps(known_responses, sort_keys=True))
+        index = self.indexes.get(key)
+        if index is None:
+            index = SignatureIndex(mode)
+            if not isinstance(known_responses, list):
+                index.errors.append("known_responses is not a list")
+                known_responses = []
+            for i, known in enumerate(known_responses, 1):
+                if not isinstance(known, dict) or not isinstance(known.get("response"), str):
+                    index.errors.append(f"known response {i} is not an object with a \"response\" expression")
+                    continue
+                try:
+                    expr = parse_expression(known["response"], NONE_DISALLOWED)
+                except FeedbackException as e:
+                    index.errors.append(f"known response {i} could not be parsed: {e}")
+                    continue
+                index.add(expr, known)
+            for error in index.errors:
+                metrics.increment("known_response_invalid")
+                logger.warning("ignoring an entry of known_responses: %s", error)
+            own = self.signature(mode)
+            if own is not None:
+                index.insert(own, {"is_correct": True})
+            if len(self.indexes) >= MAX_EXTRA_TABLES:
+                self.indexes.clear()
+            self.indexes[key] = index
+        return index
+
+    def signature(self, mode: str) -> Optional[tuple]:
+        if mode not in self.signatures:
+            self.signatures[mode] = signature(self.expr, mode)
+            self.save()
+        return self.signatures[mode]
+
+    def state(self) -> dict:
+        """
+        What has been computed from the answer, in a form that can be stored
+        as JSON. Parts that haven't been computed yet are left out. Truth
+        tables are written in hex, since JSON numbers (and Python's decimal
+        conversion) can't hold tables of more than a few thousand rows.
+        """
+        return {
+            "table": None if self.table is None else format(self.table, "x"),
+            "canonical": self.__dict__.get("canonical"),
+            "signatures": {mode: signature_to_json(key) for mode, key in self.signatures.items()},
+        }
+
+    def save(self):
+        # Write the state back to the disk cache as more of it is computed
+        if self.disk_key is not None:
+            DISK_CACHE.put(self.disk_key, self.state())
+
+    # The sympy form is only needed if the exact methods can't decide a
+    # comparison, and the canonical form only for questions that enforce
+    # expression equality, so both are built on first use.
+    @cached_property
+    def sympy(self):
+        return conv_expr(self.expr)
+
+    @cached_property
+    def canonical(self) -> str:
+        self.__dict__["canonical"] = canonical_form(self.expr)
+        self.save()
+        return self.__dict__["canonical"]
+
+    def size(self) -> int:
+        # A rough estimate: the parsed (and any sympy) forms are proportional
+        # to the length of the answer, plus the truth table itself.
+        return 512 * len(str(self.expr)) + sys.getsizeof(self.table)
+
+
+def signature_to_json(key: Optional[tuple]) -> Optional[list]:
+    # A signature is (mode, names or number of variables, table)
+    if key is None:
+        return None
+    mode, variables, table = key
+    return [mode, variables, format(table, "x")]
+
+
+def signature_from_json(value: Optional[list]) -> Optional[tuple]:
+    # JSON turns the tuple of names into a list
+    if value is None:
+        return None
+    mode, variables, table = value
+    return (mode, tuple(variables) if isinstance(variables, list) else variables, int(table, 16))
+
+
+def disallowed_key(disallowed: dict) -> tuple[str, ...]:
+    return tuple(sorted(op for op, value in disallowed.items() if value))
+
+
+def compile_answer(answer: str, disallowed: dict) -> CompiledAnswer:
+    key = (answer, disallowed_key(disallowed))
+    compiled = ANSWER_CACHE.get(key)
+    metrics.count("answer_cache_miss" if compiled is None else "answer_cache_hit")
+    if compiled is None:
+        # Parse errors are raised to the caller and are not cached
+        expr = parse_expression(answer, disallowed, latex=False)
+
+        # Other processes may have compiled the same answer before; the
+        # answer is parsed anyway, to check it and to share its nodes
+        if DISK_CACHE is not None:
+            disk_key = f"answer:{','.join(key[1])}:{''.join(answer.split())}"
+            state = DISK_CACHE.get(disk_key)
+            metrics.count("disk_cache_miss" if state is None else "disk_cache_hit")
+            compiled = CompiledAnswer(expr, state)
+            compiled.disk_key = disk_key
+            if state is None:
+                DISK_CACHE.put(disk_key, compiled.state())
+        else:
+            compiled = CompiledAnswer(expr)
+        ANSWER_CACHE.put(key, compiled, compiled.size())
+    return compiled
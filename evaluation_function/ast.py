@@ -1,16 +1,66 @@
-class Term:
-    def __init__(self, term, op: bool = False):
-        self.term = term
-        self.op = op
+from threading import Lock
+from weakref import WeakValueDictionary
+
+# Every node in the tree is interned: constructing a node equal to one that
+# already exists returns the existing node, so repeated subexpressions such as
+# ~(A & B) are only stored once. Nodes are therefore immutable, two nodes are
+# equal exactly when they are the same object, and each node's hash is computed
+# once when it is created.
+#
+# A node is looked up by the identities of its children, which stay valid for
+# as long as the node itself is in the table.
+_NODES = WeakValueDictionary()
+_LOCK = Lock()
+
+
+class Node:
+    __slots__ = ("_hash", "__weakref__")
+
+    def __new__(cls, key: tuple, *fields):
+        node = _NODES.get(key)
+        if node is None:
+            with _LOCK:
+                node = _NODES.get(key)
+                if node is None:
+                    node = object.__new__(cls)
+                    for name, value in zip(cls.__slots__, fields):
+                        object.__setattr__(node, name, value)
+                    object.__setattr__(node, "_hash", hash(key))
+                    _NODES[key] = node
+        return node
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self):
+        return type(self), tuple(getattr(self, name) for name in type(self).__slots__)
+
+
+class Term(Node):
+    __slots__ = ("term", "op")
+
+    def __new__(cls, term, op: bool = False):
+        op = bool(op)
+        key = (cls, term if isinstance(term, str) else id(term), op)
+        return super().__new__(cls, key, term, op)
 
     def __str__(self) -> str:
+        return self._str(render([self]))
+
+    def _str(self, rendered: dict) -> str:
         out = "" if not self.op else "~"
         if isinstance(self.term, str):
             return out + self.term
         else:
-            return out + f"({str(self.term)})"
-    
+            return out + f"({rendered[id(self.term)]})"
+
     def to_latex(self) -> str:
+        return self._latex(render([self], latex=True))
+
+    def _latex(self, rendered: dict) -> str:
         out = ""
         if isinstance(self.term, str):
             if len(self.term) == 1:
@@ -18,47 +68,125 @@ class Term:
             else:
                 out += f"\\mathrm{{{self.term}}}"
         else:
-            out += f"\\left( {self.term.to_latex()} \\right)"
+            out += f"\\left( {rendered[id(self.term)]} \\right)"
         if self.op:
             return f"\\overline{{{out}}}"
         else:
             return out
 
 
-class Prod:
-    def __init__(self, left: Term, right: list[Term] = None):
-        self.left = left
-        self.right = right
-    
+class Prod(Node):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left: Term, right: tuple[Term, ...] = ()):
+        right = tuple(right)
+        key = (cls, id(left), *map(id, right))
+        return super().__new__(cls, key, left, right)
+
+    def terms(self) -> list[Term]:
+        return [self.left, *self.right]
+
     def __str__(self) -> str:
-        out = str(self.left)
+        return self._str(render(self.terms()))
+
+    def _str(self, rendered: dict) -> str:
+        out = self.left._str(rendered)
         for right in self.right:
-            out += f" & {str(right)}"
+            out += f" & {right._str(rendered)}"
         return out
 
     def to_latex(self) -> str:
-        out = self.left.to_latex()
+        return self._latex(render(self.terms(), latex=True))
+
+    def _latex(self, rendered: dict) -> str:
+        out = self.left._latex(rendered)
         for term in self.right:
             out += " \\cdot "
-            out += term.to_latex()
+            out += term._latex(rendered)
         return out
 
 
-class Expr:
-    def __init__(self, left: Prod, right: list[bool, Prod] = None):
-        self.left = left
-        self.right = right
-    
+class Expr(Node):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left: Prod, right: tuple[tuple[bool, Prod], ...] = ()):
+        right = tuple((bool(xor), prod) for xor, prod in right)
+        key = (cls, id(left), *[(xor, id(prod)) for xor, prod in right])
+        return super().__new__(cls, key, left, right)
+
+    def prods(self) -> list[Prod]:
+        return [self.left, *(prod for _, prod in self.right)]
+
+    def terms(self) -> list[Term]:
+        return [term for prod in self.prods() for term in prod.terms()]
+
     def __str__(self) -> str:
-        out = str(self.left)
+        return self._str(render(self.terms()))
+
+    def _str(self, rendered: dict) -> str:
+        out = self.left._str(rendered)
         for xor, right in self.right:
-            out += f" {'^' if xor else '|'} {str(right)}"
+            out += f" {'^' if xor else '|'} {right._str(rendered)}"
         return out
-    
+
     def to_latex(self) -> str:
-        out = self.left.to_latex()
+        return self._latex(render(self.terms(), latex=True))
+
+    def _latex(self, rendered: dict) -> str:
+        out = self.left._latex(rendered)
         for xor, prod in self.right:
             out += " \\oplus " if xor else " + "
-            out += prod.to_latex()
-        
+            out += prod._latex(rendered)
+
         return out
+
+
+def subexpressions(expr: Expr) -> list[Expr]:
+    """
+    Every expression nested in `expr` (in brackets), including `expr` itself,
+    ordered so that each one comes after all of the expressions inside it.
+    This lets the tree be processed bottom-up without recursion, however deep
+    the brackets are nested. Shared subexpressions are only listed once.
+    """
+    order = []
+    seen = set()
+    stack = [(expr, False)]
+    while stack:
+        expr, expanded = stack.pop()
+        if expanded:
+            order.append(expr)
+        elif expr not in seen:
+            seen.add(expr)
+            stack.append((expr, True))
+            for term in expr.terms():
+                if not isinstance(term.term, str) and term.term not in seen:
+                    stack.append((term.term, False))
+    return order
+
+
+def iter_terms(expr: Expr):
+    """
+    Yield every term in `expr`, including those nested in brackets, in the
+    order they appear in the expression.
+    """
+    stack = [iter(expr.terms())]
+    while stack:
+        for term in stack[-1]:
+            yield term
+            if not isinstance(term.term, str):
+                stack.append(iter(term.term.terms()))
+                break
+        else:
+            stack.pop()
+
+
+def render(terms: list[Term], latex: bool = False) -> dict:
+    # Render the expressions nested in `terms`, innermost first, so that each
+    # one can use the rendering of the expressions inside it.
+    rendered = {}
+    for term in terms:
+        if not isinstance(term.term, str):
+            for expr in subexpressions(term.term):
+                if id(expr) not in rendered:
+                    rendered[id(expr)] = expr._latex(rendered) if latex else expr._str(rendered)
+    return rendered
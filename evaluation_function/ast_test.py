@@ -0,0 +1,46 @@
+import gc
+import pickle
+import unittest
+
+from .ast import _NODES, Prod, Term, subexpressions
+from .testing import parse
+
+
+class TestAst(unittest.TestCase):
+
+    def test_interned(self):
+        self.assertIs(Term("A"), Term("A"))
+        self.assertIsNot(Term("A"), Term("A", True))
+        self.assertIs(parse("A & ~(B | C)"), parse("A  &  ~(B|C)"))
+        self.assertIsNot(parse("A & B"), parse("B & A"))
+        self.assertEqual(len({parse("A ^ B"), parse("A^B"), parse("A | B")}), 2)
+
+    def test_shared_subexpressions(self):
+        expr = parse("~(~(A & ~(A & B)) & ~(B & ~(A & B)))")
+        nand = expr.left.left.term.left.left.term.left.right[0]
+
+        self.assertIs(nand, expr.left.left.term.left.right[0].term.left.right[0])
+        # ~(A & B) is only listed once
+        self.assertEqual(len(subexpressions(expr)), 5)
+        self.assertEqual(str(expr), "~(~(A & ~(A & B)) & ~(B & ~(A & B)))")
+
+    def test_immutable(self):
+        term = Term("A")
+        with self.assertRaises(AttributeError):
+            term.op = True
+        with self.assertRaises(AttributeError):
+            term.extra = 1
+        self.assertIsInstance(Prod(term, [term]).right, tuple)
+
+    def test_released(self):
+        size = len(_NODES)
+        parse("unused_1 & unused_2 | unused_3")
+        gc.collect()
+        self.assertEqual(len(_NODES), size)
+
+    def test_pickle(self):
+        expr = parse("A & ~(B ^ C) | D")
+        copy = pickle.loads(pickle.dumps(expr))
+
+        self.assertIs(copy, expr)
+        self.assertEqual(hash(copy), hash(expr))
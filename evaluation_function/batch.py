@@ -0,0 +1,99 @@
+from typing import Any
+from lf_toolkit.evaluation import Result, Params
+
+from .answer import compile_answer
+from .budget import Budget, BudgetExceeded
+from .evaluation import (
+    RESULT_CACHE, compare_tables, equivalence_key, get_disallowed, grade, make_result, params_key, signature_mode,
+)
+from .parse import parse_expression, FeedbackException
+from . import metrics
+
+def batch_evaluation_function(
+    responses: list[Any],
+    answer: Any,
+    params: Params,
+) -> list[Result]:
+    """
+    Function used to evaluate many student responses to the same question.
+    ---
+    Returns one result per response, in the same order, each identical to
+    what evaluation_function() would return for that response.
+
+    The answer is compiled once for the whole batch, responses that would
+    share a cached result in evaluation_function() are graded once, and the
+    truth tables of the distinct responses are compared with the answer's
+    in one pass.
+    """
+
+    # time each stage of the batch, if instrumentation is turned on
+    with metrics.request("batch"):
+        metrics.record("responses", len(responses))
+
+        disallowed = get_disallowed(params.get("disallowed", []))
+
+        compiled_answer, answer_error = None, None
+        try:
+            compiled_answer = compile_answer(answer, disallowed)
+        except FeedbackException as e:
+            answer_error = e
+
+        key_params = params_key(params)
+        verdicts = {}
+        errors = {}
+
+        # Parse each response and look up its verdict, keeping the first of
+        # the distinct responses still to be graded
+        entries = []
+        pending = {}
+        for response in responses:
+            try:
+                response_set = parse_expression(response, disallowed, latex=params.get("is_latex", False))
+                if answer_error is not None:
+                    raise answer_error
+
+                key = (equivalence_key(response_set, params, Budget.from_params(params)), answer, key_params)
+                if key not in verdicts and key not in pending:
+                    verdict = RESULT_CACHE.get(key)
+                    metrics.count("result_cache_miss" if verdict is None else "result_cache_hit")
+                    if verdict is None:
+                        pending[key] = response_set
+                    else:
+                        verdicts[key] = verdict
+                entries.append((response_set, key))
+            except FeedbackException as e:
+                entries.append(e)
+
+        # Compare the pending responses with the answer together, unless they
+        # are first looked up by signature
+        keys = list(pending)
+        compared = [None] * len(keys)
+        if signature_mode(params) == "exact" and not params.get("known_responses"):
+            compared = compare_tables([pending[key] for key in keys], compiled_answer)
+        for key, result in zip(keys, compared):
+            try:
+                verdict = grade(pending[key], compiled_answer, params, Budget.from_params(params), result)
+                RESULT_CACHE.put(key, verdict)
+                verdicts[key] = verdict
+            except BudgetExceeded as e:
+                metrics.increment(f"budget_exceeded_{e.reason}")
+                errors[key] = e
+
+        results = []
+        for entry in entries:
+            if isinstance(entry, FeedbackException):
+                results.append(Result(
+                    is_correct=False,
+                    feedback_items=[("parse_error", str(entry))]
+                ))
+                continue
+            response_set, key = entry
+            if key in errors:
+                results.append(Result(
+                    is_correct=False,
+                    feedback_items=[("complexity", str(errors[key]))]
+                ))
+            else:
+                results.append(make_result(response_set, verdicts[key], Budget.from_params(params)))
+
+        return results
@@ -0,0 +1,65 @@
+import unittest
+
+from .batch import Params, batch_evaluation_function
+from . import metrics
+
+
+class TestBatchEvaluationFunction(unittest.TestCase):
+
+    def test_results_in_order(self):
+        responses = ["A & B", "A | B", "B&A", "A £ B", "~(~A | ~B)"]
+
+        results = [r.to_dict() for r in batch_evaluation_function(responses, "A & B", Params())]
+
+        self.assertEqual([r.get("is_correct") for r in results], [True, False, True, False, True])
+        self.assertEqual(results[0].get("response_latex"), "A \\cdot B")
+        self.assertEqual(results[2].get("response_latex"), "B \\cdot A")
+        self.assertTrue(results[3].get("feedback"))
+
+    def test_matches_single_evaluation(self):
+        from .evaluation import evaluation_function
+
+        params = Params({"enforce_expression_equality": True})
+        responses = ["B & A", "~(~A | ~B)", "A & B & C"]
+
+        batch = [r.to_dict() for r in batch_evaluation_function(responses, "A & B", params)]
+        single = [evaluation_function(r, "A & B", params).to_dict() for r in responses]
+
+        self.assertEqual(batch, single)
+
+    def test_invalid_answer(self):
+        params = Params({"disallowed": ["or"]})
+
+        results = batch_evaluation_function(["A", "B"], "A | B", params)
+
+        self.assertEqual(len(results), 2)
+        self.assertFalse(any(r.to_dict().get("is_correct") for r in results))
+
+    def test_many_responses(self):
+        responses = [f"A {'&' if i % 2 else '|'} B" for i in range(5000)]
+
+        results = batch_evaluation_function(responses, "A | B", Params())
+
+        self.assertEqual(len(results), 5000)
+        self.assertTrue(all(r.to_dict().get("is_correct") == (i % 2 == 0) for i, r in enumerate(results)))
+
+    def test_tables_match_single_evaluation(self):
+        from .evaluation import evaluation_function
+
+        params = Params({"show_counterexample": True})
+        wide = " | ".join(f"x{i}" for i in range(20))
+        responses = ["A ^ B", "A & ~B | ~A & B", "A | B", "A ^ B ^ C", "~A", wide, "A ^ B"]
+
+        batch = [r.to_dict() for r in batch_evaluation_function(responses, "A ^ B", params)]
+        single = [evaluation_function(r, "A ^ B", params).to_dict() for r in responses]
+
+        self.assertEqual(batch, single)
+
+    def test_budget_exceeded(self):
+        before = metrics.counters().get("budget_exceeded_complexity", 0)
+
+        # With the answer's 3 nodes, only the first response is over budget
+        results = batch_evaluation_function(["A & B | C", "A"], "A", Params({"complexity_budget": 8}))
+
+        self.assertEqual([r.to_dict().get("is_correct") for r in results], [False, True])
+        self.assertEqual(metrics.counters()["budget_exceeded_complexity"], before + 1)
@@ -0,0 +1,187 @@
+from typing import Optional
+
+from .ast import Expr, Prod, Term, iter_terms, subexpressions
+from .budget import Budget
+
+# Upper bound on the number of nodes a single diagram may allocate. Some
+# functions have exponentially large diagrams under any variable order, so
+# this keeps one pathological response from exhausting memory.
+MAX_NODES = 200_000
+
+FALSE = 0
+TRUE = 1
+
+# How many ITE computations happen between checks of the time budget
+CHECK_INTERVAL = 4096
+
+
+class BDDLimitError(Exception):
+
+    def __init__(self, limit: int):
+        self.limit = limit
+    def __str__(self) -> str:
+        return f"decision diagram exceeded {self.limit} nodes"
+
+
+def variable_order(*exprs: Expr) -> list[str]:
+    # Order variables by their first appearance in a depth-first walk of the
+    # expressions. Variables that are combined with each other end up close
+    # together in the order, which tends to keep the diagram small.
+    order = {}
+    for expr in exprs:
+        for term in iter_terms(expr):
+            if isinstance(term.term, str):
+                order.setdefault(term.term, len(order))
+    return list(order)
+
+
+class BDD:
+    """
+    A reduced ordered binary decision diagram manager.
+
+    Nodes are identified by integers: 0 and 1 are the terminals, every other
+    node is an index into `self.nodes`. The unique table guarantees that each
+    (variable, low, high) triple is allocated once, so two functions built in
+    the same manager are equivalent iff their root nodes are equal.
+    """
+
+    def __init__(self, order: list[str], max_nodes: int = MAX_NODES, budget: Optional[Budget] = None):
+        self.order = order
+        self.level = {name: i for i, name in enumerate(order)}
+        self.max_nodes = max_nodes
+        terminal = len(order)
+        self.nodes = [(terminal, FALSE, FALSE), (terminal, TRUE, TRUE)]
+        self.unique = {}
+        self.ite_cache = {}
+        self.budget = budget
+        self.steps = 0
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def mk(self, level: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            if len(self.nodes) >= self.max_nodes:
+                raise BDDLimitError(self.max_nodes)
+            node = len(self.nodes)
+            self.nodes.append(key)
+            self.unique[key] = node
+        return node
+
+    def var(self, name: str) -> int:
+        return self.mk(self.level[name], FALSE, TRUE)
+
+    def cofactors(self, node: int, level: int) -> tuple[int, int]:
+        node_level, low, high = self.nodes[node]
+        if node_level == level:
+            return low, high
+        return node, node
+
+    def ite(self, f: int, g: int, h: int) -> int:
+        # Terminal cases
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+
+        key = (f, g, h)
+        result = self.ite_cache.get(key)
+        if result is not None:
+            return result
+
+        self.steps += 1
+        if self.budget is not None and self.steps % CHECK_INTERVAL == 0:
+            self.budget.check()
+
+        level = min(self.nodes[f][0], self.nodes[g][0], self.nodes[h][0])
+        f0, f1 = self.cofactors(f, level)
+        g0, g1 = self.cofactors(g, level)
+        h0, h1 = self.cofactors(h, level)
+        result = self.mk(level, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+
+        self.ite_cache[key] = result
+        return result
+
+    def negate(self, f: int) -> int:
+        return self.ite(f, FALSE, TRUE)
+
+    def conj(self, f: int, g: int) -> int:
+        return self.ite(f, g, FALSE)
+
+    def disj(self, f: int, g: int) -> int:
+        return self.ite(f, TRUE, g)
+
+    def xor(self, f: int, g: int) -> int:
+        return self.ite(f, self.negate(g), g)
+
+    def from_term(self, term: Term, built: dict) -> int:
+        if isinstance(term.term, str):
+            out = self.var(term.term)
+        else:
+            out = built[id(term.term)]
+        return self.negate(out) if term.op else out
+
+    def from_prod(self, prod: Prod, built: dict) -> int:
+        out = self.from_term(prod.left, built)
+        for term in prod.right:
+            out = self.conj(out, self.from_term(term, built))
+        return out
+
+    def from_chain(self, expr: Expr, built: dict) -> int:
+        out = self.from_prod(expr.left, built)
+        for xor, prod in expr.right:
+            if xor:
+                out = self.xor(out, self.from_prod(prod, built))
+            else:
+                out = self.disj(out, self.from_prod(prod, built))
+        return out
+
+    def satisfying(self, node: int) -> dict[str, bool]:
+        # An assignment on which `node` is true, which must not be FALSE.
+        # Every other node has a path to TRUE, so one is followed down, and
+        # the variables it skips are set false.
+        assignment = {name: False for name in self.order}
+        while node != TRUE:
+            level, low, high = self.nodes[node]
+            if low != FALSE:
+                node = low
+            else:
+                assignment[self.order[level]] = True
+                node = high
+        return assignment
+
+    def from_expr(self, expr: Expr) -> int:
+        # Build the innermost bracketed expressions first
+        built = {}
+        for nested in subexpressions(expr):
+            built[id(nested)] = self.from_chain(nested, built)
+        return built[id(expr)]
+
+
+def equivalent(
+    left: Expr, right: Expr, max_nodes: int = MAX_NODES, budget: Optional[Budget] = None,
+) -> tuple[Optional[bool], Optional[dict[str, bool]]]:
+    """
+    Compare two expressions by building both in one diagram. Returns whether
+    they are equivalent, or None if the diagram grows beyond `max_nodes`, and
+    an assignment on which they differ if they aren't. Raises BudgetExceeded
+    if the time budget runs out.
+    """
+    bdd = BDD(variable_order(left, right), max_nodes=max_nodes, budget=budget)
+    try:
+        left_node, right_node = bdd.from_expr(left), bdd.from_expr(right)
+        if left_node == right_node:
+            return True, None
+        return False, bdd.satisfying(bdd.xor(left_node, right_node))
+    except (BDDLimitError, RecursionError):
+        # ITE recurses once per variable, which is too deep for diagrams
+        # over thousands of variables.
+        return None, None
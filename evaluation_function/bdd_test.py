@@ -0,0 +1,45 @@
+import unittest
+
+from .bdd import BDD, BDDLimitError, FALSE, TRUE, equivalent, variable_order
+from .testing import parse
+from . import truth_table
+
+
+class TestBDD(unittest.TestCase):
+
+    def test_canonical(self):
+        bdd = BDD(["A", "B", "C"])
+        left = bdd.from_expr(parse("A & (B | C)"))
+        right = bdd.from_expr(parse("A & C | B & A"))
+        self.assertEqual(left, right)
+        self.assertNotEqual(left, bdd.from_expr(parse("A | B & C")))
+
+    def test_terminals(self):
+        bdd = BDD(["A"])
+        self.assertEqual(bdd.from_expr(parse("A | ~A")), TRUE)
+        self.assertEqual(bdd.from_expr(parse("A & ~A")), FALSE)
+        self.assertEqual(len(bdd), 4)
+
+    def test_variable_order(self):
+        self.assertEqual(variable_order(parse("C & (A | B)"), parse("D | A")), ["C", "A", "B", "D"])
+
+    def test_wide_equivalence(self):
+        # 24-bit equality comparator written two different ways
+        left = parse(" & ".join(f"~(a{i} ^ b{i})" for i in range(24)))
+        right = parse("~(" + " | ".join(f"(a{i} & ~b{i} | ~a{i} & b{i})" for i in range(24)) + ")")
+        self.assertEqual(equivalent(left, right), (True, None))
+        self.assertFalse(equivalent(left, parse(" & ".join(f"~(a{i} ^ b{i})" for i in range(23))))[0])
+
+    def test_witness(self):
+        left = parse(" & ".join(f"~(a{i} ^ b{i})" for i in range(24)))
+        right = parse(" & ".join(f"~(a{i} ^ b{i})" for i in range(23)))
+        equal, witness = equivalent(left, right)
+        self.assertFalse(equal)
+        self.assertEqual(len(witness), 48)
+        self.assertNotEqual(truth_table.evaluate(left, witness), truth_table.evaluate(right, witness))
+
+    def test_node_limit(self):
+        expr = parse(" ^ ".join(f"x{i}" for i in range(32)))
+        with self.assertRaises(BDDLimitError):
+            BDD(variable_order(expr), max_nodes=16).from_expr(expr)
+        self.assertEqual(equivalent(expr, expr, max_nodes=16), (None, None))
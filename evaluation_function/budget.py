@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import time
+from typing import Callable, Optional
+
+from .ast import Expr, subexpressions
+from . import metrics
+
+# Limits on the work done for a single request. Questions can lower these
+# through the `time_budget` and `complexity_budget` params, but not raise them.
+TIME_BUDGET = float(os.environ.get("EVAL_TIME_BUDGET", 10))
+COMPLEXITY_BUDGET = int(os.environ.get("EVAL_COMPLEXITY_BUDGET", 50_000))
+
+
+class BudgetExceeded(Exception):
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+    def __str__(self) -> str:
+        return "The expression is too complex to evaluate."
+
+
+def _limit_param(params: dict, name: str, convert: Callable, default):
+    # Values that aren't non-negative numbers are ignored
+    value = params.get(name, default)
+    if isinstance(value, bool):
+        return default
+    try:
+        value = convert(value)
+    except (TypeError, ValueError, OverflowError):
+        return default
+    if not value >= 0:
+        return default
+    return value
+
+
+class Budget:
+
+    def __init__(self, seconds: Optional[float] = None, max_nodes: Optional[int] = None):
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+        self.max_nodes = max_nodes
+
+    @classmethod
+    def from_params(cls, params: dict) -> "Budget":
+        seconds = min(_limit_param(params, "time_budget", float, TIME_BUDGET), TIME_BUDGET)
+        max_nodes = min(_limit_param(params, "complexity_budget", int, COMPLEXITY_BUDGET), COMPLEXITY_BUDGET)
+        return cls(seconds, max_nodes)
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def check(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise BudgetExceeded("time")
+
+    def check_size(self, *exprs: Expr):
+        if self.max_nodes is None and not metrics.ENABLED:
+            return
+        size = sum(count_nodes(expr) for expr in exprs)
+        metrics.record("ast_nodes", size)
+        if self.max_nodes is not None and size > self.max_nodes:
+            raise BudgetExceeded("complexity")
+
+    def call(self, func: Callable, *args):
+        """
+        Call `func(*args)` in a separate process, killing it if it is still
+        running when the budget runs out. This is used for work that can't
+        check the budget itself, e.g. sympy's simplification.
+        """
+        timeout = self.remaining()
+        if timeout is None:
+            return func(*args)
+
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_send_result, args=(sender, func, args), daemon=True)
+        process.start()
+        sender.close()
+        try:
+            if not receiver.poll(timeout):
+                raise BudgetExceeded("time")
+            try:
+                ok, value = receiver.recv()
+            except EOFError:
+                # The process died without a result, e.g. it ran out of memory
+                raise BudgetExceeded("complexity")
+            if not ok:
+                raise value
+            return value
+        finally:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+            receiver.close()
+
+
+def _send_result(sender, func: Callable, args: tuple):
+    try:
+        result = (True, func(*args))
+    except Exception as e:
+        result = (False, e)
+    sender.send(result)
+    sender.close()
+
+
+def count_nodes(expr: Expr) -> int:
+    count = 0
+    for nested in subexpressions(expr):
+        prods = nested.prods()
+        count += 1 + len(prods) + sum(len(prod.terms()) for prod in prods)
+    return count
@@ -0,0 +1,56 @@
+import pickle
+import time
+import unittest
+
+from .budget import COMPLEXITY_BUDGET, Budget, BudgetExceeded, count_nodes
+from .testing import parse
+from . import bdd
+
+
+class TestBudget(unittest.TestCase):
+
+    def test_count_nodes(self):
+        # expr, prod, term
+        self.assertEqual(count_nodes(parse("A")), 3)
+        self.assertEqual(count_nodes(parse("A & B | ~(C)")), 9)
+
+    def test_complexity(self):
+        with self.assertRaises(BudgetExceeded) as cm:
+            Budget(max_nodes=5).check_size(parse("A & B | C"))
+        self.assertEqual(cm.exception.reason, "complexity")
+
+    def test_pickles(self):
+        # Raised in the process sympy runs in, and in pool workers
+        e = pickle.loads(pickle.dumps(BudgetExceeded("time")))
+        self.assertEqual(e.reason, "time")
+        self.assertEqual(str(e), "The expression is too complex to evaluate.")
+
+    def test_from_params_cannot_raise_limits(self):
+        budget = Budget.from_params({"time_budget": 1e9, "complexity_budget": 10})
+        self.assertLess(budget.remaining(), 1e9)
+        self.assertEqual(budget.max_nodes, 10)
+
+    def test_from_params_invalid(self):
+        for value in ["abc", None, [], float("nan"), -1, True, float("inf")]:
+            budget = Budget.from_params({"time_budget": value, "complexity_budget": value})
+            self.assertGreater(budget.remaining(), 0, value)
+            self.assertEqual(budget.max_nodes, COMPLEXITY_BUDGET, value)
+        self.assertEqual(Budget.from_params({"complexity_budget": "20"}).max_nodes, 20)
+
+    def test_call(self):
+        self.assertEqual(Budget(seconds=5).call(pow, 2, 10), 1024)
+        self.assertEqual(Budget().call(pow, 2, 10), 1024)
+
+    def test_call_timeout(self):
+        start = time.monotonic()
+        with self.assertRaises(BudgetExceeded):
+            Budget(seconds=0.2).call(time.sleep, 10)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_bdd_checks_budget(self):
+        # Pairing each variable with one far away in the order makes the
+        # diagram exponentially large, so the budget runs out first.
+        names = [f"x{i}" for i in range(24)]
+        expr = parse(" | ".join(f"{a} & {b}" for a, b in zip(names[:12], names[12:])))
+        with self.assertRaises(BudgetExceeded):
+            bdd.BDD(names, budget=Budget(seconds=0)).from_expr(expr)
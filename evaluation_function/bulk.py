@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from lf_toolkit.evaluation import Params
+
+from .batch import batch_evaluation_function
+from .warmup import warm_up
+
+# Offline grading of a JSON Lines file of submissions, e.g. to regrade an
+# exam after fixing its answer key, without a request per submission:
+#
+#   evaluation_function bulk submissions.jsonl -o results.jsonl
+#
+# Each input line is an object with a `response`, an `answer` and optionally
+# `params` and an `id`. Each output line, in the same order, is the `id` (if
+# any) and either the `result` evaluation_function() would have returned or
+# an `error` if the line couldn't be read.
+#
+# Lines are read, graded and written as a stream of chunks. Each chunk is
+# graded in a worker process, where lines with the same answer and params
+# are graded together with batch_evaluation_function(). Only a few chunks
+# per worker are in flight at once, so memory use doesn't grow with the
+# size of the file.
+CHUNK_SIZE = 256
+
+# Chunks submitted to the pool per worker ahead of the one being written
+CHUNKS_IN_FLIGHT = 2
+
+
+def read_records(lines: Iterable[str]) -> Iterator[tuple[Optional[dict], Optional[str]]]:
+    # Yields each record, or an error describing why it couldn't be read
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield None, f"line {number}: {e}"
+            continue
+        if not isinstance(record, dict) or "response" not in record or "answer" not in record:
+            yield None, f"line {number}: expected an object with a response and an answer"
+        else:
+            yield record, None
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def grade_chunk(chunk: list[tuple[Optional[dict], Optional[str]]]) -> list[dict]:
+    lines: list[Optional[dict]] = [None] * len(chunk)
+    groups = {}
+    for i, (record, error) in enumerate(chunk):
+        if error is not None:
+            lines[i] = {"error": error}
+        else:
+            key = json.dumps([record["answer"], record.get("params", {})], sort_keys=True, default=str)
+            groups.setdefault(key, []).append(i)
+
+    for indices in groups.values():
+        first = chunk[indices[0]][0]
+        try:
+            results = batch_evaluation_function(
+                [chunk[i][0]["response"] for i in indices],
+                first["answer"],
+                Params(first.get("params", {})),
+            )
+            for i, result in zip(indices, results):
+                lines[i] = {"result": result.to_dict()}
+        except Exception as e:
+            # e.g. params of the wrong type; the other groups are unaffected
+            for i in indices:
+                lines[i] = {"error": f"{type(e).__name__}: {e}"}
+
+    for i, (record, _) in enumerate(chunk):
+        if record is not None and "id" in record:
+            lines[i] = {"id": record["id"], **lines[i]}
+    return lines
+
+
+def grade_stream(records: Iterable, workers: int, chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Grade `records` (from read_records()) in `workers` processes, or in this
+    one if it is 0, yielding the output lines in order.
+    """
+    chunks = chunked(records, chunk_size)
+    if workers == 0:
+        for chunk in chunks:
+            yield from grade_chunk(chunk)
+        return
+
+    # Grading responses rarely needs sympy, so the workers don't import it
+    # until they do
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_up, initargs=(False,)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(grade_chunk, chunk))
+            if len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="evaluation_function bulk",
+        description="Grade a JSON Lines file of {response, answer, params} records.",
+    )
+    parser.add_argument("input", help="file to read, or - for standard input")
+    parser.add_argument("-o", "--output", default="-", help="file to write, or - for standard output")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes, 0 to grade in this one")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="records sent to a worker at once")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    count = 0
+    with nullcontext(sys.stdin) if args.input == "-" else open(args.input) as input:
+        with nullcontext(sys.stdout) if args.output == "-" else open(args.output, "w") as output:
+            for line in grade_stream(read_records(input), args.workers, args.chunk_size):
+                output.write(json.dumps(line, default=str) + "\n")
+                count += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"graded {count} records in {elapsed:.2f}s ({count / elapsed:.1f} records/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
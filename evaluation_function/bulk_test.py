@@ -0,0 +1,62 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+from .bulk import chunked, grade_chunk, grade_stream, main, read_records
+
+
+def records(*lines) -> list:
+    return list(read_records(json.dumps(line) if isinstance(line, dict) else line for line in lines))
+
+
+class TestBulk(unittest.TestCase):
+
+    def test_read_records(self):
+        read = records({"response": "A", "answer": "A"}, "", "{", {"response": "A"})
+
+        self.assertEqual(len(read), 3)
+        self.assertEqual(read[0], ({"response": "A", "answer": "A"}, None))
+        self.assertTrue(read[1][1].startswith("line 3:"))
+        self.assertEqual(read[2][1], "line 4: expected an object with a response and an answer")
+
+    def test_chunked(self):
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunked([], 2)), [])
+
+    def test_grade_chunk_in_order(self):
+        lines = grade_chunk(records(
+            {"id": "a", "response": "A & B", "answer": "A & B"},
+            {"id": "b", "response": "A", "answer": "A | B"},
+            "not json",
+            {"id": "c", "response": "B & A", "answer": "A & B"},
+            {"id": "d", "response": "A £ B", "answer": "A | B"},
+        ))
+
+        self.assertEqual([line.get("id") for line in lines], ["a", "b", None, "c", "d"])
+        self.assertEqual([line.get("result", {}).get("is_correct") for line in lines], [True, False, None, True, False])
+        self.assertIn("error", lines[2])
+
+    def test_workers_match(self):
+        read = records(*[{"id": i, "response": "A | B" if i % 3 else "A", "answer": ["A", "A | B"][i % 2]} for i in range(100)])
+
+        self.assertEqual(list(grade_stream(read, 0, chunk_size=7)), list(grade_stream(read, 2, chunk_size=7)))
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input, output = os.path.join(directory, "in.jsonl"), os.path.join(directory, "out.jsonl")
+            with open(input, "w") as f:
+                for i in range(10):
+                    f.write(json.dumps({"id": i, "response": "A", "answer": "A"}) + "\n")
+
+            report = io.StringIO()
+            with redirect_stderr(report):
+                main([input, "-o", output, "--workers", "0"])
+
+            with open(output) as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual([line["id"] for line in lines], list(range(10)))
+            self.assertTrue(all(line["result"]["is_correct"] for line in lines))
+            self.assertIn("graded 10 records", report.getvalue())
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """
+    A thread-safe least-recently-used cache bounded both by the number of
+    entries and by the (approximate) total size of the stored values.
+    Entries can optionally expire `ttl` seconds after they were stored.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                del self.entries[key]
+                self.bytes -= entry[1]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int = 0):
+        with self.lock:
+            if self.max_entries <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+                return
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            expires = None if self.ttl is None else time.monotonic() + self.ttl
+            self.entries[key] = (value, size, expires)
+            self.bytes += size
+            while len(self.entries) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,63 @@
+import time
+import unittest
+
+from .cache import LRUCache
+from .answer import ANSWER_CACHE, compile_answer
+from .parse import FeedbackException
+from .testing import NONE_DISALLOWED
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+
+        self.assertNotIn("b", cache)
+        self.assertIn("a", cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_max_bytes(self):
+        cache = LRUCache(max_entries=10, max_bytes=100)
+        cache.put("a", 1, size=60)
+        cache.put("b", 2, size=60)
+        cache.put("c", 3, size=1000)
+
+        self.assertEqual(list(cache.entries), ["b"])
+        self.assertEqual(cache.stats()["bytes"], 60)
+
+    def test_ttl(self):
+        cache = LRUCache(max_entries=10, ttl=0.01)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_counters(self):
+        cache = LRUCache(max_entries=10)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.get("b")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+class TestCompiledAnswer(unittest.TestCase):
+
+    def setUp(self):
+        ANSWER_CACHE.clear()
+
+    def test_reuses_compiled_answer(self):
+        first = compile_answer("A & B", NONE_DISALLOWED)
+        self.assertIs(compile_answer("A & B", NONE_DISALLOWED), first)
+        self.assertEqual(first.truth_table(["A", "B"]), 0b1000)
+        self.assertEqual(first.truth_table(["A", "B", "C"]), 0b10001000)
+
+    def test_keyed_by_disallowed(self):
+        compile_answer("A & B", NONE_DISALLOWED)
+        with self.assertRaises(FeedbackException):
+            compile_answer("A & B", dict(NONE_DISALLOWED, **{"and": True}))
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional
+
+from . import metrics
+
+# When a question is released, many students submit the same response at
+# nearly the same moment. The result cache only helps once the first of them
+# has been graded; until then each copy is graded separately. Single-flight
+# coalescing makes concurrent identical requests share one computation: the
+# first caller with a key runs the function, and callers with the same key
+# that arrive while it is running wait for it and get its result (or its
+# exception). A key is forgotten as soon as its call finishes, so nothing is
+# kept here beyond the calls in flight.
+#
+# Every caller gets the same result object, so it must not be modified. Each
+# request that joins another's call is counted as coalesced. Requests whose
+# arguments can't be written as JSON have no key and are never coalesced,
+# since there is no way to tell reliably whether they are the same.
+COALESCE = os.environ.get("EVAL_COALESCE", "1") == "1"
+
+
+class SingleFlight:
+    """
+    Runs a function at most once at a time for each key, sharing the result
+    between the callers that ask for the same key while it runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        # The call in flight for `key`, and whether this caller has to run it
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                metrics.increment("coalesced")
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _run(self, key: Hashable, future: Future, func: Callable, args: tuple):
+        try:
+            result = func(*args)
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(e)
+        else:
+            with self._lock:
+                del self._calls[key]
+            future.set_result(result)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def call(self, key: Hashable, func: Callable, *args) -> Any:
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, func, args)
+        return future.result()
+
+
+def json_key(*values) -> Optional[str]:
+    try:
+        return json.dumps(values, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+
+
+def evaluation_key(response: Any, answer: Any, params: dict) -> Optional[str]:
+    return json_key(response, answer, dict(params))
+
+
+def preview_key(response: Any, params: dict) -> Optional[str]:
+    return json_key(response, dict(params))
+
+
+def coalesced(func: Callable, key: Callable) -> Callable:
+    """
+    `func`, with concurrent calls whose arguments have the same `key(*args)`
+    sharing one call. Calls whose key is None are never shared.
+    """
+    flight = SingleFlight()
+
+    def call(*args):
+        call_key = key(*args)
+        if call_key is None:
+            return func(*args)
+        return flight.call(call_key, func, *args)
+
+    call.flight = flight
+    return call
+
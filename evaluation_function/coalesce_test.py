@@ -0,0 +1,103 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from .coalesce import SingleFlight, coalesced, evaluation_key
+from . import metrics
+
+
+class Slow:
+    # A function that blocks until released, counting its calls
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self, value):
+        self.calls += 1
+        self.release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return [value]
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def joined(count: int):
+    # Wait until `count` more callers have joined a call in flight
+    target = metrics.counters().get("coalesced", 0) + count
+    return lambda: metrics.counters().get("coalesced", 0) >= target
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_threads_share_call(self):
+        func = Slow()
+        flight = SingleFlight()
+        all_joined = joined(7)
+        with ThreadPoolExecutor(8) as threads:
+            futures = [threads.submit(flight.call, "a", func, "a") for _ in range(8)]
+            wait_for(all_joined)
+            func.release.set()
+            results = [future.result() for future in futures]
+        self.assertEqual(func.calls, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(len(flight), 0)
+
+        # Only calls in flight are shared
+        self.assertEqual(flight.call("a", func, "a"), ["a"])
+        self.assertEqual(func.calls, 2)
+
+    def test_different_keys(self):
+        func = Slow()
+        func.release.set()
+        flight = SingleFlight()
+        with ThreadPoolExecutor(4) as threads:
+            results = list(threads.map(lambda key: flight.call(key, func, key), ["a", "b", "c", "d"]))
+        self.assertEqual(results, [["a"], ["b"], ["c"], ["d"]])
+        self.assertEqual(func.calls, 4)
+
+    def test_exception_shared(self):
+        func = Slow()
+        flight = SingleFlight()
+        all_joined = joined(3)
+        with ThreadPoolExecutor(4) as threads:
+            futures = [threads.submit(flight.call, "a", func, ValueError("failed")) for _ in range(4)]
+            wait_for(all_joined)
+            func.release.set()
+            for future in futures:
+                with self.assertRaisesRegex(ValueError, "failed"):
+                    future.result()
+        self.assertEqual(func.calls, 1)
+        self.assertEqual(len(flight), 0)
+
+    def test_coalesced(self):
+        func = Slow()
+        handler = coalesced(lambda response, answer, params: func(response), evaluation_key)
+        all_joined = joined(1)
+        with ThreadPoolExecutor(4) as threads:
+            futures = [
+                threads.submit(handler, "A & B", "A & B", {"disallowed": ["or"], "is_latex": False}),
+                threads.submit(handler, "A & B", "A & B", {"is_latex": False, "disallowed": ["or"]}),
+            ]
+            wait_for(all_joined)
+            func.release.set()
+            self.assertIs(futures[0].result(), futures[1].result())
+        self.assertEqual(func.calls, 1)
+
+    def test_unserialisable_arguments(self):
+        # Values that JSON can't represent exactly have no key, rather than
+        # one that may be shared with different arguments
+        self.assertIsNone(evaluation_key("A", "A", {"tolerance": {1, 2}}))
+        self.assertNotEqual(evaluation_key("A", "A", {"x": 1}), evaluation_key("A", "A", {"x": "1"}))
+
+        func = Slow()
+        func.release.set()
+        handler = coalesced(lambda response, answer, params: func(response), evaluation_key)
+        self.assertEqual(handler("A", "A", {"tolerance": {1, 2}}), ["A"])
+        self.assertEqual(len(handler.flight), 0)
+        self.assertEqual(func.calls, 1)
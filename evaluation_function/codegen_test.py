@@ -0,0 +1,69 @@
+import random
+import unittest
+
+from .codegen import COMPILE_AFTER, COMPILED_CACHE, Evaluator, compile_expr, source
+from .truth_table import eval_expr, variable_masks, variables
+from .testing import parse
+
+
+def random_expr(rng: random.Random, names: list[str], depth: int) -> str:
+    if depth == 0 or rng.random() < 0.15:
+        return ("~" if rng.random() < 0.4 else "") + rng.choice(names)
+    text = random_expr(rng, names, depth - 1)
+    for _ in range(rng.randint(1, 4)):
+        text += f" {rng.choice('&|^')} {random_expr(rng, names, depth - 1)}"
+    return ("~" if rng.random() < 0.3 else "") + f"({text})"
+
+
+class TestCodegen(unittest.TestCase):
+
+    def assertCompiles(self, expr):
+        names = sorted(variables(expr))
+        masks, full = variable_masks(names)
+        self.assertEqual(compile_expr(expr)(masks, full), eval_expr(expr, masks, full))
+
+    def test_source(self):
+        self.assertEqual(source(parse("A & ~(B | C)")).splitlines(), [
+            "def evaluate(masks, full):",
+            "    v0 = masks['B']",
+            "    v1 = masks['C']",
+            "    e2 = v0 | v1",
+            "    v3 = masks['A']",
+            "    e4 = v3 & (e2 ^ full)",
+            "    return e4",
+        ])
+
+    def test_precedence(self):
+        # The chain is evaluated left to right, whatever Python's precedence
+        for input in ["A | B ^ C", "A ^ B | C ^ D", "A & B ^ C & D | E", "~A | B & ~C ^ D | E ^ F"]:
+            self.assertCompiles(parse(input))
+
+    def test_random(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            names = [f"x{i}" for i in range(rng.randint(1, 8))]
+            self.assertCompiles(parse(random_expr(rng, names, 4)))
+
+    def test_long_and_deep(self):
+        self.assertCompiles(parse(" | ".join(f"x{i % 10} & ~x{(i + 1) % 10} ^ x{(i + 2) % 10}" for i in range(2000))))
+        self.assertCompiles(parse(" & ".join(f"x{i % 10}" for i in range(1000))))
+        input = "A"
+        for i in range(1000):
+            input = f"~(x{i % 5} {'&|^'[i % 3]} {input})"
+        self.assertCompiles(parse(input))
+
+    def test_cached(self):
+        expr = parse("A & B | C")
+        self.assertIs(compile_expr(expr), compile_expr(parse("A & B | C")))
+
+    def test_evaluator(self):
+        expr = parse("A ^ B & ~C | D")
+        COMPILED_CACHE.clear()
+        evaluate = Evaluator(expr)
+        masks, full = variable_masks(["A", "B", "C", "D"])
+        for _ in range(COMPILE_AFTER):
+            self.assertEqual(evaluate(masks, full), eval_expr(expr, masks, full))
+        self.assertIsNone(evaluate.compiled)
+        self.assertEqual(evaluate(masks, full), eval_expr(expr, masks, full))
+        self.assertIsNotNone(evaluate.compiled)
+        self.assertIs(Evaluator(expr).compiled, evaluate.compiled)
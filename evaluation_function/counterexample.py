@@ -0,0 +1,76 @@
+import random
+import time
+from typing import Optional
+
+from .ast import Expr
+from .codegen import Evaluator
+from .truth_table import eval_expr, row_assignment, variable_masks
+
+# Number of random assignments evaluated at once, one per bit
+SAMPLES = 256
+
+# Variables enumerated together in each block of the exhaustive search
+BLOCK_VARIABLES = 12
+
+# Time spent looking for a counterexample before trying the exact methods
+SEARCH_TIME = 0.05
+
+
+def lowest_bit(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+def sample(left: Expr, right: Expr, names: list[str], samples: int = SAMPLES, seed: int = 0) -> Optional[dict[str, bool]]:
+    # Evaluate both expressions on `samples` random assignments in parallel,
+    # packing one assignment into each bit of the masks.
+    rng = random.Random(seed)
+    full = (1 << samples) - 1
+    masks = {name: rng.getrandbits(samples) for name in names}
+
+    diff = eval_expr(left, masks, full) ^ eval_expr(right, masks, full)
+    if not diff:
+        return None
+    bit = lowest_bit(diff)
+    return {name: bool((masks[name] >> bit) & 1) for name in names}
+
+
+def enumerate_blocks(left: Expr, right: Expr, names: list[str], deadline: Optional[float] = None) -> Optional[dict[str, bool]]:
+    # Enumerate every assignment in order: the first variables are covered by
+    # a truth table, and the remaining ones are fixed for each block.
+    low, high = names[:BLOCK_VARIABLES], names[BLOCK_VARIABLES:]
+    masks, full = variable_masks(low)
+
+    # Both expressions are evaluated once per block, so they are compiled
+    # once there have been enough blocks
+    left, right = Evaluator(left), Evaluator(right)
+
+    for block in range(1 << len(high)):
+        if deadline is not None and time.monotonic() > deadline:
+            return None
+        for i, name in enumerate(high):
+            masks[name] = full if (block >> i) & 1 else 0
+
+        diff = left(masks, full) ^ right(masks, full)
+        if diff:
+            assignment = row_assignment(low, lowest_bit(diff))
+            assignment.update({name: masks[name] == full for name in high})
+            return assignment
+    return None
+
+
+def find_counterexample(left: Expr, right: Expr, names: list[str], deadline: Optional[float] = None) -> Optional[dict[str, bool]]:
+    """
+    Look for an assignment of `names` on which the two expressions differ,
+    trying random assignments first and then enumerating them in order.
+    Returns None if the expressions are equivalent, or if `deadline` (in
+    time.monotonic() seconds) passes before a difference is found.
+    """
+    assignment = sample(left, right, names)
+    if assignment is not None:
+        return assignment
+    return enumerate_blocks(left, right, names, deadline)
+
+
+def describe(assignment: dict[str, bool], value: bool) -> str:
+    values = ", ".join(f"{name}={int(assignment[name])}" for name in sorted(assignment))
+    return f"With {values} your expression gives {int(value)}, but it should give {int(not value)}."
@@ -0,0 +1,42 @@
+import unittest
+
+from .counterexample import describe, enumerate_blocks, find_counterexample, sample
+from .truth_table import evaluate
+from .testing import parse
+
+
+class TestCounterexample(unittest.TestCase):
+
+    def assertCounterexample(self, left, right, assignment):
+        self.assertIsNotNone(assignment)
+        self.assertNotEqual(evaluate(left, assignment), evaluate(right, assignment))
+
+    def test_sample(self):
+        left, right = parse("A | B"), parse("A & B")
+        self.assertCounterexample(left, right, sample(left, right, ["A", "B"]))
+        self.assertIsNone(sample(left, parse("~(~A & ~B)"), ["A", "B"]))
+
+    def test_enumeration_finds_rare_difference(self):
+        # Differs from the answer on a single one of 2 ** 20 assignments
+        names = [f"x{i}" for i in range(20)]
+        left = parse(" & ".join(names))
+        right = parse(" & ".join(names) + " ^ " + " & ".join(names))
+
+        assignment = enumerate_blocks(left, right, names)
+        self.assertCounterexample(left, right, assignment)
+        self.assertTrue(all(assignment.values()))
+
+    def test_equivalent(self):
+        names = [f"x{i}" for i in range(14)]
+        left = parse(" ^ ".join(names))
+        right = parse(" ^ ".join(reversed(names)))
+        self.assertIsNone(find_counterexample(left, right, names))
+
+    def test_deadline(self):
+        names = [f"x{i}" for i in range(30)]
+        left = parse(" ^ ".join(names))
+        self.assertIsNone(find_counterexample(left, left, names, deadline=0))
+
+    def test_describe(self):
+        self.assertEqual(describe({"B": False, "A": True}, False),
+                         "With A=1, B=0 your expression gives 0, but it should give 1.")
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from . import metrics
+
+# An optional cache of compiled answers on disk, shared by every worker
+# process on a node and kept across restarts, so that new workers don't have
+# to recompute answers' truth tables, canonical forms and signatures. It is
+# a SQLite database at EVAL_DISK_CACHE, e.g. in the container's writable
+# directory, holding at most EVAL_DISK_CACHE_ENTRIES entries; the least
+# recently used are evicted beyond that.
+#
+# Entries are JSON, and are tagged with a hash of the source of the modules
+# that produce them, so that entries written by an older parser or engine
+# are never read. They aren't deleted either, since during a rolling deploy
+# workers of both versions share the cache; they are left to be evicted.
+#
+# The cache must never make grading fail, so database errors, and values
+# that can't be encoded or decoded, are counted and otherwise treated as
+# misses.
+DISK_CACHE_PATH = os.environ.get("EVAL_DISK_CACHE", "")
+DISK_CACHE_ENTRIES = int(os.environ.get("EVAL_DISK_CACHE_ENTRIES", 100_000))
+
+# Bump when the format of entries changes
+FORMAT = 2
+
+# Modules whose behaviour the cached values depend on
+SOURCES = ["ast.py", "lex.py", "parse.py", "normalize.py", "truth_table.py", "signature.py", "minimize.py", "answer.py"]
+
+# Puts between checks of the number of entries
+EVICT_INTERVAL = 256
+
+# Seconds to wait for another process's write to finish
+BUSY_TIMEOUT = 5.0
+
+
+def engine_version() -> str:
+    digest = hashlib.sha256(str(FORMAT).encode())
+    for name in SOURCES:
+        digest.update((Path(__file__).parent / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class DiskCache:
+    """
+    A persistent key-value store of JSON values, safe to use from many
+    threads and processes at once.
+    """
+
+    def __init__(self, path: str, max_entries: int = DISK_CACHE_ENTRIES, version: Optional[str] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.version = version if version is not None else engine_version()
+        self._local = threading.local()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, and a new one after a fork
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, version TEXT NOT NULL, value TEXT NOT NULL, used REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                "SELECT value FROM entries WHERE key = ? AND version = ?", (key, self.version)
+            ).fetchone()
+            if row is not None:
+                connection.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+                value = json.loads(row[0])
+        except (sqlite3.Error, ValueError):
+            self.errors += 1
+            metrics.count("disk_cache_error")
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: dict):
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, version, value, used) VALUES (?, ?, ?, ?)",
+                (key, self.version, json.dumps(value), time.time()),
+            )
+            self._puts += 1
+            if self._puts % EVICT_INTERVAL == 0:
+                self.evict()
+        except (sqlite3.Error, TypeError, ValueError):
+            self.errors += 1
+            metrics.count("disk_cache_error")
+
+    def evict(self):
+        # Remove the least recently used entries beyond the limit, and a
+        # tenth more so that this doesn't happen on every check
+        connection = self._connection()
+        (count,) = connection.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            excess = count - self.max_entries + self.max_entries // 10
+            connection.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used LIMIT ?)", (excess,)
+            )
+
+    def __len__(self) -> int:
+        (count,) = self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()
+        return count
+
+    def clear(self):
+        self._connection().execute("DELETE FROM entries")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+DISK_CACHE = DiskCache(DISK_CACHE_PATH) if DISK_CACHE_PATH else None
+if DISK_CACHE is not None:
+    metrics.register_cache("disk", DISK_CACHE)
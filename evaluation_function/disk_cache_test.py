@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from . import answer, disk_cache
+from .answer import ANSWER_CACHE, compile_answer
+from .disk_cache import DiskCache
+from .parse import FeedbackException
+from .testing import NONE_DISALLOWED
+
+
+def put_in(path: str, key: str):
+    DiskCache(path, version="test").put(key, {"pid": os.getpid()})
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache.sqlite")
+
+    def test_get_put(self):
+        cache = DiskCache(self.path, version="test")
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", {"table": 6, "signatures": {"exact": ["exact", ["A", "B"], 6]}})
+        self.assertEqual(cache.get("a"), {"table": 6, "signatures": {"exact": ["exact", ["A", "B"], 6]}})
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "errors": 0})
+
+    def test_version(self):
+        DiskCache(self.path, version="old").put("a", {"value": 1})
+        self.assertEqual(DiskCache(self.path, version="old").get("a"), {"value": 1})
+        cache = DiskCache(self.path, version="new")
+        self.assertIsNone(cache.get("a"))
+
+        # Workers of the old version can still read their entries
+        self.assertEqual(DiskCache(self.path, version="old").get("a"), {"value": 1})
+        self.assertEqual(len(cache), 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = DiskCache(self.path, max_entries=10, version="test")
+        for i in range(10):
+            cache.put(str(i), {"value": i})
+        cache.get("0")
+        for i in range(10, 15):
+            cache.put(str(i), {"value": i})
+        cache.evict()
+        self.assertEqual(len(cache), 9)
+        self.assertIsNotNone(cache.get("0"))
+        self.assertIsNone(cache.get("1"))
+
+    def test_shared_between_processes(self):
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=put_in, args=(self.path, str(i))) for i in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        cache = DiskCache(self.path, version="test")
+        self.assertEqual(len(cache), 4)
+        self.assertNotEqual(cache.get("0")["pid"], os.getpid())
+
+    def test_errors_are_misses(self):
+        cache = DiskCache(os.path.join(self.path, "missing", "cache.sqlite"), version="test")
+        cache.put("a", {"value": 1})
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["errors"], 2)
+
+    def test_unencodable_values_are_errors(self):
+        cache = DiskCache(self.path, version="test")
+        cache.put("a", {"value": {1, 2}})
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats(), {"hits": 0, "misses": 1, "errors": 1})
+
+    def test_large_answer(self):
+        # A table over 16 variables has far more digits than JSON numbers
+        # can be converted to
+        cache = DiskCache(self.path, version="test")
+        answer_text = " | ".join(f"x{i} & y{i}" for i in range(8))
+        with mock.patch.object(answer, "DISK_CACHE", cache):
+            ANSWER_CACHE.clear()
+            compiled = compile_answer(answer_text, NONE_DISALLOWED)
+            compiled.signature("permutation")
+            self.assertEqual(cache.stats()["errors"], 0)
+
+            ANSWER_CACHE.clear()
+            restored = compile_answer(answer_text, NONE_DISALLOWED)
+            self.assertIsNot(restored, compiled)
+            self.assertEqual(restored.table, compiled.table)
+            self.assertEqual(restored.signatures, compiled.signatures)
+        ANSWER_CACHE.clear()
+
+    def test_compiled_answer(self):
+        cache = DiskCache(self.path, version="test")
+        with mock.patch.object(answer, "DISK_CACHE", cache):
+            ANSWER_CACHE.clear()
+            compiled = compile_answer("A ^ B | C", NONE_DISALLOWED)
+            compiled.signature("permutation")
+
+            # The canonical form is only stored once it has been computed
+            self.assertIsNone(cache.get(compiled.disk_key)["canonical"])
+            canonical = compiled.canonical
+            self.assertEqual(cache.get(compiled.disk_key)["canonical"], canonical)
+
+            # As if in a new process
+            ANSWER_CACHE.clear()
+            restored = compile_answer(" A^B|C ", NONE_DISALLOWED)
+            self.assertIsNot(restored, compiled)
+            self.assertEqual(cache.stats()["hits"], 3)
+            self.assertEqual(restored.table, compiled.table)
+            self.assertEqual(restored.__dict__["canonical"], compiled.canonical)
+            self.assertEqual(restored.signatures, compiled.signatures)
+            self.assertEqual(restored.index("permutation", []).lookup(restored.expr), {"is_correct": True})
+
+            # Disallowed operators are still checked
+            ANSWER_CACHE.clear()
+            with self.assertRaises(FeedbackException):
+                compile_answer("A ^ B | C", {**NONE_DISALLOWED, "xor": True})
+        ANSWER_CACHE.clear()
+
+    def test_engine_version(self):
+        version = DiskCache(self.path).version
+        self.assertEqual(version, disk_cache.engine_version())
+        with mock.patch.object(disk_cache, "FORMAT", disk_cache.FORMAT + 1):
+            self.assertNotEqual(disk_cache.engine_version(), version)
@@ -1,14 +1,231 @@
-from typing import Any
-from sympy import simplify_logic, Equivalent
+import json
+import os
+import time
+from typing import Any, Optional
 from lf_toolkit.evaluation import Result, Params
 
-from .parse import parse_with_feedback, FeedbackException
+from .answer import CompiledAnswer, compile_answer
+from .budget import Budget, BudgetExceeded
+from .cache import LRUCache
+from .minimize import minimize, simplest
+from .normalize import canonical_form, normal_form
+from .parse import conv_expr, get_disallowed, parse_expression, FeedbackException
+from .signature import signature
+from . import bdd, counterexample, metrics, sat, truth_table
 
-def get_disallowed(disallowed_list: list[str]) -> dict:
-    disallowed = {}
-    for op in ["and", "or", "not", "xor"]:
-        disallowed.update({op: op in disallowed_list})
-    return disallowed
+# Students tend to submit the same few responses, so the outcome of grading a
+# response is kept for a while, keyed by its minimal sum of products (or its
+# normal form, see equivalence_key()), the answer and the parameters. Only the
+# verdict is stored; the latex and ascii forms are always rendered from the
+# response as it was typed.
+RESULT_CACHE = LRUCache(
+    max_entries=int(os.environ.get("RESULT_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("RESULT_CACHE_TTL", 600)),
+)
+metrics.register_cache("result", RESULT_CACHE)
+
+def sympy_equivalent(left, right) -> bool:
+    # Imported here, since this is the only place sympy is used
+    from sympy import simplify_logic, Equivalent
+
+    return simplify_logic(Equivalent(conv_expr(left), conv_expr(right))) == True
+
+def compare(response_set, answer: CompiledAnswer, budget: Budget) -> tuple[bool, Optional[dict[str, bool]]]:
+    """
+    Decide whether the response is equivalent to the answer. If it isn't, an
+    assignment on which they differ is also returned when one was found.
+    Raises BudgetExceeded if this takes more time or work than allowed.
+    """
+    budget.check_size(response_set, answer.expr)
+
+    names = sorted(truth_table.variables(response_set) | answer.variables)
+    metrics.record("variables", len(names))
+
+    # Enumerate the truth tables directly when there are few enough variables
+    if len(names) <= truth_table.MAX_VARIABLES:
+        with metrics.stage("truth_table"):
+            diff = truth_table.truth_table(response_set, names) ^ answer.truth_table(names)
+        if diff:
+            return False, truth_table.row_assignment(names, counterexample.lowest_bit(diff))
+        return True, None
+
+    # Most wrong responses differ from the answer on many assignments, so a
+    # short search for one is tried before any of the exact methods.
+    deadline = time.monotonic() + counterexample.SEARCH_TIME
+    if budget.deadline is not None:
+        deadline = min(deadline, budget.deadline)
+    with metrics.stage("counterexample"):
+        witness = counterexample.find_counterexample(response_set, answer.expr, names, deadline)
+    if witness is not None:
+        return False, witness
+
+    # Then try comparing decision diagrams, then a SAT solver if the diagram
+    # grows too large, and only fall back to sympy's (much slower)
+    # simplification if the solver gives up too. This is the only place the
+    # expressions are converted to sympy.
+    with metrics.stage("bdd"):
+        equal, witness = bdd.equivalent(response_set, answer.expr, budget=budget)
+    if witness is not None:
+        return False, witness
+    if equal is None:
+        with metrics.stage("sat"):
+            equal, witness = sat.equivalent(response_set, answer.expr, budget=budget)
+        if witness is not None:
+            return False, witness
+    if equal is None:
+        try:
+            # Converting to sympy happens in the subprocess too, so it is
+            # included in this stage.
+            with metrics.stage("simplify"):
+                equal = budget.call(sympy_equivalent, response_set, answer.expr)
+        except RecursionError:
+            # sympy can't handle brackets nested this deeply
+            raise BudgetExceeded("complexity")
+    return equal, None
+
+def compare_tables(response_sets: list, answer: CompiledAnswer) -> list[Optional[tuple]]:
+    """
+    What compare() returns for each of `response_sets`, for those whose
+    variables together with the answer's are few enough to enumerate, and
+    None for the others. Responses over the same variables (usually the
+    answer's) share the variable masks and the answer's table, so each
+    costs one evaluation of its own table.
+    """
+    groups = {}
+    for i, response_set in enumerate(response_sets):
+        names = sorted(truth_table.variables(response_set) | answer.variables)
+        if len(names) <= truth_table.MAX_VARIABLES:
+            groups.setdefault(tuple(names), []).append(i)
+
+    results = [None] * len(response_sets)
+    with metrics.stage("truth_table"):
+        for names, indices in groups.items():
+            names = list(names)
+            masks, full = truth_table.variable_masks(names)
+            answer_table = answer.truth_table(names)
+            for i in indices:
+                diff = truth_table.eval_expr(response_sets[i], masks, full) ^ answer_table
+                if diff:
+                    results[i] = (False, truth_table.row_assignment(names, counterexample.lowest_bit(diff)))
+                else:
+                    results[i] = (True, None)
+    return results
+
+def signature_mode(params: Params) -> str:
+    renaming = params.get("variable_renaming", False)
+    if renaming is True:
+        return "permutation"
+    if renaming in ("permutation", "npn"):
+        return renaming
+    return "exact"
+
+def grade(
+    response_set, answer: CompiledAnswer, params: Params, budget: Budget, compared: Optional[tuple] = None,
+) -> tuple[bool, tuple]:
+    # `compared` is what compare() would return, if it is already known
+    # 4. look the response up among the answer and the question's known
+    #    responses, by the signature of the function it computes, which may
+    #    ignore what its variables are called. Otherwise compare the truth
+    #    tables of the two expressions. Renaming can't be checked if either
+    #    has too many variables, or too many orderings of them to try, in
+    #    which case they are compared as they are named.
+    #    If they are equal, the sets produced by the two expressions are
+    #    semantically equal. However, the expressions may not be equal.
+    known, witness = None, None
+    renaming_checked = True
+    mode = signature_mode(params)
+    known_responses = params.get("known_responses", [])
+    if mode != "exact" or known_responses:
+        with metrics.stage("signature"):
+            index = answer.index(mode, known_responses)
+            key = signature(response_set, mode)
+            known = index.get(key)
+            if mode != "exact":
+                renaming_checked = key is not None and answer.signature(mode) is not None
+    if known is not None:
+        semantic_equal = known.get("is_correct", False)
+    elif compared is not None:
+        budget.check_size(response_set, answer.expr)
+        semantic_equal, witness = compared
+    else:
+        semantic_equal, witness = compare(response_set, answer, budget)
+
+    enforce_expression_equality = params.get("enforce_expression_equality", False)
+
+    # 5. compare the canonical forms of the two expressions, which is what
+    #    comparing them as sympy expressions w/ simplification disabled did.
+    #    If they are equal, the expressions are also equal in syntax.
+    #    This respects laws of commutativity, e.g. A u B == B u A.
+    #    It only matters when expression equality is enforced.
+    with metrics.stage("syntax"):
+        syntactic_equal = enforce_expression_equality and canonical_form(response_set) == answer.canonical
+
+    # 6. `is_correct` is True, iff 4) is True, and either 5) or `enforce_expression_equality` is True
+    is_correct = semantic_equal and (syntactic_equal or not enforce_expression_equality)
+
+    feedback_items=[]
+
+    if semantic_equal and not syntactic_equal and enforce_expression_equality:
+        feedback_items.append(("syntactic_equality", "The expressions are not equal syntacitcally."))
+    elif not semantic_equal:
+        feedback_items.append(("semantic_equality", "The expressions are not equal."))
+        if not renaming_checked:
+            feedback_items.append((
+                "variable_renaming",
+                "The expression is too complex to check whether it is equal to the answer with its variables "
+                "renamed, so it was compared with the variables as they are named.",
+            ))
+        if witness is not None and params.get("show_counterexample", False):
+            value = truth_table.evaluate(response_set, witness)
+            feedback_items.append(("counterexample", counterexample.describe(witness, value)))
+    if known is not None and "feedback" in known:
+        feedback_items.append(("known_response", known["feedback"]))
+
+    return is_correct, tuple(feedback_items)
+
+def equivalence_key(response_set, params: Params, budget: Optional[Budget] = None) -> tuple:
+    # Unless the syntax of the response matters, its verdict only depends on
+    # the function it computes, and the minimal sum of products is the same
+    # for every response computing that function. The variables are part of
+    # the key too, since a counterexample lists all of them. If minimising
+    # runs out of budget the normal form is used, which only means that fewer
+    # responses share the entry.
+    if not params.get("enforce_expression_equality", False):
+        try:
+            minimal = minimize(response_set, budget)
+        except BudgetExceeded:
+            minimal = None
+        if minimal is not None:
+            return ("minimal", minimal, tuple(sorted(truth_table.variables(response_set))))
+    with metrics.stage("normalize"):
+        return ("normal", normal_form(response_set))
+
+def params_key(params: Params) -> str:
+    return json.dumps(dict(params), sort_keys=True, default=str)
+
+def make_result(response_set, verdict: tuple[bool, tuple], budget: Optional[Budget] = None) -> Result:
+    is_correct, feedback_items = verdict
+
+    with metrics.stage("render"):
+        latex = response_set.to_latex()
+
+    # The shorter of the minimal sum of products and product of sums, unless
+    # it is longer than the response itself (as it is for parity functions),
+    # the response has too many variables to minimise or the budget runs out
+    simplified = str(response_set)
+    try:
+        minimal = simplest(response_set, budget)
+    except BudgetExceeded:
+        minimal = None
+    if minimal is not None and len(minimal) <= len(simplified):
+        simplified = minimal
+
+    return Result(
+        is_correct=is_correct,
+        latex=latex,
+        simplified=simplified,
+        feedback_items=list(feedback_items),
+    )
 
 def evaluation_function(
     response: Any,
@@ -44,48 +261,42 @@ def evaluation_function(
     # create a dictionary of which operations are allowed:
     disallowed = get_disallowed(params.get("disallowed", []))
 
-    try:
-        # 1. convert the `response`, which may be a latex string, to a sympy expression
-        response_set, response_set_sympy = parse_with_feedback(response, disallowed, latex=params.get("is_latex", False))
-
-        # 2. convert the `answer`, which may be a latex string, to a sympy expression
-        # TODO: what if answer is also in latex? how do we know?
-        _, answer_set_sympy = parse_with_feedback(answer, disallowed, latex=False)
+    # limit how long the evaluation may take and how large the inputs may be
+    budget = Budget.from_params(params)
 
-        # 3. compare the two sympy expressions w/ simplification enabled.
-        #    If they are equal, the sets produced by the two expressions are
-        #    semantically equal. However, the expressions may not be equal.
-        semantic_equal = simplify_logic(Equivalent(response_set_sympy, answer_set_sympy)) == True
+    # time each stage of the evaluation, if instrumentation is turned on
+    with metrics.request("eval"):
+        try:
+            # 1. parse the `response`, which may be a latex string
+            response_set = parse_expression(response, disallowed, latex=params.get("is_latex", False))
 
-        # 4. compare the two sympy expressions w/ simplifaction disabled.
-        #    If they are equal, the expressions are also equal in syntax.
-        #    This respects laws of commutativity, e.g. A u B == B u A.
-        syntactic_equal = response_set_sympy == answer_set_sympy
+            # 2. look for a previous result for an equivalent response, i.e. one
+            #    computing the same function or, if the syntax matters, one
+            #    that only differs in whitespace, brackets or operand order.
+            key = (equivalence_key(response_set, params, budget), answer, params_key(params))
+            verdict = RESULT_CACHE.get(key)
+            metrics.count("result_cache_miss" if verdict is None else "result_cache_hit")
 
-        enforce_expression_equality = params.get("enforce_expression_equality", False)
+            if verdict is None:
+                # 3. parse the `answer`, which may be a latex string.
+                #    The compiled answer is cached between requests.
+                # TODO: what if answer is also in latex? how do we know?
+                compiled_answer = compile_answer(answer, disallowed)
 
-        # 5. `is_correct` is True, iff 3) is True, and either 4) or `enforce_expression_equality` is True
-        is_correct = semantic_equal and (syntactic_equal or not enforce_expression_equality)
-
-        feedback_items=[]
-
-        if semantic_equal and not syntactic_equal and enforce_expression_equality:
-            feedback_items.append(("syntactic_equality", "The expressions are not equal syntacitcally."))
-        elif not semantic_equal:
-            feedback_items.append(("semantic_equality", "The expressions are not equal."))
-
-        latex = response_set.to_latex()
+                # Results that ran out of budget are not cached, since they
+                # depend on how busy the worker was.
+                verdict = grade(response_set, compiled_answer, params, budget)
+                RESULT_CACHE.put(key, verdict)
 
-        ascii = str(response_set)
-
-        return Result(
-            is_correct=is_correct,
-            latex=latex,
-            simplified=ascii,
-            feedback_items=feedback_items,
-        )
-    except FeedbackException as e:
-        return Result(
-            is_correct=False,
-            feedback_items=[("parse_error", str(e))]
-        )
\ No newline at end of file
+            return make_result(response_set, verdict, budget)
+        except FeedbackException as e:
+            return Result(
+                is_correct=False,
+                feedback_items=[("parse_error", str(e))]
+            )
+        except BudgetExceeded as e:
+            metrics.increment(f"budget_exceeded_{e.reason}")
+            return Result(
+                is_correct=False,
+                feedback_items=[("complexity", str(e))]
+            )
\ No newline at end of file
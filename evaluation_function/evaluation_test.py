@@ -1,4 +1,5 @@
 import unittest
+from unittest import mock
 from autotests import auto_test
 
 from .evaluation import Params, evaluation_function
@@ -53,6 +54,14 @@ class TestEvaluationFunction(unittest.TestCase):
         except:
             pass
 
+    def test_latex_response(self):
+        response, answer, params = "\\overline{A} \\cdot B + C", "~A & B | C", Params(is_latex=True)
+
+        result = evaluation_function(response, answer, params).to_dict()
+
+        self.assertEqual(result.get("is_correct"), True)
+        self.assertEqual(result.get("response_latex"), "\\overline{A} \\cdot B + C")
+
     def test_xor_identity(self):
         response, answer, params = "A ^ B", "A & ~B | ~A & B", Params()
 
@@ -113,3 +122,78 @@ class TestEvaluationFunction(unittest.TestCase):
         
         self.assertEqual(result.get("is_correct"), False)
         self.assertTrue(result.get("feedback"))
+
+    def test_cached_result_keeps_response_form(self):
+        evaluation_function("A & B", "B & A", Params())
+        result = evaluation_function("B&A", "B & A", Params()).to_dict()
+
+        self.assertEqual(result.get("is_correct"), True)
+        self.assertEqual(result.get("response_latex"), "B \\cdot A")
+
+    def test_cached_result_enforce_expression_equality(self):
+        params = Params({"enforce_expression_equality": True})
+        self.assertTrue(evaluation_function("B & A", "A & B", params).to_dict().get("is_correct"))
+        self.assertFalse(evaluation_function("~(~A | ~B)", "A & B", params).to_dict().get("is_correct"))
+        self.assertTrue(evaluation_function("(A) & B", "A & B", params).to_dict().get("is_correct"))
+
+    def test_counterexample(self):
+        response, answer, params = "A | B", "A & B", Params({"show_counterexample": True})
+
+        result = evaluation_function(response, answer, params)
+
+        self.assertEqual(result.to_dict().get("is_correct"), False)
+        self.assertIn("With A=1, B=0 your expression gives 1, but it should give 0.", str(result.to_dict().get("feedback")))
+
+    def test_counterexample_many_variables(self):
+        # Too many variables for truth tables, and a difference on only one
+        # assignment, which the decision diagram finds if the search doesn't
+        response = " & ".join(f"x{i}" for i in range(30))
+        answer = " & ".join(f"x{i}" for i in range(29)) + " & ~x29"
+        params = Params({"show_counterexample": True})
+
+        with mock.patch("evaluation_function.counterexample.find_counterexample", return_value=None):
+            result = evaluation_function(response, answer, params).to_dict()
+
+        self.assertEqual(result.get("is_correct"), False)
+        self.assertIn("your expression gives 0, but it should give 1.", str(result.get("feedback")))
+
+    def test_variable_renaming(self):
+        params = Params({"variable_renaming": True})
+        self.assertTrue(evaluation_function("P & ~Q | R", "~Y & X | Z", params).to_dict().get("is_correct"))
+        self.assertFalse(evaluation_function("P & ~Q | R", "~Y & X | Z", Params()).to_dict().get("is_correct"))
+        self.assertFalse(evaluation_function("P & Q | R", "~Y & X | Z", params).to_dict().get("is_correct"))
+        self.assertTrue(evaluation_function("P & Q | R", "~Y & X | Z", Params({"variable_renaming": "npn"})).to_dict().get("is_correct"))
+
+    def test_variable_renaming_pairs(self):
+        # All eight variables appear in the same number of true rows
+        params = Params({"variable_renaming": True})
+        result = evaluation_function("P&Q|R&S|T&U|V&W", "A&B|C&D|E&F|G&H", params).to_dict()
+        self.assertEqual(result.get("is_correct"), True)
+
+    def test_variable_renaming_unchecked(self):
+        params = Params({"variable_renaming": True})
+        response = " | ".join(f"x{i} & y{i}" for i in range(9))
+        answer = " | ".join(f"a{i} & b{i}" for i in range(9))
+
+        result = evaluation_function(response, answer, params).to_dict()
+
+        self.assertEqual(result.get("is_correct"), False)
+        self.assertIn("variables renamed", str(result.get("feedback")))
+
+    def test_known_responses(self):
+        params = Params({"known_responses": [{"response": "A | B", "feedback": "This is OR, not XOR."}]})
+
+        result = evaluation_function("B | A", "A ^ B", params).to_dict()
+
+        self.assertEqual(result.get("is_correct"), False)
+        self.assertIn("This is OR, not XOR.", str(result.get("feedback")))
+
+    def test_known_responses_invalid(self):
+        params = Params({"known_responses": [{"response": "A £ B"}, {"feedback": "no response"}]})
+
+        with self.assertLogs("evaluation_function.answer", "WARNING") as logs:
+            result = evaluation_function("A & B", "A & B", params).to_dict()
+
+        self.assertEqual(result.get("is_correct"), True)
+        self.assertFalse(result.get("feedback"))
+        self.assertIn("known response 1 could not be parsed", logs.output[0])
@@ -0,0 +1,145 @@
+import os
+import re
+
+from .admission import admit
+from .cache import LRUCache
+from .lex import Lexer, LexError, TokenType
+from .parse import NONE_DISALLOWED, ParseError, FeedbackException, parse_boolean, parse_expression
+from . import admission, metrics
+
+# Previews are requested as a student types, so consecutive inputs share all
+# but their last few characters. An expression is a chain of products joined
+# by top-level ORs and XORs, each of which renders independently, so:
+#
+# - the rendering of each product is cached by its text, so only products
+#   that changed are lexed, parsed and rendered again, and
+# - the rendering of everything up to the last top-level operator is cached
+#   by its text, so a keystroke at the end of a long response only has to
+#   look at the last product.
+#
+# The caches are shared between students, who often type the same terms.
+#
+# Each product is checked against the admission limits on its own, which
+# covers the nesting depth. The number of distinct variables in each is
+# kept too, and their sum, which can only overestimate the total, is checked
+# against the limit; inputs over it are previewed in full.
+SEGMENT_CACHE = LRUCache(max_entries=int(os.environ.get("PREVIEW_CACHE_SIZE", 16384)))
+PREFIX_CACHE = LRUCache(max_entries=1024, max_bytes=16 * 1024 * 1024)
+metrics.register_cache("preview", SEGMENT_CACHE)
+metrics.register_cache("preview_prefix", PREFIX_CACHE)
+
+STRUCTURE_PATTERN = re.compile(r"[()|^]")
+
+# How many of the last OR/XOR operators in an input to try as the end of a
+# cached prefix. Operators inside brackets can't end one.
+PREFIX_CANDIDATES = 4
+
+
+def split(input: str):
+    """
+    Split `input` at its top-level OR and XOR operators, returning the text of
+    each product, the operators between them (True for XOR) and where the last
+    product starts, or None if the brackets close more than they open.
+    """
+    segments, ops = [], []
+    depth, start = 0, 0
+    for match in STRUCTURE_PATTERN.finditer(input):
+        char = match.group()
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth < 0:
+                return None
+        elif depth == 0:
+            segments.append(input[start:match.start()])
+            ops.append(char == "^")
+            start = match.end()
+    segments.append(input[start:])
+    return segments, ops, start
+
+
+def render_segment(text: str) -> tuple:
+    # The rendering of one product, or the error it raised. Errors are only
+    # reported directly for the last product; see preview().
+    rendered = SEGMENT_CACHE.get(text)
+    metrics.count("preview_segment_miss" if rendered is None else "preview_segment_hit")
+    if rendered is None:
+        variables = 0
+        try:
+            tokens = Lexer(text).lex()
+            variables = len({token.value for token in tokens if token.type == TokenType.VARIABLE})
+            admit(tokens, NONE_DISALLOWED, admission.LIMITS)
+            expr = parse_boolean(tokens)
+            rendered = (str(expr), expr.to_latex(), None, variables)
+        except (LexError, ParseError) as e:
+            rendered = (None, None, e, variables)
+        SEGMENT_CACHE.put(text, rendered)
+    return rendered
+
+
+def find_prefix(input: str) -> tuple[int, str, str, int]:
+    # The longest cached prefix of `input` ending at one of its last few
+    # operators, as its length, rendering and number of variables
+    end = len(input)
+    for _ in range(PREFIX_CANDIDATES):
+        end = max(input.rfind("|", 0, end), input.rfind("^", 0, end))
+        if end < 0:
+            break
+        rendered = PREFIX_CACHE.get(input[:end + 1])
+        if rendered is not None:
+            return (end + 1, *rendered)
+    return 0, "", "", 0
+
+
+def preview(input: str, latex: bool = False) -> tuple[str, str]:
+    """
+    The ascii and latex forms of `input`, exactly as if it had been parsed
+    with parse_expression() with no operators disallowed. Raises
+    FeedbackException with the same message as parse_expression() would.
+    """
+    # LaTeX input is split at different operators, and a group such as
+    # \overline{...} can span them, so it is always parsed in full
+    if not isinstance(input, str) or latex or len(input) > admission.LIMITS.length:
+        return full_preview(input, latex)
+
+    offset, ascii, latex, variables = find_prefix(input)
+    parts = split(input[offset:])
+    if parts is None:
+        return full_preview(input)
+    segments, ops, last_start = parts
+
+    for i, text in enumerate(segments):
+        segment_ascii, segment_latex, error, segment_variables = render_segment(text)
+        variables += segment_variables
+        if variables > admission.LIMITS.variables:
+            return full_preview(input)
+        if error is not None:
+            # The parser starts each product afresh and reads to the end of
+            # the input after the last one, so an error in the last product
+            # is the one a full parse would report. Errors elsewhere are
+            # reported at a token the product was split at, and positions in
+            # lexer errors are relative to the whole input, so in those cases
+            # the whole input is parsed again to get the same message.
+            if i < len(segments) - 1 or isinstance(error, LexError):
+                return full_preview(input)
+            raise FeedbackException from error
+
+        if i == len(segments) - 1:
+            if ops:
+                # Everything before the last product can be reused when the
+                # student carries on typing
+                PREFIX_CACHE.put(
+                    input[:offset + last_start], (ascii, latex, variables - segment_variables),
+                    2 * (len(input) + len(latex)),
+                )
+            return ascii + segment_ascii, latex + segment_latex
+
+        xor = ops[i]
+        ascii += f"{segment_ascii} {'^' if xor else '|'} "
+        latex += segment_latex + (" \\oplus " if xor else " + ")
+
+
+def full_preview(input: str, latex: bool = False) -> tuple[str, str]:
+    expr = parse_expression(input, NONE_DISALLOWED, latex)
+    return str(expr), expr.to_latex()
@@ -0,0 +1,64 @@
+import random
+import unittest
+from unittest import mock
+
+from .admission import Limits
+from .incremental import PREFIX_CACHE, SEGMENT_CACHE, full_preview, preview, split
+from .parse import FeedbackException
+from .testing import random_expression
+from . import admission
+
+
+def outcome(func, input: str):
+    try:
+        return func(input)
+    except FeedbackException as e:
+        return str(e)
+
+
+class TestIncrementalPreview(unittest.TestCase):
+
+    def test_split(self):
+        self.assertEqual(split("A & B | (C ^ D) ^ E"), (["A & B ", " (C ^ D) ", " E"], [False, True], 17))
+        self.assertEqual(split("(A | B"), (["(A | B"], [], 0))
+        self.assertIsNone(split("A) | B"))
+
+    def test_typing_matches_full_parse(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            input = " | ".join(random_expression(rng, 3) for _ in range(3))
+            for end in range(len(input) + 1):
+                self.assertEqual(outcome(preview, input[:end]), outcome(full_preview, input[:end]), input[:end])
+
+    def test_editing_matches_full_parse(self):
+        rng = random.Random(1)
+        input = " ^ ".join(random_expression(rng, 2) for _ in range(6))
+        for _ in range(500):
+            i = rng.randrange(len(input) + 1)
+            if rng.random() < 0.5 and i < len(input):
+                input = input[:i] + input[i + 1:]
+            else:
+                input = input[:i] + rng.choice("AB&|^~() $") + input[i:]
+            self.assertEqual(outcome(preview, input), outcome(full_preview, input), input)
+
+    def test_errors(self):
+        for input in ["A & | B", "A |", "| A", "A) | B", "A | (B", "A | B $", "A $ | B", "()", ""]:
+            self.assertEqual(outcome(preview, input), outcome(full_preview, input), input)
+
+    def test_reuses_prefix(self):
+        input = " | ".join(f"x{i} & ~y{i}" for i in range(100))
+        preview(input + " | z")
+        hits = PREFIX_CACHE.stats()["hits"]
+
+        self.assertEqual(preview(input + " | z & w"), full_preview(input + " | z & w"))
+        self.assertEqual(PREFIX_CACHE.stats()["hits"], hits + 1)
+
+    def test_limits_match_full_parse(self):
+        SEGMENT_CACHE.clear()
+        PREFIX_CACHE.clear()
+        with mock.patch.object(admission, "LIMITS", Limits(length=40, variables=3, depth=2)):
+            for input in ["A | B | C", "A | B | C | A & B", "A | B | C | D", "A & B | ((C))", "(((A))) | B",
+                          "A | B | C | D | E | F | G | H | I | J", "A | B | C ^ (D"]:
+                self.assertEqual(outcome(preview, input), outcome(full_preview, input), input)
+        SEGMENT_CACHE.clear()
+        PREFIX_CACHE.clear()
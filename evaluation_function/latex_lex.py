@@ -0,0 +1,136 @@
+import re
+
+from .lex import EOF, OPERATORS, Lexer, LexError, Token, TokenType, is_variable
+
+# A lexer for responses written in LaTeX, producing the same tokens as Lexer
+# so that the same parser reads both. It accepts everything Lexer does, and
+# the LaTeX that Expr.to_latex() produces, so rendered expressions can be
+# read back:
+#
+#   \overline{...}, \bar{...}     NOT of the group, e.g. \overline{A \cdot B}
+#   \lnot, \neg                   NOT
+#   \cdot, \land, \wedge, \&      AND
+#   +, \lor, \vee                 OR
+#   \oplus, \veebar               XOR
+#   \left( ... \right), {...}     brackets
+#   \mathrm{name}, \text{name}    a variable with a longer name, as are A_{1}
+#                                 and A_1
+#
+# and ignores spacing commands such as \, and \quad. The input is scanned
+# once, left to right. Input without any LaTeX in it is handed to Lexer,
+# which is faster since it doesn't have to track groups.
+#
+# \overline{A} is read as ~A rather than ~(A), and \overline{\left( X \right)}
+# as ~(X), so that to_latex() and this lexer round-trip to the same tree. To
+# do that in one pass, the bracket \overline opens is written when it is
+# read and removed when the group closes if it turns out to be unnecessary.
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space> \s+ | \\[,;:!\ ] | \\q?quad(?![a-zA-Z]) )
+  | \\(?:overline|bar) \s* (?P<negate> \{ )
+  | \\left \s* (?P<left> \( )
+  | \\right \s* (?P<right> \) )
+  | \\(?:mathrm|text|mathit|operatorname) \s* \{ \s* (?P<name> [^{}\s]* ) \s* \}
+  | (?P<variable> [^\W\d_] (?: [^\W_] | _(?!\{) )* ) (?: _\{ (?P<subscript> \w+ ) \} )?
+  | (?P<command> \\(?:[a-zA-Z]+|.) | \S )
+""", re.VERBOSE)
+
+LATEX_PATTERN = re.compile(r"[\\{}+]")
+
+COMMANDS = {
+    text: Token(type, text) for text, type in [
+        ("\\lnot", TokenType.NOT),
+        ("\\neg", TokenType.NOT),
+        ("\\overline", TokenType.NOT),
+        ("\\bar", TokenType.NOT),
+        ("\\cdot", TokenType.AND),
+        ("\\land", TokenType.AND),
+        ("\\wedge", TokenType.AND),
+        ("\\&", TokenType.AND),
+        ("+", TokenType.OR),
+        ("\\lor", TokenType.OR),
+        ("\\vee", TokenType.OR),
+        ("\\oplus", TokenType.XOR),
+        ("\\veebar", TokenType.XOR),
+        ("{", TokenType.LBRACKET),
+        ("}", TokenType.RBRACKET),
+    ]
+}
+COMMANDS.update(OPERATORS)
+
+LEFT = Token(TokenType.LBRACKET, "\\left(")
+RIGHT = Token(TokenType.RBRACKET, "\\right)")
+NEGATE = Token(TokenType.LBRACKET, "\\overline{")
+
+
+class LatexLexer:
+    def __init__(self, input: str):
+        self.input = input
+
+    def lex(self) -> list[Token]:
+        if not LATEX_PATTERN.search(self.input):
+            return Lexer(self.input).lex()
+
+        stream = []
+        variables = {}
+
+        # The positions in `stream` of the open brackets, and where the
+        # bracket closed last was opened
+        opened = []
+        last_opened = -1
+
+        for match in TOKEN_PATTERN.finditer(self.input):
+            kind = match.lastgroup
+            if kind == "space":
+                continue
+
+            if kind == "variable" or kind == "subscript" or kind == "name":
+                text = match.group("name") if kind == "name" else match.group("variable")
+                if match.group("subscript"):
+                    text += "_" + match.group("subscript")
+                if not is_variable(text):
+                    raise LexError(match.group(), match.start())
+                token = variables.get(text)
+                if token is None:
+                    token = variables[text] = Token(TokenType.VARIABLE, text, text)
+                stream.append(token)
+                continue
+
+            if kind == "negate":
+                stream.append(COMMANDS["\\overline"])
+                token = NEGATE
+            elif kind == "left":
+                token = LEFT
+            elif kind == "right":
+                token = RIGHT
+            else:
+                token = COMMANDS.get(match.group())
+                if token is None:
+                    raise LexError(match.group(), match.start())
+
+            if token.type == TokenType.LBRACKET:
+                opened.append(len(stream))
+                stream.append(token)
+            elif token.type == TokenType.RBRACKET and opened:
+                # Braces can only be closed by braces, and brackets by
+                # brackets
+                start = opened.pop()
+                if (stream[start].text[-1] == "{") != (token.text == "}"):
+                    raise LexError(match.group(), match.start())
+
+                # A negated group that is a single term already doesn't need
+                # a bracket of its own
+                if stream[start] is NEGATE and (
+                    (len(stream) == start + 2 and stream[-1].type == TokenType.VARIABLE)
+                    or (stream[-1].type == TokenType.RBRACKET and last_opened == start + 1)
+                ):
+                    stream[start] = None
+                    continue
+                last_opened = start
+                stream.append(token)
+            else:
+                stream.append(token)
+
+        if None in stream:
+            stream = [token for token in stream if token is not None]
+        stream.append(EOF)
+        return stream
@@ -0,0 +1,85 @@
+import random
+import unittest
+
+from .incremental import preview
+from .latex_lex import LatexLexer
+from .lex import Lexer, LexError, TokenType
+from .parse import FeedbackException, parse_expression
+from .testing import NONE_DISALLOWED, parse, random_expression
+
+
+class TestLatexLexer(unittest.TestCase):
+
+    def test_operators(self):
+        for latex, ascii in [
+            (r"\overline{A} \cdot B + C", "~A & B | C"),
+            (r"\overline{A \cdot B} \oplus \mathrm{Clk}", "~(A & B) ^ Clk"),
+            (r"\lnot A \land \left( B \lor C \right)", "~A & (B | C)"),
+            (r"\neg A \wedge B \vee C \veebar D", "~A & B | C ^ D"),
+            (r"\bar{A} \& \bar B", "~A & ~B"),
+            (r"{A + B} \cdot \text{x_1}", "(A | B) & x_1"),
+            (r"\overline{\overline{A}}", "~(~A)"),
+            (r"A_{1} \, \cdot \quad A_1", "A_1 & A_1"),
+        ]:
+            self.assertIs(parse(latex, latex=True), parse(ascii), latex)
+
+    def test_ascii(self):
+        rng = random.Random(0)
+        for _ in range(100):
+            input = random_expression(rng, 4)
+            self.assertEqual(
+                [(t.type, t.value) for t in LatexLexer(input).lex()],
+                [(t.type, t.value) for t in Lexer(input).lex()],
+            )
+
+    def test_round_trip(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            expr = parse(random_expression(rng, 4))
+            self.assertIs(parse(expr.to_latex(), latex=True), expr)
+
+    def test_errors(self):
+        for input, unexpected, pos in [
+            (r"A \cdot \foo", "\\foo", 8),
+            (r"\overline{A \cdot B)", ")", 19),
+            (r"\left( A }", "}", 9),
+            (r"\mathrm{1A}", "\\mathrm{1A}", 0),
+            (r"\overline{²A}", "²A", 10),
+            ("A + B £", "£", 6),
+        ]:
+            with self.assertRaises(LexError) as cm:
+                LatexLexer(input).lex()
+            self.assertEqual((cm.exception.unexpected, cm.exception.pos), (unexpected, pos))
+
+    def test_unclosed(self):
+        tokens = LatexLexer(r"\overline{A").lex()
+        self.assertEqual([t.type for t in tokens], [TokenType.NOT, TokenType.LBRACKET, TokenType.VARIABLE, TokenType.EOF])
+
+        # The parser asks for the brace the student left open
+        with self.assertRaises(FeedbackException) as cm:
+            parse_expression(r"\overline{A} + \overline{B", NONE_DISALLOWED, latex=True)
+        self.assertEqual(str(cm.exception), "Expected closing '}'")
+        with self.assertRaises(FeedbackException) as cm:
+            parse_expression(r"\left(A + B", NONE_DISALLOWED, latex=True)
+        self.assertEqual(str(cm.exception), "Expected closing ')'")
+
+    def test_long_input(self):
+        input = " + ".join(f"\\overline{{x_{{{i}}} \\cdot y_{{{i}}}}}" for i in range(1000))
+        self.assertEqual(len(LatexLexer(input).lex()), 1000 * 6 + 999 + 1)
+
+    def test_deep_input(self):
+        input = "A"
+        for i in range(1000):
+            input = f"\\overline{{x_{{{i % 5}}} \\oplus {input}}}"
+        expr = parse(input, latex=True)
+        self.assertIs(parse(expr.to_latex(), latex=True), expr)
+
+    def test_is_latex(self):
+        expr = parse_expression(r"\overline{A} + B", NONE_DISALLOWED, latex=True)
+        self.assertEqual(str(expr), "~A | B")
+        self.assertEqual(preview(r"\overline{A} + B", latex=True), ("~A | B", r"\overline{A} + B"))
+        with self.assertRaises(FeedbackException):
+            parse_expression(r"\overline{A} + B", NONE_DISALLOWED)
+        with self.assertRaises(FeedbackException) as cm:
+            parse_expression(r"\overline{A} + B", {**NONE_DISALLOWED, "or": True}, latex=True)
+        self.assertEqual(str(cm.exception), "\"OR\" is not permitted for this question")
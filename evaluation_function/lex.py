@@ -1,10 +1,23 @@
+import re
 from enum import Enum
 
 class LexError(Exception):
-    def __init__(self, char: str):
+    def __init__(self, char: str, pos: int = None):
         self.unexpected = char
+        self.pos = pos
     def __str__(self) -> str:
-        return f"unexpected token \'{self.unexpected}\'"
+        if self.pos is None:
+            return f"unexpected token \'{self.unexpected}\'"
+        return f"unexpected token \'{self.unexpected}\' at position {self.pos + 1}"
+
+# Raised by the parser, and by admission before it, for input that lexes but
+# isn't an expression the question accepts
+class ParseError(Exception):
+
+    def __init__(self, msg: str):
+        self.msg = msg
+    def __str__(self):
+        return self.msg
 
 class TokenType(Enum):
     LBRACKET = 1
@@ -18,79 +31,65 @@ class TokenType(Enum):
     XOR = 9
 
 class Token:
+    __slots__ = ("type", "text", "value")
+
     def __init__(self, type: TokenType, text: str, value=None):
         self.type = type
         self.text = text
         self.value = value
-    
+
     def __str__(self) -> str:
         return str(self.type) if self.type != TokenType.VARIABLE else f"{str(self.type)} = {self.value}"
 
+# Tokens are never modified, so one instance of each operator is shared by
+# every token stream.
+OPERATORS = {
+    char: Token(type, char) for char, type in [
+        ('(', TokenType.LBRACKET),
+        (')', TokenType.RBRACKET),
+        ('~', TokenType.NOT),
+        ('&', TokenType.AND),
+        ('|', TokenType.OR),
+        ('^', TokenType.XOR),
+    ]
+}
+
+EOF = Token(TokenType.EOF, "")
+
+# A variable is a letter followed by any number of letters, digits or
+# underscores. Every other non-space character is a token on its own.
+# \w also matches numeric characters that aren't decimal digits, such as '²'
+# and 'Ⅻ', which can't start a variable either, so words are split off by
+# the pattern and their first character is checked with str.isalpha().
+TOKEN_PATTERN = re.compile(r"[^\W\d_]\w*|\S")
+VARIABLE_PATTERN = re.compile(r"\w+")
+
+def is_variable(text: str) -> bool:
+    return text[:1].isalpha() and VARIABLE_PATTERN.fullmatch(text) is not None
+
 class Lexer:
     def __init__(self, input: str):
-        self.input = input + " " # The space fixes an off-by-one in the lexer
-    
+        self.input = input
+
     def lex(self) -> list[Token]:
-        tokens = []
-        if len(self.input) == 0:
-            return tokens
-
-        in_variable = False
-        curr_variable = ""
-        
-        def get_token_type(char: str) -> TokenType:
-            if char.isspace():
-                return None
-            elif char == '(':
-                return TokenType.LBRACKET
-            elif char == ')':
-                return TokenType.RBRACKET
-            elif char == '~':
-                return TokenType.NOT
-            elif char == '&':
-                return TokenType.AND
-            elif char == '|':
-                return TokenType.OR
-            elif char == '^':
-                return TokenType.XOR
-            elif char.isalpha():
-                return TokenType.VARIABLE
-            else:
-                raise LexError(char)
-
-        for char in self.input:
-            if in_variable:
-                if not (char.isalpha() or char.isnumeric() or char == '_'):
-                    in_variable = False
-                    tokens.append(Token(TokenType.VARIABLE, curr_variable, curr_variable))
-                    curr_variable = ""
-                    try:
-                        curr_token_type = get_token_type(char)
-                        if curr_token_type == None:
-                            continue
-                        if curr_token_type == TokenType.VARIABLE:
-                            in_variable = True
-                            curr_variable += char
-                        else:
-                            tokens.append(Token(curr_token_type, char))
-                    except LexError:
-                        raise
-                else:
-                    curr_variable += char
-
-            else:
-                try:
-                    token_type = get_token_type(char)
-                    if token_type == None:
-                        continue
-                    
-                    if token_type == TokenType.VARIABLE:
-                        in_variable = True
-                        curr_variable += char
-                    else:
-                        tokens.append(Token(token_type, char))
-                except LexError:
-                    raise
-        
-        tokens.append(Token(TokenType.EOF, ""))
-        return tokens
+        texts = TOKEN_PATTERN.findall(self.input)
+
+        # Create one token for each distinct variable, and check for
+        # characters that aren't operators or variables.
+        tokens = OPERATORS.copy()
+        for text in set(texts).difference(tokens):
+            if not is_variable(text):
+                raise self.error()
+            tokens[text] = Token(TokenType.VARIABLE, text, text)
+
+        stream = [tokens[text] for text in texts]
+        stream.append(EOF)
+        return stream
+
+    def error(self) -> LexError:
+        # Find the first unexpected character again, to report its position
+        for match in TOKEN_PATTERN.finditer(self.input):
+            text = match.group()
+            if text not in OPERATORS and not is_variable(text):
+                # Only the first character of a word can be wrong
+                return LexError(text[0], match.start())
@@ -0,0 +1,48 @@
+import unittest
+
+from .lex import Lexer, LexError, TokenType
+
+
+class TestLexer(unittest.TestCase):
+
+    def test_tokens(self):
+        tokens = Lexer("~(A & b_2) | Test1 ^ B").lex()
+
+        self.assertEqual([t.type for t in tokens], [
+            TokenType.NOT, TokenType.LBRACKET, TokenType.VARIABLE, TokenType.AND, TokenType.VARIABLE,
+            TokenType.RBRACKET, TokenType.OR, TokenType.VARIABLE, TokenType.XOR, TokenType.VARIABLE,
+            TokenType.EOF,
+        ])
+        self.assertEqual([t.value for t in tokens if t.type == TokenType.VARIABLE], ["A", "b_2", "Test1", "B"])
+
+    def test_whitespace(self):
+        self.assertEqual([t.text for t in Lexer("A&B").lex()], [t.text for t in Lexer(" A \t&\n B ").lex()])
+        self.assertEqual([t.type for t in Lexer("   ").lex()], [TokenType.EOF])
+
+    def test_unexpected_character(self):
+        with self.assertRaises(LexError) as cm:
+            Lexer("A & B £ C").lex()
+        self.assertEqual(cm.exception.unexpected, "£")
+        self.assertEqual(cm.exception.pos, 6)
+        self.assertEqual(str(cm.exception), "unexpected token '£' at position 7")
+
+    def test_variable_must_start_with_letter(self):
+        for input, unexpected, pos in [("1A", "1", 0), ("A1 & 2", "2", 5), ("_A", "_", 0)]:
+            with self.assertRaises(LexError) as cm:
+                Lexer(input).lex()
+            self.assertEqual((cm.exception.unexpected, cm.exception.pos), (unexpected, pos))
+
+    def test_numeric_characters(self):
+        # Numeric characters that aren't decimal digits can follow the first
+        # letter of a variable, but can't be the first
+        tokens = Lexer("A² & xⅫ").lex()
+        self.assertEqual([t.value for t in tokens if t.type == TokenType.VARIABLE], ["A²", "xⅫ"])
+        for input, unexpected, pos in [("²A", "²", 0), ("A & Ⅻ", "Ⅻ", 4), ("A ^ ½", "½", 4)]:
+            with self.assertRaises(LexError) as cm:
+                Lexer(input).lex()
+            self.assertEqual((cm.exception.unexpected, cm.exception.pos), (unexpected, pos))
+
+    def test_long_input(self):
+        input = " | ".join(f"~(x{i} & y{i})" for i in range(1000))
+        tokens = Lexer(input).lex()
+        self.assertEqual(len(tokens), 1000 * 6 + 999 + 1)
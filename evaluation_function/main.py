@@ -1,15 +1,44 @@
+import sys
+
 from lf_toolkit import create_server, run
 
+from .coalesce import COALESCE, coalesced, evaluation_key, preview_key
 from .evaluation import evaluation_function
 from .preview import preview_function
+from .pool import EvaluationPool, POOL_MAX_TASKS, POOL_WORKERS
+from .warmup import PREWARM, start_prewarm
 
 def main():
+    # `evaluation_function bulk ...` grades a file of submissions offline
+    # instead of starting the server
+    if sys.argv[1:2] == ["bulk"]:
+        from .bulk import main as bulk_main
+        return bulk_main(sys.argv[2:])
+
     server = create_server()
 
-    server.eval(evaluation_function)
-    server.preview(preview_function)
+    # Optionally evaluate requests in a pool of worker processes
+    if POOL_WORKERS > 0:
+        pool = EvaluationPool(POOL_WORKERS, POOL_MAX_TASKS or None).start()
+        eval_handler, preview_handler = pool.evaluation_function, pool.preview_function
+    else:
+        eval_handler, preview_handler = evaluation_function, preview_function
+
+    # Identical requests that arrive while one is being evaluated wait for
+    # its result rather than evaluating it again
+    if COALESCE:
+        eval_handler = coalesced(eval_handler, evaluation_key)
+        preview_handler = coalesced(preview_handler, preview_key)
+
+    server.eval(eval_handler)
+    server.preview(preview_handler)
+
+    # The pool's workers warm themselves up when they start; otherwise the
+    # server process can do so in the background once it is running.
+    if PREWARM and POOL_WORKERS == 0:
+        start_prewarm()
 
     run(server)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
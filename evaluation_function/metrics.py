@@ -0,0 +1,287 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+# Process-wide counters, e.g. how often evaluations ran out of budget
+COUNTERS = Counter()
+_lock = threading.Lock()
+
+
+def increment(name: str, amount: int = 1):
+    with _lock:
+        COUNTERS[name] += amount
+
+
+def counters() -> dict[str, int]:
+    with _lock:
+        return dict(COUNTERS)
+
+
+# Performance instrumentation: how long each stage of a request takes, and
+# how large the expressions and the work were. This is off unless
+# EVAL_METRICS lists where to send it, as comma-separated sinks:
+#
+#   jsonl:<path>       append one JSON line per request
+#   prometheus:<path>  keep a Prometheus text exposition file up to date
+#
+# Paths may contain {pid}, so each worker process can write its own file.
+# When it is off, timing a stage costs a single function call.
+
+TIME_BUCKETS = [
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+]
+SIZE_BUCKETS = [2 ** i for i in range(18)]
+
+# Minimum seconds between rewrites of a Prometheus exposition file
+PROMETHEUS_INTERVAL = 1.0
+
+
+class Histogram:
+    """
+    Counts of observations in fixed buckets, as in a Prometheus histogram.
+    Quantiles are estimated by interpolating within a bucket.
+    """
+
+    def __init__(self, buckets: list[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+HISTOGRAMS: dict[str, Histogram] = {}
+
+# Caches whose statistics are included in the Prometheus exposition
+CACHES = {}
+
+
+def observe(name: str, value: float, buckets: list[float] = TIME_BUCKETS):
+    with _lock:
+        histogram = HISTOGRAMS.get(name)
+        if histogram is None:
+            histogram = HISTOGRAMS[name] = Histogram(buckets)
+        histogram.observe(value)
+
+
+def register_cache(name: str, cache):
+    CACHES[name] = cache
+
+
+class Trace:
+    # What was measured while handling one request
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.values = {}
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        observe(f"stage_seconds:{self.name}", elapsed)
+        trace = _trace.get()
+        if trace is not None:
+            trace.stages[self.name] = trace.stages.get(self.name, 0.0) + elapsed
+
+
+class _Request(_Stage):
+    __slots__ = ("trace", "token")
+
+    def __enter__(self):
+        self.trace = Trace(self.name)
+        self.token = _trace.set(self.trace)
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _trace.reset(self.token)
+        observe(f"request_seconds:{self.name}", elapsed)
+        emit(self.trace, elapsed)
+
+
+class _Disabled:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_DISABLED = _Disabled()
+
+ENABLED = False
+SINKS: list[tuple[str, str]] = []
+_files = {}
+_last_exposition = {}
+
+
+def configure(spec: str):
+    """
+    Set where measurements are sent, in the format of EVAL_METRICS. An empty
+    string turns instrumentation off.
+    """
+    global ENABLED, SINKS
+    with _lock:
+        for f in _files.values():
+            f.close()
+        _files.clear()
+    sinks = []
+    for sink in filter(None, (part.strip() for part in spec.split(","))):
+        kind, _, path = sink.partition(":")
+        if kind not in ("jsonl", "prometheus") or not path:
+            raise ValueError(f"unknown metrics sink '{sink}'")
+        sinks.append((kind, path.format(pid=os.getpid())))
+    SINKS = sinks
+    ENABLED = bool(sinks)
+
+
+def stage(name: str):
+    """
+    Time a stage of the request being handled, e.g. `with stage("parse"):`.
+    """
+    return _Stage(name) if ENABLED else _DISABLED
+
+
+def request(kind: str):
+    """
+    Time a whole request, collecting the stages and values recorded while it
+    is handled, and send them to the configured sinks when it finishes.
+    """
+    return _Request(kind) if ENABLED else _DISABLED
+
+
+def record(name: str, value: float):
+    """
+    Record a value for the request being handled, e.g. the number of
+    variables. Callers should check ENABLED first when the value is
+    expensive to compute.
+    """
+    if not ENABLED:
+        return
+    observe(name, value, SIZE_BUCKETS)
+    trace = _trace.get()
+    if trace is not None:
+        trace.values[name] = value
+
+
+def count(name: str):
+    """
+    Count an event for the request being handled, e.g. a cache hit.
+    """
+    if not ENABLED:
+        return
+    increment(name)
+    trace = _trace.get()
+    if trace is not None:
+        trace.values[name] = trace.values.get(name, 0) + 1
+
+
+def emit(trace: Trace, elapsed: float):
+    for kind, path in SINKS:
+        if kind == "jsonl":
+            line = json.dumps({
+                "time": time.time(),
+                "request": trace.kind,
+                "seconds": elapsed,
+                "stages": trace.stages,
+                "values": trace.values,
+            })
+            with _lock:
+                f = _files.get(path)
+                if f is None:
+                    f = _files[path] = open(path, "a", buffering=1)
+                f.write(line + "\n")
+        elif kind == "prometheus":
+            now = time.monotonic()
+            if now - _last_exposition.get(path, 0.0) >= PROMETHEUS_INTERVAL:
+                _last_exposition[path] = now
+                write_exposition(path)
+
+
+def write_exposition(path: str):
+    # Write to a temporary file first, so a scraper never reads half a file
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "w") as f:
+        f.write(prometheus_text())
+    os.replace(temporary, path)
+
+
+def prometheus_text() -> str:
+    lines = []
+    with _lock:
+        for name, value in sorted(COUNTERS.items()):
+            lines.append(f"# TYPE evaluation_{name}_total counter")
+            lines.append(f"evaluation_{name}_total {value}")
+
+        for key, histogram in sorted(HISTOGRAMS.items()):
+            name, _, label = key.partition(":")
+            labels = f'stage="{label}"' if name == "stage_seconds" else f'request="{label}"' if label else ""
+            if f"# TYPE evaluation_{name} histogram" not in lines:
+                lines.append(f"# TYPE evaluation_{name} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'evaluation_{name}_bucket{{{labels + "," if labels else ""}le="{bound}"}} {cumulative}')
+            lines.append(f'evaluation_{name}_bucket{{{labels + "," if labels else ""}le="+Inf"}} {histogram.count}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"evaluation_{name}_sum{suffix} {histogram.sum}")
+            lines.append(f"evaluation_{name}_count{suffix} {histogram.count}")
+
+    for name, cache in sorted(CACHES.items()):
+        for stat, value in cache.stats().items():
+            lines.append(f'evaluation_cache_{stat}{{cache="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def summary() -> dict[str, dict[str, float]]:
+    """
+    The count and estimated p50 and p99 of every histogram, e.g. for printing
+    at the end of a benchmark.
+    """
+    with _lock:
+        return {
+            name: {"count": h.count, "p50": h.quantile(0.5), "p99": h.quantile(0.99)}
+            for name, h in HISTOGRAMS.items()
+        }
+
+
+configure(os.environ.get("EVAL_METRICS", ""))
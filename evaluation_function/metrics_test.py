@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+
+from .budget import Budget
+from .parse import parse_expression
+from .testing import NONE_DISALLOWED
+from . import metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        metrics.configure("")
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_histogram_quantiles(self):
+        histogram = metrics.Histogram([1, 2, 4, 8])
+        for value in [0.5] * 50 + [3] * 49 + [7]:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.quantile(0.5), 1.0)
+        self.assertTrue(2 < histogram.quantile(0.99) <= 4)
+
+    def test_disabled(self):
+        metrics.configure("")
+        with metrics.request("eval") as request:
+            with metrics.stage("parse") as stage:
+                metrics.record("variables", 3)
+        self.assertIs(request, stage)
+
+    def test_jsonl(self):
+        path = self.path("metrics.jsonl")
+        metrics.configure(f"jsonl:{path}")
+
+        for input in ["A & B", "A | ~(B ^ C)"]:
+            with metrics.request("eval"):
+                expr = parse_expression(input, NONE_DISALLOWED)
+                Budget().check_size(expr)
+                metrics.count("result_cache_miss")
+
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[1]["request"], "eval")
+        self.assertEqual(set(lines[1]["stages"]), {"admit", "lex", "parse"})
+        self.assertEqual(lines[1]["values"], {"ast_nodes": 10, "result_cache_miss": 1})
+
+    def test_prometheus(self):
+        path = self.path("metrics-{pid}.prom")
+        metrics.configure(f"prometheus:{path}")
+
+        with metrics.request("preview"):
+            parse_expression("A & B", NONE_DISALLOWED)
+
+        with open(path.format(pid=os.getpid())) as f:
+            text = f.read()
+        self.assertIn("# TYPE evaluation_stage_seconds histogram", text)
+        self.assertIn('evaluation_stage_seconds_bucket{stage="parse",le="+Inf"}', text)
+        self.assertIn('evaluation_request_seconds_count{request="preview"}', text)
+
+    def test_unknown_sink(self):
+        with self.assertRaises(ValueError):
+            metrics.configure("statsd:localhost")
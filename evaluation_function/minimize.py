@@ -0,0 +1,401 @@
+import math
+import os
+from typing import Optional
+
+from .ast import Expr
+from .budget import Budget
+from .cache import LRUCache
+from . import metrics, truth_table
+
+# Two-level minimisation of truth tables into a small, usually minimal, sum
+# of products.
+#
+# A cube (product term) is a pair of ints (care, value): bit i of `care` is set
+# if variable i appears in the product, and bit i of `value` gives its
+# polarity. Functions are truth tables packed into ints as in truth_table.py,
+# so whether a cube is an implicant is a single bitwise test.
+#
+# Up to EXACT_VARIABLES variables, the prime implicants are found with
+# Quine-McCluskey and a cover with the fewest products (then literals) is
+# searched for by branch and bound. The search is exact unless it takes more
+# than MAX_COVER_STEPS steps, which only happens for the odd function with
+# many overlapping primes (one of thirty random 8 variable functions tried,
+# and none of the short sums of products set as questions); the cover is then
+# only near-minimal, and the cut is counted as minimize_cover_truncated. Up to
+# MAX_VARIABLES, an Espresso style heuristic expands each uncovered minterm
+# into a prime and then drops redundant primes, which is also near-minimal.
+# The result only depends on the function, so it is a canonical form. Parity
+# functions have no small sum of products (XOR of 12 variables has 2048
+# products), which is why MAX_VARIABLES is low. The time budget of the
+# request, if given, is checked as the cover is built, so that such functions
+# can't hold up a request.
+EXACT_VARIABLES = 8
+MAX_VARIABLES = int(os.environ.get("MINIMIZE_MAX_VARIABLES", 10))
+
+# Limit on the branch and bound search for a minimum cover, after which the
+# best cover found so far is used.
+MAX_COVER_STEPS = 1_000
+
+# How many steps of the cover search happen between checks of the time budget
+CHECK_INTERVAL = 16
+
+MINIMAL_CACHE = LRUCache(max_entries=int(os.environ.get("MINIMIZE_CACHE_SIZE", 4096)))
+metrics.register_cache("minimize", MINIMAL_CACHE)
+
+
+def popcount(x: int) -> int:
+    return bin(x).count("1")
+
+
+def cube_rows(care: int, value: int, masks: list[int], full: int) -> int:
+    # The rows (as a bitset) on which the cube is true
+    rows = full
+    for i, mask in enumerate(masks):
+        if care >> i & 1:
+            rows &= mask if value >> i & 1 else mask ^ full
+    return rows
+
+
+def support(table: int, n: int) -> list[int]:
+    # The variables the function actually depends on
+    masks, full = truth_table.variable_masks(list(range(n)))
+    return [i for i in range(n) if (table & masks[i]) >> (1 << i) != table & (masks[i] ^ full)]
+
+
+def project(table: int, keep: list[int]) -> int:
+    # The table over only the variables in `keep`, which must include every
+    # variable the function depends on
+    out = 0
+    for row in range(1 << len(keep)):
+        original = 0
+        for j, i in enumerate(keep):
+            original |= (row >> j & 1) << i
+        out |= (table >> original & 1) << row
+    return out
+
+
+def prime_implicants(table: int, n: int) -> list[tuple[int, int]]:
+    # Quine-McCluskey: repeatedly merge cubes that differ in a single
+    # literal; the cubes that can't be merged are the primes.
+    all_care = (1 << n) - 1
+    cubes = {(all_care, row) for row in range(1 << n) if table >> row & 1}
+    primes = []
+    while cubes:
+        merged = set()
+        used = set()
+        by_care = {}
+        for care, value in cubes:
+            by_care.setdefault(care, set()).add(value)
+        for care, values in by_care.items():
+            for value in values:
+                for i in range(n):
+                    bit = 1 << i
+                    if care & bit and not value & bit and value | bit in values:
+                        merged.add((care & ~bit, value))
+                        used.add((care, value))
+                        used.add((care, value | bit))
+        primes.extend(cubes - used)
+        cubes = merged
+    return primes
+
+
+def literal_count(cube: tuple[int, int]) -> int:
+    return popcount(cube[0])
+
+
+def minterms(table: int) -> list[int]:
+    rows = []
+    while table:
+        lowest = table & -table
+        rows.append(lowest.bit_length() - 1)
+        table ^= lowest
+    return rows
+
+
+def reduce_cover(uncovered: int, candidates: list, rows: dict) -> Optional[tuple[list, int, list, dict]]:
+    # Simplify a covering problem until none of these apply:
+    # - a prime whose uncovered minterms another covers too, with no more
+    #   literals, is never needed
+    # - a prime that is the only one left covering some minterm is
+    # - a minterm covered by every prime covering some other minterm will
+    #   be covered anyway
+    # Returns the primes that must be chosen, the minterms still to cover,
+    # the primes still worth choosing from and the ones covering each
+    # minterm left, or None if some minterm can't be covered.
+    chosen = []
+    options = {}
+    while uncovered:
+        covers = {prime: rows[prime] & uncovered for prime in candidates}
+        sizes = {prime: popcount(cover) for prime, cover in covers.items()}
+        kept = []
+        options = {}
+        for prime in sorted(candidates, key=lambda p: (-sizes[p], literal_count(p), p)):
+            cover = covers[prime]
+            if not cover:
+                continue
+            # Any prime covering all of this one's minterms covers its lowest
+            lowest = (cover & -cover).bit_length() - 1
+            if any(
+                not cover & ~covers[other] and literal_count(other) <= literal_count(prime)
+                for other in options.get(lowest, ())
+            ):
+                continue
+            kept.append(prime)
+            for row in minterms(cover):
+                options.setdefault(row, []).append(prime)
+        changed = len(kept) < len(candidates)
+        candidates = kept
+        if len(options) < popcount(uncovered):
+            return None
+
+        essential = {primes[0] for primes in options.values() if len(primes) == 1}
+        if essential:
+            for prime in sorted(essential):
+                chosen.append(prime)
+                uncovered &= ~rows[prime]
+            candidates = [prime for prime in kept if prime not in essential]
+            continue
+
+        # The same as bitsets of indexes in kept, to compare them quickly
+        index = {prime: 1 << i for i, prime in enumerate(kept)}
+        needed = []
+        for row, primes in sorted(options.items(), key=lambda item: (len(item[1]), item[0])):
+            option = 0
+            for prime in primes:
+                option |= index[prime]
+            if any(not other & ~option for other in needed):
+                uncovered &= ~(1 << row)
+                del options[row]
+                changed = True
+            else:
+                needed.append(option)
+        if not changed:
+            break
+    return chosen, uncovered, candidates, options
+
+
+def lower_bound(options: dict, rows: dict) -> tuple[int, int]:
+    # Two bounds on the products (and literals) still needed to cover the
+    # minterms in `options`, of which the larger is used: minterms no two of
+    # which share a prime each need a product of their own, and a product
+    # covering k of the minterms left only accounts for 1/k of a product
+    # per minterm.
+    products = literals = 0
+    share_products = share_literals = 0.0
+    used = 0
+    for primes in sorted(options.values(), key=len):
+        covered = 0
+        for prime in primes:
+            covered |= rows[prime]
+        if not covered & used:
+            used |= covered
+            products += 1
+            literals += min(map(literal_count, primes))
+        sizes = [popcount(rows[prime]) for prime in primes]
+        share_products += 1 / max(sizes)
+        share_literals += min(literal_count(prime) / size for prime, size in zip(primes, sizes))
+    # Allow for rounding before taking the ceiling
+    return max(products, math.ceil(share_products - 1e-9)), max(literals, math.ceil(share_literals - 1e-9))
+
+
+def exact_cover(
+    primes: list[tuple[int, int]], table: int, masks: list[int], full: int, budget: Optional[Budget] = None,
+) -> list[tuple[int, int]]:
+    rows = {prime: cube_rows(*prime, masks, full) & table for prime in primes}
+    chosen, uncovered, candidates, _ = reduce_cover(table, primes, rows)
+    if not uncovered:
+        return chosen
+
+    # Start from a greedy cover, so the search only has to look for better
+    # ones. The rows of the remaining primes are restricted to the minterms
+    # left, so the bounds only count those.
+    rows = {prime: rows[prime] & uncovered for prime in candidates}
+    greedy = irredundant(greedy_cover(candidates, uncovered, rows), uncovered, rows, budget)
+    best = [greedy, (len(greedy), sum(map(literal_count, greedy)))]
+    steps = [0]
+    truncated = [False]
+
+    # Branch on the uncovered minterm with the fewest primes covering it,
+    # leaving out of later branches the primes earlier ones chose, and
+    # simplify each subproblem before bounding it. The search stops after
+    # MAX_COVER_STEPS, keeping the best cover found so far.
+    def search(uncovered: int, candidates: list, picked: list, cost: tuple[int, int]):
+        steps[0] += 1
+        if budget is not None and steps[0] % CHECK_INTERVAL == 0:
+            budget.check()
+        reduced = reduce_cover(uncovered, candidates, rows)
+        if reduced is None:
+            return
+        forced, uncovered, candidates, options = reduced
+        picked = picked + forced
+        cost = (cost[0] + len(forced), cost[1] + sum(map(literal_count, forced)))
+        if not uncovered:
+            if cost < best[1]:
+                best[0], best[1] = picked, cost
+            return
+        products, literals = lower_bound(options, rows)
+        if (cost[0] + products, cost[1] + literals) >= best[1]:
+            return
+        if steps[0] > MAX_COVER_STEPS:
+            truncated[0] = True
+            return
+        row = min(options, key=lambda row: (len(options[row]), row))
+        for prime in sorted(options[row], key=lambda p: (-popcount(rows[p] & uncovered), literal_count(p), p)):
+            candidates = [other for other in candidates if other != prime]
+            search(uncovered & ~rows[prime], candidates, picked + [prime], (cost[0] + 1, cost[1] + literal_count(prime)))
+
+    search(uncovered, candidates, [], (0, 0))
+    if truncated[0]:
+        metrics.increment("minimize_cover_truncated")
+    return chosen + best[0]
+
+
+def greedy_cover(candidates: list, uncovered: int, rows: dict) -> list[tuple[int, int]]:
+    chosen = []
+    while uncovered:
+        prime = max(candidates, key=lambda p: (popcount(rows[p] & uncovered), -literal_count(p), p))
+        chosen.append(prime)
+        uncovered &= ~rows[prime]
+    return chosen
+
+
+def irredundant(
+    cubes: list[tuple[int, int]], table: int, rows: dict, budget: Optional[Budget] = None,
+) -> list[tuple[int, int]]:
+    # Drop products whose minterms are all covered by the others, trying the
+    # largest products first
+    kept = sorted(cubes, key=lambda cube: (-literal_count(cube), cube))
+    for cube in list(kept):
+        if budget is not None:
+            budget.check()
+        others = 0
+        for other in kept:
+            if other != cube:
+                others |= rows[other]
+        if not rows[cube] & table & ~others:
+            kept.remove(cube)
+    return kept
+
+
+def heuristic_cover(
+    table: int, n: int, masks: list[int], full: int, budget: Optional[Budget] = None,
+) -> list[tuple[int, int]]:
+    # Expand: grow each minterm not yet covered into a prime, by dropping
+    # literals for as long as the product stays inside the function.
+    cubes = []
+    covered = 0
+    all_care = (1 << n) - 1
+    row = 0
+    while (table & ~covered) >> row:
+        if (table & ~covered) >> row & 1:
+            if budget is not None:
+                budget.check()
+            care, value = all_care, row
+            rows = cube_rows(care, value, masks, full)
+            # Try dropping the literals that cover the most new minterms first
+            while True:
+                options = []
+                for i in range(n):
+                    if care >> i & 1:
+                        grown = cube_rows(care & ~(1 << i), value & ~(1 << i), masks, full)
+                        if not grown & ~table:
+                            options.append((popcount(grown & ~covered), -i, i, grown))
+                if not options:
+                    break
+                _, _, i, rows = max(options)
+                care &= ~(1 << i)
+                value &= ~(1 << i)
+            cubes.append((care, value))
+            covered |= rows
+        row += 1
+
+    rows = {cube: cube_rows(*cube, masks, full) for cube in cubes}
+    return irredundant(cubes, table, rows, budget)
+
+
+def format_sop(cubes: list[tuple[int, int]], names: list[str]) -> str:
+    products = []
+    for care, value in cubes:
+        literals = [("" if value >> i & 1 else "~") + name for i, name in enumerate(names) if care >> i & 1]
+        products.append(" & ".join(literals))
+    products.sort(key=lambda product: (product.count("&"), product))
+    return " | ".join(products)
+
+
+def minimal_sop(table: int, names: list[str], budget: Optional[Budget] = None) -> str:
+    """
+    A minimal (or near-minimal, see above) sum of products for the function
+    with truth table `table` over `names`, which must not have more than
+    MAX_VARIABLES variables. Constant
+    functions are "0" and "1". Raises BudgetExceeded if `budget` runs out.
+    """
+    key = (tuple(names), table)
+    out = MINIMAL_CACHE.get(key)
+    if out is not None:
+        return out
+
+    n = len(names)
+    full = (1 << (1 << n)) - 1
+    if table == 0 or table == full:
+        out = "1" if table else "0"
+    else:
+        # Minimise over only the variables the function depends on, so the
+        # result doesn't depend on which others were mentioned
+        keep = support(table, n)
+        if len(keep) < n:
+            table = project(table, keep)
+            names = [names[i] for i in keep]
+            n = len(keep)
+            full = (1 << (1 << n)) - 1
+
+        masks, _ = truth_table.variable_masks(list(range(n)))
+        masks = [masks[i] for i in range(n)]
+        if n <= EXACT_VARIABLES:
+            cubes = exact_cover(sorted(prime_implicants(table, n)), table, masks, full, budget)
+        else:
+            cubes = heuristic_cover(table, n, masks, full, budget)
+        out = format_sop(cubes, names)
+
+    MINIMAL_CACHE.put(key, out)
+    return out
+
+
+def minimal_pos(table: int, names: list[str], budget: Optional[Budget] = None) -> str:
+    """
+    A minimal product of sums, found by minimising the complement.
+    """
+    full = (1 << (1 << len(names))) - 1
+    complement = minimal_sop(table ^ full, names, budget)
+    if complement in ("0", "1"):
+        return "1" if complement == "0" else "0"
+    sums = []
+    for product in complement.split(" | "):
+        literals = [literal[1:] if literal.startswith("~") else "~" + literal for literal in product.split(" & ")]
+        sums.append(" | ".join(literals) if len(literals) == 1 else "(" + " | ".join(literals) + ")")
+    return " & ".join(sums)
+
+
+def minimize(expr: Expr, budget: Optional[Budget] = None) -> Optional[str]:
+    """
+    The minimal sum of products of an expression, or None if it has too many
+    variables to minimise. Raises BudgetExceeded if `budget` runs out.
+    """
+    names = sorted(truth_table.variables(expr))
+    if len(names) > MAX_VARIABLES:
+        return None
+    with metrics.stage("minimize"):
+        return minimal_sop(truth_table.truth_table(expr, names), names, budget)
+
+
+def simplest(expr: Expr, budget: Optional[Budget] = None) -> Optional[str]:
+    """
+    The shorter of the minimal sum of products and the minimal product of
+    sums of an expression, or None if it has too many variables to minimise.
+    Raises BudgetExceeded if `budget` runs out.
+    """
+    names = sorted(truth_table.variables(expr))
+    if len(names) > MAX_VARIABLES:
+        return None
+    with metrics.stage("minimize"):
+        table = truth_table.truth_table(expr, names)
+        return min(minimal_sop(table, names, budget), minimal_pos(table, names, budget), key=len)
@@ -0,0 +1,95 @@
+import functools
+import operator
+import random
+import unittest
+from itertools import combinations
+
+from .budget import Budget, BudgetExceeded
+from .minimize import MINIMAL_CACHE, cube_rows, minimal_pos, minimal_sop, minimize, prime_implicants, simplest, support
+from .testing import parse
+from . import truth_table
+
+
+def table(input: str, names: list[str]) -> int:
+    return truth_table.truth_table(parse(input), names)
+
+
+class TestMinimize(unittest.TestCase):
+
+    def test_known_forms(self):
+        for input, minimal in [
+            ("A & B | A & ~B", "A"),
+            ("A | A & B", "A"),
+            ("~(~A & ~B)", "A | B"),
+            ("A ^ B", "A & ~B | ~A & B"),
+            ("A & B | ~A & C | B & C", "A & B | ~A & C"),
+            ("~A & ~B & ~C | ~A & B & ~C | A & ~B & ~C | A & B & ~C | A & B & C", "~C | A & B"),
+        ]:
+            self.assertEqual(minimize(parse(input)), minimal, input)
+
+    def test_constants(self):
+        self.assertEqual(minimize(parse("A | ~A")), "1")
+        self.assertEqual(minimize(parse("A & ~A")), "0")
+        self.assertEqual(minimal_pos(0, ["A"]), "0")
+        self.assertEqual(minimal_pos(0b11, ["A"]), "1")
+
+    def test_canonical(self):
+        # Equivalent responses have the same minimal form, whichever unused
+        # variables they mention
+        self.assertEqual(minimize(parse("A & B | C & (D | ~D)")), minimize(parse("C | B & A")))
+
+    def test_support(self):
+        self.assertEqual(support(table("A & C | A & ~C", ["A", "B", "C"]), 3), [0])
+
+    def test_prime_implicants(self):
+        # A & B, ~A & C and B & C
+        primes = prime_implicants(table("A & B | ~A & C", ["A", "B", "C"]), 3)
+        self.assertEqual(sorted(primes), [(0b011, 0b011), (0b101, 0b100), (0b110, 0b110)])
+
+    def test_minimum_cover(self):
+        # The fewest products, checked against every combination of primes
+        rng = random.Random(1)
+        names = ["A", "B", "C", "D"]
+        masks = [truth_table.variable_masks(names)[0][name] for name in names]
+        full = (1 << 16) - 1
+        for _ in range(40):
+            original = rng.getrandbits(16)
+            if original in (0, full):
+                continue
+            primes = prime_implicants(original, 4)
+            rows = [cube_rows(*prime, masks, full) for prime in primes]
+            fewest = next(
+                k for k in range(1, len(primes) + 1)
+                if any(functools.reduce(operator.or_, cover) == original for cover in combinations(rows, k))
+            )
+            self.assertEqual(minimal_sop(original, names).count("|") + 1, fewest, bin(original))
+
+    def test_pos(self):
+        self.assertEqual(minimal_pos(table("A & B | A & C", ["A", "B", "C"]), ["A", "B", "C"]), "A & (B | C)")
+
+    def test_simplest(self):
+        self.assertEqual(simplest(parse("A & B | A & C")), "A & (B | C)")
+        self.assertEqual(simplest(parse("A & B | C")), "C | A & B")
+
+    def test_budget(self):
+        # Nothing is cached for a minimisation that ran out of time
+        MINIMAL_CACHE.clear()
+        parity = parse(" ^ ".join(f"x{i}" for i in range(10)))
+        with self.assertRaises(BudgetExceeded):
+            minimize(parity, Budget(0))
+        self.assertEqual(MINIMAL_CACHE.stats()["entries"], 0)
+        self.assertEqual(minimize(parity, Budget(10)).count("|"), 511)
+
+    def test_too_many_variables(self):
+        self.assertIsNone(minimize(parse(" ^ ".join(f"x{i}" for i in range(11)))))
+
+    def test_random_functions(self):
+        # Both forms compute the original function, for the exact and the
+        # heuristic covers
+        rng = random.Random(0)
+        for n in (3, 5, 8, 9):
+            names = [f"x{i}" for i in range(n)]
+            for _ in range(3):
+                original = rng.getrandbits(1 << n)
+                self.assertEqual(table(minimal_sop(original, names), names), original)
+                self.assertEqual(table(minimal_pos(original, names), names), original)
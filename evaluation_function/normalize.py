@@ -0,0 +1,194 @@
+from .ast import Expr, Prod, Term, subexpressions
+
+# A normal form for parsed expressions, used as a cache key for student
+# responses. Whitespace and redundant brackets are dropped, nested AND, OR and
+# XOR chains are flattened, and the operands of each chain are sorted.
+#
+# Two expressions with the same normal form use exactly the same operators,
+# are logically equivalent and are equal as sympy expressions. They can
+# therefore share an evaluation result even when `enforce_expression_equality`
+# or `disallowed` is set.
+
+PROD, OR, XOR, MIXED = "&", "|", "^", None
+
+
+class Normalized:
+    # The normal form of a bracketed expression, along with what is needed to
+    # flatten it into an enclosing chain of the same operator.
+    def __init__(self, kind: str, operands: list[str], text: str):
+        self.kind = kind
+        self.operands = operands
+        self.text = text
+
+
+def unwrap(term: Term):
+    # Strip brackets that only contain a single term, e.g. ((A))
+    while not isinstance(term.term, str) and not term.term.right and not term.term.left.right:
+        inner = term.term.left.left
+        if term.op and inner.op:
+            break
+        term = Term(inner.term, term.op or inner.op)
+    return term
+
+
+def norm_term(term: Term, normalized: dict) -> str:
+    if isinstance(term.term, str):
+        out = term.term
+    else:
+        out = f"({normalized[id(term.term)].text})"
+    return "~" + out if term.op else out
+
+
+def prod_operands(prod: Prod, normalized: dict) -> list[str]:
+    operands = []
+    for term in prod.terms():
+        term = unwrap(term)
+        nested = None if isinstance(term.term, str) else normalized[id(term.term)]
+        # (A & B) & C is the same as A & B & C
+        if not term.op and nested is not None and nested.kind == PROD:
+            operands += nested.operands
+        else:
+            operands.append(norm_term(term, normalized))
+    return operands
+
+
+def norm_chain(expr: Expr, normalized: dict) -> Normalized:
+    prods = [sorted(prod_operands(prod, normalized)) for prod in expr.prods()]
+    texts = [PROD.join(operands) for operands in prods]
+
+    ops = {xor for xor, _ in expr.right}
+    if not ops:
+        return Normalized(PROD, prods[0], texts[0])
+
+    if len(ops) > 1:
+        # A mixed chain of OR and XOR is evaluated left to right, so it is only
+        # commutative within each operand.
+        out = texts[0]
+        for (xor, _), text in zip(expr.right, texts[1:]):
+            out += (XOR if xor else OR) + text
+        return Normalized(MIXED, [], out)
+
+    kind = XOR if ops.pop() else OR
+    operands = []
+    for prod, text in zip(expr.prods(), texts):
+        term = unwrap(prod.left)
+        nested = None if isinstance(term.term, str) else normalized[id(term.term)]
+        # (A | B) | C is the same as A | B | C, and likewise for XOR
+        if not prod.right and not term.op and nested is not None and nested.kind == kind:
+            operands += nested.operands
+        else:
+            operands.append(text)
+    operands.sort()
+    return Normalized(kind, operands, kind.join(operands))
+
+
+def normal_form(expr: Expr) -> str:
+    # Normalize the innermost bracketed expressions first
+    normalized = {}
+    for nested in subexpressions(expr):
+        normalized[id(nested)] = norm_chain(nested, normalized)
+    return normalized[id(expr)].text
+
+
+# A canonical form for deciding whether two expressions are written the same
+# way, up to the order of operands. It applies the same rules sympy does when
+# building an expression without simplifying it: nested AND, OR and XOR
+# chains are flattened, repeated operands of AND and OR are dropped, pairs of
+# repeated XOR operands cancel out and double negations are removed.
+
+NOT, VARIABLE, TRUE, FALSE = "~", "v", "1", "0"
+
+
+class Canonical:
+    def __init__(self, kind: str, operands: list = (), text: str = None):
+        self.kind = kind
+        self.operands = operands
+        self.text = kind if text is None else text
+
+
+CANONICAL_TRUE, CANONICAL_FALSE = Canonical(TRUE), Canonical(FALSE)
+
+
+def canon_compound(kind: str, operands: list[Canonical]) -> Canonical:
+    operands.sort(key=lambda operand: operand.text)
+    return Canonical(kind, operands, "(" + kind.join(operand.text for operand in operands) + ")")
+
+
+def canon_not(operand: Canonical) -> Canonical:
+    if operand.kind == NOT:
+        return operand.operands[0]
+    if operand.kind in (TRUE, FALSE):
+        return CANONICAL_FALSE if operand.kind == TRUE else CANONICAL_TRUE
+    return Canonical(NOT, [operand], NOT + operand.text)
+
+
+def canon_lattice(kind: str, args: list[Canonical]) -> Canonical:
+    # AND and OR: the identity is dropped and the absorbing element absorbs
+    identity, absorbing = (TRUE, FALSE) if kind == PROD else (FALSE, TRUE)
+    operands = {}
+    for arg in args:
+        for operand in arg.operands if arg.kind == kind else [arg]:
+            if operand.kind == absorbing:
+                return operand
+            if operand.kind != identity:
+                operands.setdefault(operand.text, operand)
+    if not operands:
+        return CANONICAL_TRUE if identity == TRUE else CANONICAL_FALSE
+    if len(operands) == 1:
+        return next(iter(operands.values()))
+    return canon_compound(kind, list(operands.values()))
+
+
+def canon_xor(args: list[Canonical]) -> Canonical:
+    negated = False
+    operands = {}
+    for arg in args:
+        for operand in arg.operands if arg.kind == XOR else [arg]:
+            if operand.kind == TRUE:
+                negated = not negated
+            elif operand.kind != FALSE:
+                # A ^ A is always false
+                if operands.pop(operand.text, None) is None:
+                    operands[operand.text] = operand
+    if not operands:
+        out = CANONICAL_FALSE
+    elif len(operands) == 1:
+        out = next(iter(operands.values()))
+    else:
+        out = canon_compound(XOR, list(operands.values()))
+    return canon_not(out) if negated else out
+
+
+def canon_term(term: Term, canonical: dict) -> Canonical:
+    if isinstance(term.term, str):
+        out = Canonical(VARIABLE, [], term.term)
+    else:
+        out = canonical[id(term.term)]
+    return canon_not(out) if term.op else out
+
+
+def canon_chain(expr: Expr, canonical: dict) -> Canonical:
+    # Runs of the same operator are combined left to right, as in conv_chain
+    def combine(args, xor):
+        return canon_xor(args) if xor else canon_lattice(OR, args)
+
+    def prod(prod):
+        return canon_lattice(PROD, [canon_term(term, canonical) for term in prod.terms()])
+
+    args = [prod(expr.left)]
+    chain_xor = None
+    for xor, right in expr.right:
+        if chain_xor is not None and xor != chain_xor:
+            args = [combine(args, chain_xor)]
+        chain_xor = xor
+        args.append(prod(right))
+    if chain_xor is None:
+        return args[0]
+    return combine(args, chain_xor)
+
+
+def canonical_form(expr: Expr) -> str:
+    canonical = {}
+    for nested in subexpressions(expr):
+        canonical[id(nested)] = canon_chain(nested, canonical)
+    return canonical[id(expr)].text
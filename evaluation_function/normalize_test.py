@@ -0,0 +1,68 @@
+import unittest
+
+from .parse import parse_with_feedback
+from .normalize import canonical_form, normal_form
+
+
+def normalize(input: str) -> str:
+    expr, _ = parse_with_feedback(input, {"and": False, "or": False, "not": False, "xor": False})
+    return normal_form(expr)
+
+
+class TestNormalForm(unittest.TestCase):
+
+    def test_whitespace_and_order(self):
+        self.assertEqual(normalize("A & B"), normalize("B&A"))
+        self.assertEqual(normalize("A | B & C"), normalize("C & B | A"))
+
+    def test_redundant_brackets(self):
+        self.assertEqual(normalize("(A) & (B)"), "A&B")
+        self.assertEqual(normalize("((A & B))"), "A&B")
+        self.assertEqual(normalize("~((A))"), "~A")
+        self.assertEqual(normalize("A | (B | C) | D"), "A|B|C|D")
+        self.assertEqual(normalize("D ^ (C ^ (B & A))"), "A&B^C^D")
+
+    def test_keeps_structure(self):
+        self.assertNotEqual(normalize("A & B"), normalize("~(~A | ~B)"))
+        self.assertNotEqual(normalize("A | B ^ C"), normalize("A | (B ^ C)"))
+        self.assertNotEqual(normalize("A | B ^ C"), normalize("B ^ C | A"))
+        self.assertEqual(normalize("~(A & B)"), "~(A&B)")
+
+
+def canonical(input: str) -> str:
+    expr, _ = parse_with_feedback(input, {"and": False, "or": False, "not": False, "xor": False})
+    return canonical_form(expr)
+
+
+class TestCanonicalForm(unittest.TestCase):
+
+    def test_equal(self):
+        for left, right in [
+            ("A & B", "B & A"),
+            ("A | (B | C)", "(C | A) | B"),
+            ("A & A & B", "B & A"),
+            ("~(~(A & B))", "B & A"),
+            ("A ^ B ^ A", "B"),
+            ("(A ^ A) | B", "B"),
+            ("(A ^ A) & B", "(C ^ C)"),
+            ("~(B ^ B) ^ A", "~A"),
+            ("A | B ^ C", "C ^ (B | A)"),
+        ]:
+            self.assertEqual(canonical(left), canonical(right), (left, right))
+
+    def test_not_equal(self):
+        for left, right in [
+            ("A & B", "~(~A | ~B)"),
+            ("A | B ^ C", "A | (B ^ C)"),
+            ("A & ~A", "A ^ A"),
+            ("A | A & B", "A"),
+        ]:
+            self.assertNotEqual(canonical(left), canonical(right), (left, right))
+
+    def test_matches_sympy(self):
+        inputs = ["A & B", "B & A", "~(A ^ ~B) | C", "C | ~(~B ^ A)", "A ^ B ^ A & A", "B ^ A", "~(~A)", "A"]
+        for left in inputs:
+            for right in inputs:
+                left_expr, left_sympy = parse_with_feedback(left, {"and": False, "or": False, "not": False, "xor": False})
+                right_expr, right_sympy = parse_with_feedback(right, {"and": False, "or": False, "not": False, "xor": False})
+                self.assertEqual(canonical_form(left_expr) == canonical_form(right_expr), left_sympy == right_sympy, (left, right))
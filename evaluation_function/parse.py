@@ -1,16 +1,15 @@
-from .lex import Token, TokenType, Lexer, LexError
-from .ast import Expr, Prod, Term
+from typing import TYPE_CHECKING
 
-from sympy.logic.boolalg import Boolean, And, Or, Xor, Not
-from sympy.core.symbol import symbols
-
-class ParseError(Exception):
-
-    def __init__(self, msg: str):
-        self.msg = msg
-    def __str__(self):
-        return self.msg
+from .lex import Token, TokenType, Lexer, LexError, ParseError
+from .latex_lex import LatexLexer
+from .admission import LIMITS, Limits, admit, check_length
+from .ast import Expr, Prod, Term, subexpressions
+from . import metrics
 
+# sympy takes a long time to import and is only needed for the conversion,
+# which most requests never reach, so it is imported on first use.
+if TYPE_CHECKING:
+    from sympy.logic.boolalg import Boolean
 
 class FeedbackException(Exception):
 
@@ -21,135 +20,165 @@ class FeedbackException(Exception):
             return "Evaluation failed"
 
 
-def expect(tokens: list[Token], type: TokenType) -> bool:
-    token = tokens.pop()
-    if token.type == type:
-        return True
-    else:
-        tokens.append(token)
-        return False
-
 # Grammar:
 # expr = prod ([or | xor] prod)*
 # prod = term (and term)*
 # term = (unary) [variable | '(' expr ')']
 
-def parse_term(tokens: list[Token]) -> Term:
-    op = expect(tokens, TokenType.NOT)
-
-    if tokens[-1].type == TokenType.VARIABLE:
-        term = tokens.pop().value
-        return Term(term, op)
-    elif expect(tokens, TokenType.LBRACKET):
-        try:
-            term = parse_boolean(tokens, rec=True)
-
-            if not expect(tokens, TokenType.RBRACKET):
-                raise ParseError("Expected closing \')\'")
-            
-            return Term(term, op)
-        except:
-            raise
-    else:
-        raise ParseError(f"Unexpected token \"{tokens[-1].text}\"")
-
-def parse_prod(tokens: list[Token]) -> Prod:
-    left = None
-    try:
-        left = parse_term(tokens)
-    except:
-        raise
-
-    right = []
-    while expect(tokens, TokenType.AND):
-        try:
-            new_right = parse_term(tokens)
-            right.append(new_right)
-        except:
-            raise
-    
-    return Prod(left, right)
-
-# A recursive descent parser
-def parse_boolean(tokens: list[Token], rec: bool = False) -> Expr:
-    left = None
-    try:
-        left = parse_prod(tokens)
-    except:
-        raise
-    
-    right = []
-    next_token = tokens[-1].type
-    while expect(tokens, TokenType.OR) or expect(tokens, TokenType.XOR):
-        try:
-            new_right = parse_prod(tokens)
-            right.append((next_token == TokenType.XOR, new_right))
-            next_token = tokens[-1].type
-        except:
-            raise
-    
-    # Did the user input any extra tokens that were ignored? This is an error.
-    if not rec and tokens[-1].type != TokenType.EOF:
-        raise ParseError(f"Unexpected token \"{tokens[-1].text}\"")
-
-    return Expr(left, right)
-
-def parse_with_feedback(input: str, disallowed: dict, latex: bool = False) -> tuple[Expr, Boolean]:
-    # Tokenise the input string
+class Frame:
+    # The part of an expression that has been parsed so far
+    def __init__(self, negated: bool = False, close: str = ")"):
+        self.negated = negated
+        # What closes the bracket the expression is in, for error messages
+        self.close = close
+        self.prods = []
+        self.terms = []
+        self.xor = False
+
+    def end_prod(self):
+        self.prods.append((self.xor, Prod(self.terms[0], self.terms[1:])))
+        self.terms = []
+
+    def expr(self) -> Expr:
+        return Expr(self.prods[0][1], self.prods[1:])
+
+# A parser that keeps the expressions in open brackets on an explicit stack
+# rather than recursing, so deeply nested input can't exhaust the call stack.
+def parse_boolean(tokens: list[Token]) -> Expr:
+    stack = []
+    frame = Frame()
+    i = 0
+
+    while True:
+        # Expect a term
+        token = tokens[i]
+        negated = token.type == TokenType.NOT
+        if negated:
+            i += 1
+            token = tokens[i]
+
+        if token.type == TokenType.LBRACKET:
+            i += 1
+            stack.append(frame)
+            # LaTeX groups, e.g. \overline{...}, are closed by braces
+            frame = Frame(negated, "}" if token.text.endswith("{") else ")")
+            continue
+        elif token.type == TokenType.VARIABLE:
+            i += 1
+            term = Term(token.value, negated)
+        else:
+            raise ParseError(f"Unexpected token \"{token.text}\"")
+
+        # A term may be followed by any number of closing brackets, each of
+        # which completes the term containing the bracketed expression.
+        while True:
+            frame.terms.append(term)
+            token = tokens[i]
+            if token.type == TokenType.AND:
+                i += 1
+                break
+
+            frame.end_prod()
+            if token.type == TokenType.OR or token.type == TokenType.XOR:
+                frame.xor = token.type == TokenType.XOR
+                i += 1
+                break
+
+            if not stack:
+                # Did the user input any extra tokens that were ignored? This is an error.
+                if token.type != TokenType.EOF:
+                    raise ParseError(f"Unexpected token \"{token.text}\"")
+                return frame.expr()
+
+            if token.type != TokenType.RBRACKET:
+                raise ParseError(f"Expected closing \'{frame.close}\'")
+            i += 1
+            term = Term(frame.expr(), frame.negated)
+            frame = stack.pop()
+
+def get_disallowed(disallowed_list: list[str]) -> dict:
+    disallowed = {}
+    for op in ["and", "or", "not", "xor"]:
+        disallowed.update({op: op in disallowed_list})
+    return disallowed
+
+# For inputs that aren't a student's answer to a task, which may use any operator
+NONE_DISALLOWED = get_disallowed([])
+
+def parse_expression(input: str, disallowed: dict, latex: bool = False, limits: Limits = None) -> Expr:
+    if limits is None:
+        limits = LIMITS
+
+    # Tokenise the input string, unless it is too long to be worth it, and
+    # check that it is within the limits and only uses the permitted
+    # operators before parsing it
     tokens = None
     try:
-        tokens = Lexer(input).lex()
+        with metrics.stage("admit"):
+            check_length(input, limits)
+        with metrics.stage("lex"):
+            tokens = LatexLexer(input).lex() if latex else Lexer(input).lex()
+        with metrics.stage("admit"):
+            admit(tokens, disallowed, limits)
     except Exception as e:
         raise FeedbackException from e
-        
+
     # Attempt to parse the tokens into an AST
     try:
-        expr = parse_boolean(list(reversed(tokens)))
+        with metrics.stage("parse"):
+            return parse_boolean(tokens)
+    except Exception as e:
+        raise FeedbackException from e
+
+def parse_with_feedback(input: str, disallowed: dict, latex: bool = False) -> tuple[Expr, "Boolean"]:
+    expr = parse_expression(input, disallowed, latex)
 
-        # Walk the tree, converting the result into a sympy boolean expression
-        sympy_expr = conv_expr(expr, disallowed)
-        return expr, sympy_expr
+    # Walk the tree, converting the result into a sympy boolean expression
+    try:
+        return expr, conv_expr(expr)
     except Exception as e:
         raise FeedbackException from e
 
-def conv_term(term: Term, disallowed: dict) -> Boolean:
+def conv_term(term: Term, converted: dict) -> "Boolean":
+    from sympy import Not, symbols
+
     out = None
     # Is this term a variable?
     if isinstance(term.term, str):
         # If so, create a sympy symbol for it
         out = symbols(term.term)
     else:
-        # If it isnt a variable, it must be a nested expression
-        out = conv_expr(term.term, disallowed)
-    if term.op and disallowed["not"]:
-        raise ParseError("\"NOT\" is not permitted for this question")
+        # If it isnt a variable, it must be a nested expression, which has
+        # already been converted
+        out = converted[id(term.term)]
     return Not(out) if term.op else out
 
-def conv_prod(prod: Prod, disallowed: dict) -> Boolean:
-    try:
-        left = conv_term(prod.left, disallowed)
-        right_list = []
-        for right in prod.right:
-            if disallowed["and"]:
-                raise ParseError("\"AND\" is not permitted for this question")
-            right_list.append(conv_term(right, disallowed))
-        return And(left, *right_list)
-    except:
-        raise
-
-def conv_expr(expr: Expr, disallowed: dict) -> Boolean:
-    try:
-        result = conv_prod(expr.left, disallowed)
-        for xor, right in expr.right:
-            right = conv_prod(right, disallowed)
-            if xor:
-                if disallowed["xor"]:
-                    raise ParseError("\"XOR\" is not permitted for this question")
-                result = Xor(result, right)
-            else:
-                if disallowed["or"]:
-                    raise ParseError("\"OR\" is not permitted for this question")
-                result = Or(result, right)
-        return result
-    except:
-        raise
+def conv_prod(prod: Prod, converted: dict) -> "Boolean":
+    from sympy import And
+
+    return And(*[conv_term(term, converted) for term in prod.terms()])
+
+def conv_chain(expr: Expr, converted: dict) -> "Boolean":
+    from sympy import Or, Xor
+
+    # OR and XOR have the same precedence and are evaluated left to right.
+    # Each run of the same operator is built with a single n-ary call, so
+    # sympy doesn't have to flatten a long chain of nested binary operations.
+    args = [conv_prod(expr.left, converted)]
+    chain_xor = None
+    for xor, right in expr.right:
+        if chain_xor is not None and xor != chain_xor:
+            args = [Xor(*args) if chain_xor else Or(*args)]
+        chain_xor = xor
+        args.append(conv_prod(right, converted))
+    if chain_xor is None:
+        return args[0]
+    return Xor(*args) if chain_xor else Or(*args)
+
+def conv_expr(expr: Expr) -> "Boolean":
+    # Convert the innermost bracketed expressions first
+    with metrics.stage("convert"):
+        converted = {}
+        for nested in subexpressions(expr):
+            converted[id(nested)] = conv_chain(nested, converted)
+        return converted[id(expr)]
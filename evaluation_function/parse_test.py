@@ -0,0 +1,85 @@
+import subprocess
+import sys
+import unittest
+
+from .parse import ParseError, FeedbackException, parse_expression, parse_with_feedback
+from .testing import NONE_DISALLOWED, parse
+from . import truth_table
+
+
+class TestParser(unittest.TestCase):
+
+    def test_precedence(self):
+        expr = parse("A & B | ~C ^ D")
+
+        self.assertEqual(str(expr), "A & B | ~C ^ D")
+        self.assertEqual(len(expr.right), 2)
+        self.assertEqual([xor for xor, _ in expr.right], [False, True])
+        self.assertEqual(len(expr.left.right), 1)
+
+    def test_brackets(self):
+        self.assertEqual(str(parse("~((A | B)) & C")), "~((A | B)) & C")
+        self.assertEqual(parse("~(A)").to_latex(), "\\overline{\\left( A \\right)}")
+
+    def test_errors(self):
+        for input, message in [
+            ("A u", "Unexpected token \"u\""),
+            ("(A | B", "Expected closing \')\'"),
+            ("A | B)", "Unexpected token \")\""),
+            ("A &", "Unexpected token \"\""),
+            ("~~A", "Unexpected token \"~\""),
+            ("()", "Unexpected token \")\""),
+        ]:
+            with self.assertRaises(ParseError) as cm:
+                parse(input)
+            self.assertEqual(str(cm.exception), message)
+
+    def test_disallowed(self):
+        for input, op in [("A & B", "and"), ("A | B", "or"), ("~A", "not"), ("A ^ B", "xor"), ("A | (B & C)", "and")]:
+            with self.assertRaises(FeedbackException) as cm:
+                parse_with_feedback(input, dict(NONE_DISALLOWED, **{op: True}))
+            self.assertEqual(str(cm.exception), f"\"{op.upper()}\" is not permitted for this question")
+
+    def test_disallowed_order(self):
+        disallowed = dict(NONE_DISALLOWED, **{"and": True, "not": True, "xor": True})
+        for input, op in [("~A & B", "AND"), ("B | ~A", "NOT"), ("A ^ ~B & C", "XOR"), ("(A ^ B) & C", "XOR")]:
+            with self.assertRaises(FeedbackException) as cm:
+                parse_expression(input, disallowed)
+            self.assertEqual(str(cm.exception), f"\"{op}\" is not permitted for this question")
+            with self.assertRaises(FeedbackException) as cm:
+                parse_with_feedback(input, disallowed)
+            self.assertEqual(str(cm.exception), f"\"{op}\" is not permitted for this question")
+
+    def test_nary_conversion(self):
+        _, sympy_expr = parse_with_feedback("A | B | C ^ D ^ E | F", NONE_DISALLOWED)
+        self.assertEqual(str(sympy_expr), "F | (D ^ E ^ (A | B | C))")
+
+    def test_10k_terms(self):
+        names = [f"x{i}" for i in range(10000)]
+        expr, sympy_expr = parse_with_feedback(" | ".join(names), NONE_DISALLOWED)
+
+        self.assertEqual(len(expr.right), 9999)
+        self.assertEqual(len(sympy_expr.args), 10000)
+
+    def test_1k_deep(self):
+        expr = parse("(" * 1000 + "A" + ")" * 1000)
+        self.assertEqual(str(expr), "(" * 1000 + "A" + ")" * 1000)
+
+        input = "A"
+        for i in range(1000):
+            input = f"~(x{i % 5} {'&|^'[i % 3]} {input})"
+        expr = parse(input)
+
+        self.assertEqual(str(expr), input)
+        self.assertTrue(expr.to_latex().startswith("\\overline{\\left( \\mathrm{x4} \\cdot"))
+        self.assertTrue(truth_table.equivalent(expr, parse(input)))
+
+    def test_sympy_imported_lazily(self):
+        probe = (
+            "import sys\n"
+            "from evaluation_function.parse import parse_expression\n"
+            "parse_expression('A & ~(B | C)', {'and': False, 'or': False, 'not': False, 'xor': False})\n"
+            "print('sympy' in sys.modules)\n"
+        )
+        output = subprocess.run([sys.executable, "-c", probe], check=True, capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), "False")
@@ -0,0 +1,90 @@
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Optional
+
+from lf_toolkit.evaluation import Result as EvaluationResult, Params
+from lf_toolkit.preview import Result as PreviewResult
+
+from .evaluation import evaluation_function
+from .preview import preview_function
+from .warmup import warm_up
+from . import metrics
+
+# Number of worker processes to evaluate requests in. 0 evaluates requests in
+# the server process itself.
+POOL_WORKERS = int(os.environ.get("EVAL_POOL_WORKERS", 0))
+
+# Replace each worker after it has handled this many requests, e.g. to bound
+# the memory held by its caches. 0 keeps workers for the server's lifetime.
+POOL_MAX_TASKS = int(os.environ.get("EVAL_POOL_MAX_TASKS", 0))
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class EvaluationPool:
+    """
+    Runs evaluations in a pool of worker processes, so CPU-heavy requests
+    don't all share the server's GIL. The pool's methods have the same
+    signatures as the eval and preview handlers they replace.
+
+    If a worker dies, e.g. because it was killed for using too much memory,
+    the executor fails every request it has and will be given. It is then
+    replaced by a new one, and each of the requests it failed is retried once.
+    """
+
+    def __init__(self, workers: int, max_tasks_per_child: Optional[int] = None):
+        self.workers = workers
+        self.kwargs = {}
+        if max_tasks_per_child:
+            if sys.version_info < (3, 11):
+                raise ValueError("max_tasks_per_child requires python 3.11 or newer")
+            self.kwargs["max_tasks_per_child"] = max_tasks_per_child
+        self.lock = threading.Lock()
+        self.executor = self.create_executor()
+
+    def create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up, **self.kwargs)
+
+    def replace_executor(self, broken: ProcessPoolExecutor):
+        # Requests that were running when the worker died all get here, but
+        # only the first replaces the executor
+        with self.lock:
+            if self.executor is broken:
+                metrics.increment("pool_broken")
+                self.executor = self.create_executor()
+        broken.shutdown(wait=False)
+
+    def run(self, fn, *args):
+        executor = self.executor
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            self.replace_executor(executor)
+        # A request that kills every worker it runs in fails here, after
+        # which the pool is replaced again for the requests that follow it
+        executor = self.executor
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            self.replace_executor(executor)
+            raise
+
+    def start(self) -> "EvaluationPool":
+        # Workers are started on demand, so submitting one task per worker at
+        # once starts (and warms up) all of them before the first request.
+        wait([self.executor.submit(_ping) for _ in range(self.workers)])
+        return self
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    def evaluation_function(self, response: Any, answer: Any, params: Params) -> EvaluationResult:
+        return self.run(evaluation_function, response, answer, params)
+
+    def preview_function(self, response: Any, params: Params) -> PreviewResult:
+        return self.run(preview_function, response, params)
@@ -0,0 +1,29 @@
+import os
+import signal
+import unittest
+
+from .evaluation import Params
+from .pool import EvaluationPool, _ping
+from . import metrics
+
+
+class TestEvaluationPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = EvaluationPool(1).start()
+        self.addCleanup(self.pool.shutdown)
+
+    def test_evaluates(self):
+        result = self.pool.evaluation_function("A & B", "B & A", Params())
+        self.assertTrue(result.to_dict()["is_correct"])
+
+    def test_worker_killed(self):
+        # e.g. by the OOM killer. The request after it is evaluated in a new
+        # pool, and so are the ones after that.
+        before = metrics.counters().get("pool_broken", 0)
+        os.kill(self.pool.executor.submit(_ping).result(), signal.SIGKILL)
+        for _ in range(2):
+            result = self.pool.evaluation_function("A & B", "B & A", Params())
+            self.assertTrue(result.to_dict()["is_correct"])
+        self.assertIn("preview", self.pool.preview_function("A & B", Params()))
+        self.assertEqual(metrics.counters().get("pool_broken", 0), before + 1)
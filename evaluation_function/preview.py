@@ -1,8 +1,8 @@
 from typing import Any
 from lf_toolkit.preview import Result, Params, Preview
 
-from .parse import parse_with_feedback, FeedbackException
-from .evaluation import get_disallowed
+from .parse import FeedbackException
+from . import incremental, metrics
 
 def preview_function(response: Any, params: Params) -> Result:
     """
@@ -25,16 +25,16 @@ def preview_function(response: Any, params: Params) -> Result:
     split into many) is entirely up to you.
     """
     
-    disallowed = get_disallowed([])
-
-    try:
-        result, _ = parse_with_feedback(response, disallowed, latex=params.get("is_latex", False))
-        
-        latex = result.to_latex()
-        ascii = str(result)
-
-        return Result(preview=Preview(latex=latex,sympy=ascii))
-    except FeedbackException as e:
-        return Result(preview=Preview(feedback=str(e)))
-    except Exception as e:
-        return Result(preview=Preview(feedback=str(e)))
+    # time each stage of the preview, if instrumentation is turned on
+    with metrics.request("preview"):
+        try:
+            # Only the parts of the response that changed since it was last
+            # previewed are parsed and rendered again
+            with metrics.stage("render"):
+                ascii, latex = incremental.preview(response, latex=params.get("is_latex", False))
+
+            return Result(preview=Preview(latex=latex,sympy=ascii))
+        except FeedbackException as e:
+            return Result(preview=Preview(feedback=str(e)))
+        except Exception as e:
+            return Result(preview=Preview(feedback=str(e)))
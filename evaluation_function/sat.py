@@ -0,0 +1,432 @@
+import heapq
+from typing import Optional
+
+from .ast import Expr, Prod, Term, subexpressions
+from .budget import Budget
+
+# Equivalence checking by satisfiability, for expressions over too many
+# variables for truth tables and with decision diagrams that grow too large.
+#
+# The two expressions are encoded into one formula in conjunctive normal form
+# that is satisfiable exactly when they differ (a "miter"): every gate gets a
+# variable of its own and clauses tying it to its inputs (the Tseitin
+# transform), and the XOR of the two outputs is asserted. A CDCL solver then
+# either finds a satisfying assignment, which is a counterexample, or derives
+# the empty clause. Every clause it learns follows from the formula by unit
+# propagation, so the learned clauses are a DRUP proof that the expressions
+# are equivalent, which verify_proof() can check independently.
+#
+# Clauses use DIMACS literals: variable v (from 1) is v, and its negation -v.
+
+# Conflicts the solver may run into before giving up
+MAX_CONFLICTS = 100_000
+
+# Conflicts and decisions between checks of the time budget
+CHECK_INTERVAL = 256
+
+# Conflicts before the first restart, scaled by the Luby sequence
+RESTART_BASE = 100
+
+VARIABLE_DECAY = 0.95
+
+
+class CNF:
+    """
+    A formula in conjunctive normal form, built up gate by gate. Subformulas
+    are looked up by node identity, so a subexpression shared between the two
+    sides is only encoded once.
+    """
+
+    def __init__(self):
+        self.num_vars = 0
+        self.clauses: list[list[int]] = []
+        self.names: dict[str, int] = {}
+        self.gates: dict[int, int] = {}
+
+    def new_var(self) -> int:
+        self.num_vars += 1
+        return self.num_vars
+
+    def variable(self, name: str) -> int:
+        var = self.names.get(name)
+        if var is None:
+            var = self.names[name] = self.new_var()
+        return var
+
+    def and_gate(self, inputs: list[int]) -> int:
+        if len(inputs) == 1:
+            return inputs[0]
+        out = self.new_var()
+        for lit in inputs:
+            self.clauses.append([-out, lit])
+        self.clauses.append([out, *(-lit for lit in inputs)])
+        return out
+
+    def or_gate(self, inputs: list[int]) -> int:
+        if len(inputs) == 1:
+            return inputs[0]
+        return -self.and_gate([-lit for lit in inputs])
+
+    def xor_gate(self, a: int, b: int) -> int:
+        out = self.new_var()
+        self.clauses += [[-out, a, b], [-out, -a, -b], [out, -a, b], [out, a, -b]]
+        return out
+
+    def term(self, term: Term) -> int:
+        if isinstance(term.term, str):
+            lit = self.variable(term.term)
+        else:
+            lit = self.gates[id(term.term)]
+        return -lit if term.op else lit
+
+    def prod(self, prod: Prod) -> int:
+        lit = self.gates.get(id(prod))
+        if lit is None:
+            lit = self.gates[id(prod)] = self.and_gate([self.term(term) for term in prod.terms()])
+        return lit
+
+    def chain(self, expr: Expr) -> int:
+        # Runs of ORs become one gate. The chain is evaluated left to right,
+        # so an XOR applies to everything before it.
+        pending = [self.prod(expr.left)]
+        for xor, prod in expr.right:
+            if xor:
+                pending = [self.xor_gate(self.or_gate(pending), self.prod(prod))]
+            else:
+                pending.append(self.prod(prod))
+        return self.or_gate(pending)
+
+    def encode(self, expr: Expr) -> int:
+        """
+        Add the clauses defining `expr`, returning the literal for its value.
+        """
+        # Encode the innermost bracketed expressions first
+        for nested in subexpressions(expr):
+            if id(nested) not in self.gates:
+                self.gates[id(nested)] = self.chain(nested)
+        return self.gates[id(expr)]
+
+
+def miter(left: Expr, right: Expr) -> CNF:
+    """
+    A formula that is satisfiable exactly when the expressions differ, whose
+    satisfying assignments give a counterexample through `names`.
+    """
+    cnf = CNF()
+    out = cnf.xor_gate(cnf.encode(left), cnf.encode(right))
+    cnf.clauses.append([out])
+    return cnf
+
+
+def luby(i: int) -> int:
+    # 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i %= size
+    return 1 << seq
+
+
+class Solver:
+    """
+    A conflict-driven clause learning SAT solver: two watched literals, first
+    UIP learning with clause minimisation, VSIDS branching, phase saving and
+    Luby restarts.
+
+    Internally, variable v (from 0) has literals 2v and 2v+1 (its negation),
+    so `lit ^ 1` negates a literal. `values[lit]` is True, False or None.
+    """
+
+    def __init__(self, cnf: CNF, max_conflicts: int = MAX_CONFLICTS, budget: Optional[Budget] = None):
+        n = cnf.num_vars
+        self.num_vars = n
+        self.max_conflicts = max_conflicts
+        self.budget = budget
+        self.values: list[Optional[bool]] = [None] * (2 * n)
+        self.level = [0] * n
+        self.reason: list[Optional[int]] = [None] * n
+        self.phase = [False] * n
+        self.activity = [0.0] * n
+        self.increment = 1.0
+        self.heap = [(0.0, v) for v in range(n)]
+        self.trail: list[int] = []
+        self.trail_lim: list[int] = []
+        self.head = 0
+        self.clauses: list[list[int]] = []
+        self.watches: list[list[int]] = [[] for _ in range(2 * n)]
+        self.conflicts = 0
+        self.decisions = 0
+        self.model: Optional[list[bool]] = None
+        # The learned clauses, in DIMACS literals, ending with the empty
+        # clause if the formula is unsatisfiable
+        self.proof: list[tuple[int, ...]] = []
+        self.ok = True
+
+        for clause in cnf.clauses:
+            self.add_clause([2 * (lit - 1) if lit > 0 else 2 * (-lit - 1) + 1 for lit in clause])
+
+    def add_clause(self, lits: list[int]):
+        if not self.ok:
+            return
+        lits = sorted(set(lits))
+        if any(lits[i] ^ 1 == lits[i + 1] for i in range(len(lits) - 1)):
+            # Contains a literal and its negation
+            return
+        lits = [lit for lit in lits if self.values[lit] is not False]
+        if any(self.values[lit] for lit in lits):
+            return
+        if not lits:
+            self.ok = False
+        elif len(lits) == 1:
+            self.assign(lits[0], None)
+            if self.propagate() is not None:
+                self.ok = False
+        else:
+            self.attach(lits)
+
+    def attach(self, lits: list[int]) -> int:
+        index = len(self.clauses)
+        self.clauses.append(lits)
+        self.watches[lits[0]].append(index)
+        self.watches[lits[1]].append(index)
+        return index
+
+    def assign(self, lit: int, reason: Optional[int]):
+        var = lit >> 1
+        self.values[lit] = True
+        self.values[lit ^ 1] = False
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self) -> Optional[int]:
+        # Returns the index of a conflicting clause, if there is one
+        values, clauses, watches, trail = self.values, self.clauses, self.watches, self.trail
+        while self.head < len(trail):
+            false_lit = trail[self.head] ^ 1
+            self.head += 1
+            watchers = watches[false_lit]
+            watches[false_lit] = kept = []
+            for position, index in enumerate(watchers):
+                clause = clauses[index]
+                # Keep the false literal second
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if values[first]:
+                    kept.append(index)
+                    continue
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    if values[clause[k]] is not False:
+                        clause[1], clause[k] = clause[k], false_lit
+                        watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if values[first] is False:
+                        kept.extend(watchers[position + 1:])
+                        self.head = len(trail)
+                        return index
+                    self.assign(first, index)
+        return None
+
+    def analyze(self, conflict: int) -> tuple[list[int], int]:
+        # Resolve the conflicting clause with the reasons for its literals,
+        # latest first, until one literal from the current level is left
+        seen = set()
+        learnt = [0]
+        current = len(self.trail_lim)
+        pending = 0
+        lit = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for q in clause if lit is None else clause[1:]:
+                var = q >> 1
+                if var not in seen and self.level[var] > 0:
+                    seen.add(var)
+                    self.bump(var)
+                    if self.level[var] == current:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+            while self.trail[index] >> 1 not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            seen.discard(lit >> 1)
+            clause = self.clauses[self.reason[lit >> 1]]
+        learnt[0] = lit ^ 1
+
+        # Drop literals implied by the others in the clause
+        learnt = [learnt[0]] + [q for q in learnt[1:] if not self.redundant(q, seen)]
+
+        # Backjump to the second highest level in the clause, which is then
+        # watched along with the asserting literal
+        back = 0
+        if len(learnt) > 1:
+            best = max(range(1, len(learnt)), key=lambda i: self.level[learnt[i] >> 1])
+            learnt[1], learnt[best] = learnt[best], learnt[1]
+            back = self.level[learnt[1] >> 1]
+        self.increment /= VARIABLE_DECAY
+        return learnt, back
+
+    def redundant(self, lit: int, seen: set) -> bool:
+        reason = self.reason[lit >> 1]
+        if reason is None:
+            return False
+        return all(q >> 1 in seen or self.level[q >> 1] == 0 for q in self.clauses[reason][1:])
+
+    def bump(self, var: int):
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-a, v) for v, a in enumerate(self.activity) if self.values[2 * v] is None]
+            heapq.heapify(self.heap)
+        elif self.values[2 * var] is None:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def backtrack(self, level: int):
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for lit in self.trail[start:]:
+            var = lit >> 1
+            self.values[lit] = self.values[lit ^ 1] = None
+            self.reason[var] = None
+            self.phase[var] = not lit & 1
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.head = start
+        if len(self.heap) > 4 * self.num_vars + 64:
+            # Drop stale entries
+            self.heap = [(-a, v) for v, a in enumerate(self.activity) if self.values[2 * v] is None]
+            heapq.heapify(self.heap)
+
+    def decide(self) -> Optional[int]:
+        # The unassigned variable with the highest activity, in its saved phase.
+        # The heap has an entry for every unassigned variable, and possibly
+        # stale entries for others.
+        while self.heap:
+            _, var = heapq.heappop(self.heap)
+            if self.values[2 * var] is None:
+                return 2 * var + (0 if self.phase[var] else 1)
+        return None
+
+    def emit(self, lits: list[int]):
+        self.proof.append(tuple((lit >> 1) + 1 if not lit & 1 else -((lit >> 1) + 1) for lit in lits))
+
+    def solve(self) -> Optional[bool]:
+        """
+        True if the formula is satisfiable (see `model`), False if it isn't
+        (see `proof`), or None if the solver gave up.
+        """
+        if not self.ok:
+            self.emit([])
+            return False
+
+        restarts = 0
+        until_restart = RESTART_BASE * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.trail_lim:
+                    self.emit([])
+                    return False
+                if self.conflicts > self.max_conflicts:
+                    return None
+                if self.budget is not None and self.conflicts % CHECK_INTERVAL == 0:
+                    self.budget.check()
+
+                learnt, back = self.analyze(conflict)
+                self.emit(learnt)
+                self.backtrack(back)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.assign(learnt[0], self.attach(learnt))
+
+                until_restart -= 1
+                if until_restart == 0:
+                    restarts += 1
+                    until_restart = RESTART_BASE * luby(restarts)
+                    self.backtrack(0)
+            else:
+                lit = self.decide()
+                if lit is None:
+                    self.model = [bool(self.values[2 * v]) for v in range(self.num_vars)]
+                    return True
+                self.decisions += 1
+                if self.budget is not None and self.decisions % CHECK_INTERVAL == 0:
+                    self.budget.check()
+                self.trail_lim.append(len(self.trail))
+                self.assign(lit, None)
+
+
+def verify_proof(clauses: list[list[int]], proof: list[tuple[int, ...]]) -> bool:
+    """
+    Check a DRUP proof of unsatisfiability: each clause in it must lead to a
+    conflict by unit propagation when its negation is added to the formula and
+    the clauses before it, and the last clause must be empty. This is slow,
+    and only meant for testing the solver.
+    """
+    if not proof or proof[-1]:
+        return False
+    known = [list(set(clause)) for clause in clauses]
+    for lemma in proof:
+        values = {}
+        for lit in lemma:
+            values[abs(lit)] = lit < 0
+        if not propagates_to_conflict(known, values):
+            return False
+        known.append(list(lemma))
+    return True
+
+
+def propagates_to_conflict(clauses: list[list[int]], values: dict[int, bool]) -> bool:
+    changed = True
+    while changed:
+        changed = False
+        for clause in clauses:
+            unassigned = []
+            for lit in clause:
+                value = values.get(abs(lit))
+                if value is None:
+                    unassigned.append(lit)
+                elif value == (lit > 0):
+                    break
+            else:
+                if not unassigned:
+                    return True
+                if len(unassigned) == 1:
+                    values[abs(unassigned[0])] = unassigned[0] > 0
+                    changed = True
+    return False
+
+
+def equivalent(left: Expr, right: Expr, max_conflicts: int = MAX_CONFLICTS, budget: Optional[Budget] = None) -> tuple[Optional[bool], Optional[dict[str, bool]]]:
+    """
+    Compare two expressions with the SAT solver. Returns whether they are
+    equivalent, or None if the solver gave up after `max_conflicts`
+    conflicts, and an assignment on which they differ if they aren't. Raises
+    BudgetExceeded if the time budget runs out.
+    """
+    cnf = miter(left, right)
+    solver = Solver(cnf, max_conflicts=max_conflicts, budget=budget)
+    satisfiable = solver.solve()
+    if satisfiable is None:
+        return None, None
+    if not satisfiable:
+        return True, None
+    return False, {name: solver.model[var - 1] for name, var in cnf.names.items()}
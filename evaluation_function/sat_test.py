@@ -0,0 +1,87 @@
+import random
+import unittest
+
+from .sat import CNF, Solver, equivalent, luby, miter, verify_proof
+from .truth_table import evaluate
+from .testing import parse
+from . import truth_table
+
+
+def random_expr(rng: random.Random, names: list[str], depth: int) -> str:
+    if depth == 0 or rng.random() < 0.2:
+        return ("~" if rng.random() < 0.4 else "") + rng.choice(names)
+    op = rng.choice("&|^")
+    return f"{'~' if rng.random() < 0.3 else ''}({random_expr(rng, names, depth - 1)} {op} {random_expr(rng, names, depth - 1)})"
+
+
+class TestSAT(unittest.TestCase):
+
+    def test_equivalent(self):
+        self.assertEqual(equivalent(parse("~(A & B)"), parse("~A | ~B")), (True, None))
+        equal, witness = equivalent(parse("A | B ^ C"), parse("(A | B) ^ C & A"))
+        self.assertFalse(equal)
+        self.assertNotEqual(evaluate(parse("A | B ^ C"), witness), evaluate(parse("(A | B) ^ C & A"), witness))
+
+    def test_chain_order(self):
+        # XOR applies to everything before it in the chain
+        self.assertTrue(equivalent(parse("A | B ^ C | D"), parse("((A | B) ^ C) | D"))[0])
+        self.assertFalse(equivalent(parse("A | B ^ C | D"), parse("A | (B ^ C) | D"))[0])
+
+    def test_shared_subexpressions(self):
+        cnf = miter(parse("~(A & B) | ~(A & B) & C"), parse("~(A & B)"))
+        # One AND gate for A & B, one for the product with C, one OR and the XOR
+        self.assertEqual(cnf.num_vars, 7)
+
+    def test_proof(self):
+        cnf = miter(parse("A & (B | C)"), parse("A & C | B & A"))
+        solver = Solver(cnf)
+        self.assertFalse(solver.solve())
+        self.assertEqual(solver.proof[-1], ())
+        self.assertTrue(verify_proof(cnf.clauses, solver.proof))
+        self.assertFalse(verify_proof(cnf.clauses, solver.proof[:-1]))
+
+    def test_unsatisfiable_units(self):
+        cnf = CNF()
+        cnf.new_var()
+        cnf.clauses += [[1], [-1]]
+        solver = Solver(cnf)
+        self.assertFalse(solver.solve())
+        self.assertEqual(solver.proof, [()])
+
+    def test_random(self):
+        # Agrees with truth tables, with a counterexample or a checked proof
+        rng = random.Random(0)
+        for _ in range(300):
+            names = [f"x{i}" for i in range(rng.randint(1, 6))]
+            left, right = parse(random_expr(rng, names, 4)), parse(random_expr(rng, names, 3))
+            cnf = miter(left, right)
+            solver = Solver(cnf)
+            satisfiable = solver.solve()
+            self.assertEqual(not satisfiable, truth_table.equivalent(left, right))
+            if satisfiable:
+                witness = {name: solver.model[var - 1] for name, var in cnf.names.items()}
+                self.assertNotEqual(evaluate(left, witness), evaluate(right, witness))
+            else:
+                self.assertTrue(verify_proof(cnf.clauses, solver.proof))
+
+    def test_wide(self):
+        # A ripple carry chain over 65 bits, with the carry written two ways
+        left = right = "c"
+        for i in range(64):
+            left = f"(a{i} & b{i} | ({left}) & (a{i} ^ b{i}))"
+            right = f"((a{i} | b{i}) & ({right} | a{i} & b{i}))"
+        self.assertEqual(equivalent(parse(left), parse(right)), (True, None))
+        equal, witness = equivalent(parse(left), parse(right.replace("a63 & b63", "a63 & ~b63")))
+        self.assertFalse(equal)
+        self.assertEqual(len(witness), 129)
+
+    def test_conflict_limit(self):
+        # Parity functions are hard for resolution
+        rng = random.Random(0)
+        names = [f"x{i}" for i in range(24)]
+        shuffled = names[:]
+        rng.shuffle(shuffled)
+        self.assertEqual(equivalent(parse(" ^ ".join(names)), parse(" ^ ".join(shuffled)), max_conflicts=100), (None, None))
+
+    def test_luby(self):
+        self.assertEqual([luby(i) for i in range(15)], [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8])
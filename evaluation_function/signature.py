@@ -0,0 +1,226 @@
+from itertools import product
+from typing import Any, Optional
+
+from .ast import Expr
+from .minimize import popcount, project, support
+from . import truth_table
+
+# Signatures identify the function an expression computes, so that matching
+# it against many known expressions is a dictionary lookup rather than an
+# equivalence check per expression. There are three kinds:
+#
+#   exact        the truth table over the variables the function depends on,
+#                so expressions only match if they use the same names
+#   permutation  the smallest truth table over all orderings of those
+#                variables, so expressions match whatever their variables
+#                are called
+#   npn          the smallest over all orderings and negations of the
+#                variables and of the output, so active-low versions of the
+#                same function match too
+#
+# Rather than trying every ordering, the variables are split into cells that
+# any renaming preserves: first by the number of true rows each appears in,
+# then by the number each shares with the variables of every other cell,
+# until no cell splits further. Orderings are then searched by fixing each
+# variable of the first cell with several in turn as the next one and
+# splitting the rest again, as graph canonisation does. A variable is only
+# tried if swapping it with one already tried changes the table, so a group
+# of variables the function is symmetric in, e.g. all of the inputs of a
+# parity function, or the two inputs of each product in A & B | C & D, is
+# only searched once.
+MODES = ("exact", "permutation", "npn")
+
+# Most steps of the search for the smallest table before giving up on a
+# signature
+MAX_CANDIDATES = 5040
+
+
+def negate_input(table: int, i: int, masks: list[int], full: int) -> int:
+    shift = 1 << i
+    return ((table & masks[i]) >> shift) | ((table & ~masks[i] & full) << shift)
+
+
+def swap_inputs(table: int, i: int, j: int, masks: list[int], full: int) -> int:
+    # Exchange the rows where i is set and j isn't with those where j is set
+    # and i isn't
+    if i > j:
+        i, j = j, i
+    shift = (1 << j) - (1 << i)
+    low = masks[i] & ~masks[j] & full
+    high = low << shift
+    return (table & ~(low | high)) | ((table & low) << shift) | ((table & high) >> shift)
+
+
+def permute(table: int, order: list[int], masks: list[int], full: int) -> int:
+    # Variable k of the result is variable order[k] of `table`
+    position = list(range(len(order)))
+    where = list(range(len(order)))
+    for k, var in enumerate(order):
+        j = where[var]
+        if j != k:
+            table = swap_inputs(table, k, j, masks, full)
+            other = position[k]
+            position[k], position[j] = var, other
+            where[var], where[other] = k, j
+    return table
+
+
+def refine(cells: list[list[int]], shared: list[list[int]]) -> list[list[int]]:
+    # Split each cell by how many true rows its variables share with those of
+    # every cell, until that splits none of them. `shared[i][j]` is the
+    # number of true rows in which both i and j are true.
+    while True:
+        where = {var: k for k, cell in enumerate(cells) for var in cell}
+        refined = []
+        for cell in cells:
+            split = {}
+            for var in cell:
+                key = tuple(sorted((where[other], count) for other, count in enumerate(shared[var])))
+                split.setdefault(key, []).append(var)
+            refined.extend(split[key] for key in sorted(split))
+        if len(refined) == len(cells):
+            return refined
+        cells = refined
+
+
+def smallest_permutation(table: int, n: int, masks: list[int], full: int, budget: list[int]) -> Optional[int]:
+    shared = [[popcount(table & masks[i] & masks[j]) for j in range(n)] for i in range(n)]
+    best = [None]
+
+    def search(cells: list[list[int]]) -> bool:
+        budget[0] -= 1
+        if budget[0] < 0:
+            return False
+        k = next((k for k, cell in enumerate(cells) if len(cell) > 1), None)
+        if k is None:
+            candidate = permute(table, [cell[0] for cell in cells], masks, full)
+            if best[0] is None or candidate < best[0]:
+                best[0] = candidate
+            return True
+
+        tried = []
+        for var in cells[k]:
+            if any(swap_inputs(table, var, other, masks, full) == table for other in tried):
+                continue
+            tried.append(var)
+            rest = [other for other in cells[k] if other != var]
+            if not search(refine(cells[:k] + [[var], rest] + cells[k + 1:], shared)):
+                return False
+        return True
+
+    if not search(refine([list(range(n))], shared)):
+        return None
+    return best[0]
+
+
+def canonical_table(table: int, n: int, mode: str) -> Optional[int]:
+    """
+    The smallest table equivalent to `table` under the transformations of
+    `mode` ("permutation" or "npn"), or None if there are too many
+    candidates to try.
+    """
+    masks, full = truth_table.variable_masks(list(range(n)))
+    masks = [masks[i] for i in range(n)]
+    budget = [MAX_CANDIDATES]
+
+    if mode == "permutation":
+        return smallest_permutation(table, n, masks, full, budget)
+
+    # Fix the output to be true in at most half of the rows, and each input
+    # to be true in at least as many of the true rows as it is false
+    half = 1 << (n - 1)
+    ones = popcount(table)
+    outputs = [table] if ones < half else [table ^ full] if ones > half else [table, table ^ full]
+
+    best = None
+    for output in outputs:
+        ones = popcount(output)
+        tied = []
+        for i in range(n):
+            count = popcount(output & masks[i])
+            if 2 * count < ones:
+                output = negate_input(output, i, masks, full)
+            elif 2 * count == ones:
+                tied.append(i)
+        for signs in product((False, True), repeat=len(tied)):
+            candidate = output
+            for i, negate in zip(tied, signs):
+                if negate:
+                    candidate = negate_input(candidate, i, masks, full)
+            candidate = smallest_permutation(candidate, n, masks, full, budget)
+            if candidate is None:
+                return None
+            if best is None or candidate < best:
+                best = candidate
+    return best
+
+
+def signature(expr: Expr, mode: str = "exact") -> Optional[tuple]:
+    """
+    The signature of the function `expr` computes, or None if it has too
+    many variables or too many candidate orderings.
+    """
+    names = sorted(truth_table.variables(expr))
+    if len(names) > truth_table.MAX_VARIABLES:
+        return None
+    table = truth_table.truth_table(expr, names)
+
+    # Only the variables the function depends on are part of the signature,
+    # so A | A & B matches A
+    keep = support(table, len(names))
+    if len(keep) < len(names):
+        table = project(table, keep)
+        names = [names[i] for i in keep]
+
+    if mode == "exact":
+        return ("exact", tuple(names), table)
+    canonical = canonical_table(table, len(names), mode)
+    if canonical is None:
+        return None
+    return (mode, len(names), canonical)
+
+
+class SignatureIndex:
+    """
+    Expressions indexed by signature, e.g. a question's answer and the common
+    wrong responses to it, each with a value to return when a response
+    matches it.
+    """
+
+    def __init__(self, mode: str = "exact"):
+        if mode not in MODES:
+            raise ValueError(f"unknown signature mode '{mode}'")
+        self.mode = mode
+        self.entries = {}
+
+        # Why any of the expressions meant to be indexed weren't, e.g. ones
+        # that don't parse
+        self.errors = []
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, expr: Expr, value: Any) -> bool:
+        """
+        Index `expr`, replacing any equivalent expression. Returns False if
+        it has no signature, in which case it can't be matched.
+        """
+        key = signature(expr, self.mode)
+        if key is None:
+            return False
+        self.insert(key, value)
+        return True
+
+    def insert(self, key: tuple, value: Any):
+        # Index a signature computed (or stored) elsewhere
+        self.entries[key] = value
+
+    def get(self, key: Optional[tuple]) -> Optional[Any]:
+        # Look up a signature computed elsewhere, which is None if there was
+        # none to compute
+        if key is None:
+            return None
+        return self.entries.get(key)
+
+    def lookup(self, expr: Expr) -> Optional[Any]:
+        return self.get(signature(expr, self.mode))
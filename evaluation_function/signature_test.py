@@ -0,0 +1,109 @@
+import random
+import unittest
+
+from .answer import CompiledAnswer
+from .signature import SignatureIndex, canonical_table, negate_input, permute, signature
+from .testing import parse
+from . import metrics, truth_table
+
+
+def masks(n: int) -> tuple[list[int], int]:
+    by_name, full = truth_table.variable_masks(list(range(n)))
+    return [by_name[i] for i in range(n)], full
+
+
+class TestSignature(unittest.TestCase):
+
+    def test_exact(self):
+        self.assertEqual(signature(parse("A & B | A & ~B")), signature(parse("A")))
+        self.assertNotEqual(signature(parse("A")), signature(parse("B")))
+
+    def test_permutation(self):
+        self.assertEqual(signature(parse("A & ~B | C"), "permutation"), signature(parse("Z | ~X & Y"), "permutation"))
+        self.assertNotEqual(signature(parse("A & ~B | C"), "permutation"), signature(parse("A & B | C"), "permutation"))
+
+    def test_npn(self):
+        self.assertEqual(signature(parse("A & ~B | C"), "npn"), signature(parse("A & B | C"), "npn"))
+        self.assertEqual(signature(parse("A & B"), "npn"), signature(parse("~X | ~Y"), "npn"))
+        self.assertNotEqual(signature(parse("A & B"), "npn"), signature(parse("A ^ B"), "npn"))
+
+    def test_permute(self):
+        # Variable k of the result is variable order[k] of the original
+        table = truth_table.truth_table(parse("A & ~B | C"), ["A", "B", "C"])
+        expected = truth_table.truth_table(parse("A & ~B | C"), ["C", "A", "B"])
+        self.assertEqual(permute(table, [2, 0, 1], *masks(3)), expected)
+
+    def test_random_invariance(self):
+        rng = random.Random(0)
+        for n in range(1, 7):
+            masks_n, full = masks(n)
+            for _ in range(20):
+                table = rng.getrandbits(1 << n)
+                order = list(range(n))
+                rng.shuffle(order)
+                renamed = permute(table, order, masks_n, full)
+                self.assertEqual(canonical_table(table, n, "permutation"), canonical_table(renamed, n, "permutation"))
+                for i in range(n):
+                    if rng.random() < 0.5:
+                        renamed = negate_input(renamed, i, masks_n, full)
+                self.assertEqual(canonical_table(table, n, "npn"), canonical_table(renamed ^ full, n, "npn"))
+
+    def test_symmetric(self):
+        # Every ordering of a symmetric function's variables gives the same
+        # table, so only one is tried
+        names = [f"x{i}" for i in range(12)]
+        self.assertIsNotNone(signature(parse(" ^ ".join(names)), "permutation"))
+        self.assertIsNotNone(signature(parse(" & ".join(names)), "npn"))
+
+    def test_indistinguishable_variables(self):
+        # Every variable appears in the same number of true rows, so they are
+        # only told apart by the rows they share with each other
+        pairs = signature(parse("P&Q|R&S|T&U|V&W"), "permutation")
+        self.assertIsNotNone(pairs)
+        self.assertEqual(pairs, signature(parse("A&B|C&D|E&F|G&H"), "permutation"))
+        self.assertEqual(signature(parse("(A|B)&(C|D)&(E|F)"), "npn"), signature(parse("~A&~B|~C&~D|~E&~F"), "npn"))
+        self.assertNotEqual(pairs, signature(parse("A&B&C|D&E&F|G&H"), "permutation"))
+
+        rng = random.Random(0)
+        names = [f"x{i}" for i in range(8)]
+        table = truth_table.truth_table(parse("(x0 ^ x1) & (x2 ^ x3) | (x4 ^ x5) & (x6 ^ x7)"), names)
+        masks_8, full = masks(8)
+        for _ in range(10):
+            order = list(range(8))
+            rng.shuffle(order)
+            renamed = permute(table, order, masks_8, full)
+            self.assertEqual(canonical_table(table, 8, "permutation"), canonical_table(renamed, 8, "permutation"))
+
+    def test_index(self):
+        index = SignatureIndex("permutation")
+        index.add(parse("A & B"), "and")
+        index.add(parse("A | B"), "or")
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.lookup(parse("Q & P")), "and")
+        self.assertEqual(index.lookup(parse("~(~X & ~Y)")), "or")
+        self.assertIsNone(index.lookup(parse("A ^ B")))
+        with self.assertRaises(ValueError):
+            SignatureIndex("names")
+
+    def test_answer_index(self):
+        answer = CompiledAnswer(parse("A ^ B"))
+        known = [{"response": "A | B", "feedback": "OR"}, {"response": "~(A ^ B)", "is_correct": True}]
+        index = answer.index("exact", known)
+        self.assertIs(answer.index("exact", known), index)
+        self.assertEqual(index.lookup(parse("B ^ A")), {"is_correct": True})
+        self.assertEqual(index.lookup(parse("B | A")), known[0])
+        self.assertEqual(index.lookup(parse("A & ~B | ~A & B")), {"is_correct": True})
+        self.assertIsNone(index.lookup(parse("A & B")))
+
+    def test_answer_index_invalid(self):
+        answer = CompiledAnswer(parse("A ^ B"))
+        known = [{"response": "A £ B"}, {"feedback": "no response"}, "A | B", {"response": "A | B", "feedback": "OR"}]
+        before = metrics.counters().get("known_response_invalid", 0)
+        with self.assertLogs("evaluation_function.answer", "WARNING"):
+            index = answer.index("exact", known)
+        self.assertEqual(index.lookup(parse("B | A")), known[3])
+        self.assertEqual(len(index.errors), 3)
+        self.assertEqual(metrics.counters()["known_response_invalid"], before + 3)
+        self.assertIn("known response 1 could not be parsed", index.errors[0])
+        with self.assertLogs("evaluation_function.answer", "WARNING"):
+            self.assertEqual(answer.index("exact", {"response": "A | B"}).errors, ["known_responses is not a list"])
@@ -0,0 +1,26 @@
+import random
+
+from .ast import Expr
+from .latex_lex import LatexLexer
+from .lex import Lexer
+from .parse import NONE_DISALLOWED, parse_boolean
+
+# Helpers shared by the unit tests. NONE_DISALLOWED is imported from parse
+# so that the tests can import it from here with the others.
+
+
+def parse(input: str, latex: bool = False) -> Expr:
+    # Parse without any of the checks parse_expression() makes
+    lexer = LatexLexer(input) if latex else Lexer(input)
+    return parse_boolean(lexer.lex())
+
+
+def random_expression(rng: random.Random, depth: int, names: tuple[str, ...] = ("A", "B", "Clk", "x_1")) -> str:
+    # A random expression with brackets nested up to `depth` deep, as a
+    # student might type it
+    if depth == 0 or rng.random() < 0.3:
+        return ("~" if rng.random() < 0.3 else "") + rng.choice(names)
+    out = random_expression(rng, depth - 1, names)
+    for _ in range(rng.randint(1, 3)):
+        out += f" {rng.choice('&|^')} {random_expression(rng, depth - 1, names)}"
+    return f"~({out})" if rng.random() < 0.3 else f"({out})"
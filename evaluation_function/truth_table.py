@@ -0,0 +1,87 @@
+from typing import Optional
+
+from .ast import Expr, Prod, Term, iter_terms, subexpressions
+
+# Truth tables are packed into Python ints with one bit per row, so every
+# operator is evaluated for all rows at once. Beyond this many variables the
+# table (2 ** n bits) becomes too large to be worth enumerating.
+MAX_VARIABLES = 16
+
+
+def variables(expr: Expr) -> set[str]:
+    return {term.term for term in iter_terms(expr) if isinstance(term.term, str)}
+
+
+def variable_masks(names: list[str]) -> tuple[dict[str, int], int]:
+    # Row r assigns variable i the value of bit i of r, so the mask for
+    # variable i is a run of 2 ** i zeros followed by 2 ** i ones, repeated.
+    rows = 1 << len(names)
+    full = (1 << rows) - 1
+    masks = {}
+    for i, name in enumerate(names):
+        width = 1 << i
+        period = (1 << (2 * width)) - 1
+        block = ((1 << width) - 1) << width
+        masks[name] = block * (full // period)
+    return masks, full
+
+
+def eval_term(term: Term, masks: dict[str, int], full: int, values: dict) -> int:
+    if isinstance(term.term, str):
+        out = masks[term.term]
+    else:
+        out = values[id(term.term)]
+    return out ^ full if term.op else out
+
+
+def eval_prod(prod: Prod, masks: dict[str, int], full: int, values: dict) -> int:
+    out = eval_term(prod.left, masks, full, values)
+    for term in prod.right:
+        out &= eval_term(term, masks, full, values)
+    return out
+
+
+def eval_chain(expr: Expr, masks: dict[str, int], full: int, values: dict) -> int:
+    out = eval_prod(expr.left, masks, full, values)
+    for xor, prod in expr.right:
+        if xor:
+            out ^= eval_prod(prod, masks, full, values)
+        else:
+            out |= eval_prod(prod, masks, full, values)
+    return out
+
+
+def eval_expr(expr: Expr, masks: dict[str, int], full: int) -> int:
+    # Evaluate the innermost bracketed expressions first
+    values = {}
+    for nested in subexpressions(expr):
+        values[id(nested)] = eval_chain(nested, masks, full, values)
+    return values[id(expr)]
+
+
+def truth_table(expr: Expr, names: list[str]) -> int:
+    masks, full = variable_masks(names)
+    return eval_expr(expr, masks, full)
+
+
+def equivalent(left: Expr, right: Expr, max_variables: int = MAX_VARIABLES) -> Optional[bool]:
+    """
+    Compare two expressions by their truth tables over the union of their
+    variables. Returns None if there are too many variables to enumerate.
+    """
+    names = sorted(variables(left) | variables(right))
+    if len(names) > max_variables:
+        return None
+
+    masks, full = variable_masks(names)
+    return eval_expr(left, masks, full) == eval_expr(right, masks, full)
+
+
+def evaluate(expr: Expr, assignment: dict[str, bool]) -> bool:
+    # A truth table with a single row
+    masks = {name: int(value) for name, value in assignment.items()}
+    return eval_expr(expr, masks, 1) == 1
+
+
+def row_assignment(names: list[str], row: int) -> dict[str, bool]:
+    return {name: bool((row >> i) & 1) for i, name in enumerate(names)}
@@ -0,0 +1,32 @@
+import unittest
+
+from .truth_table import equivalent, truth_table, variables
+from .testing import parse
+
+
+class TestTruthTable(unittest.TestCase):
+
+    def test_variables(self):
+        self.assertEqual(variables(parse("A & ~(B | Test) ^ A")), {"A", "B", "Test"})
+
+    def test_table_rows(self):
+        # Row r assigns variable i the value of bit i of r
+        self.assertEqual(truth_table(parse("A"), ["A", "B"]), 0b1010)
+        self.assertEqual(truth_table(parse("B"), ["A", "B"]), 0b1100)
+        self.assertEqual(truth_table(parse("A & B"), ["A", "B"]), 0b1000)
+        self.assertEqual(truth_table(parse("A | B"), ["A", "B"]), 0b1110)
+        self.assertEqual(truth_table(parse("A ^ B"), ["A", "B"]), 0b0110)
+        self.assertEqual(truth_table(parse("~A"), ["A", "B"]), 0b0101)
+
+    def test_equivalent(self):
+        self.assertTrue(equivalent(parse("A ^ B"), parse("~(~(A & ~(A & B)) & ~(B & ~(A & B)))")))
+        self.assertTrue(equivalent(parse("A | B"), parse("~(~A & ~B)")))
+        self.assertFalse(equivalent(parse("A | B"), parse("A & B")))
+
+    def test_unused_variable(self):
+        self.assertTrue(equivalent(parse("A"), parse("A & (B | ~B)")))
+        self.assertFalse(equivalent(parse("A"), parse("A & B")))
+
+    def test_too_many_variables(self):
+        left = parse(" ^ ".join(f"x{i}" for i in range(20)))
+        self.assertIsNone(equivalent(left, left, max_variables=16))
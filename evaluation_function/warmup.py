@@ -0,0 +1,35 @@
+import os
+import threading
+
+from lf_toolkit.evaluation import Params
+
+from .evaluation import evaluation_function, sympy_equivalent
+from .parse import NONE_DISALLOWED, parse_expression
+from .preview import preview_function
+
+# Warm up the server process in the background once it has started, so the
+# first requests don't pay for importing sympy and filling caches.
+PREWARM = os.environ.get("EVAL_PREWARM", "0") not in ("", "0")
+
+# Seconds to wait after starting the server before warming up, leaving it to
+# bind and answer its health checks first.
+PREWARM_DELAY = float(os.environ.get("EVAL_PREWARM_DELAY", 0.5))
+
+
+def warm_up(sympy: bool = True):
+    # Import everything and fill the interpreter's caches before the first
+    # real request.
+    evaluation_function("A & B | ~C", "~(~A | ~B) | ~C", Params())
+    preview_function("A & B | ~C", Params())
+
+    # Most requests never need sympy, but the first one that does shouldn't
+    # have to wait for it to be imported.
+    if sympy:
+        sympy_equivalent(parse_expression("A & B", NONE_DISALLOWED), parse_expression("B & A", NONE_DISALLOWED))
+
+
+def start_prewarm(delay: float = PREWARM_DELAY) -> threading.Thread:
+    thread = threading.Timer(delay, warm_up)
+    thread.daemon = True
+    thread.start()
+    return thread